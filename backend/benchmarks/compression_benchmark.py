@@ -0,0 +1,65 @@
+"""Bytes saved and CPU cost of response compression on realistic payloads.
+
+Builds JSON bodies shaped like /api/payments and /api/transactions responses
+and runs them through the same compressor the CompressionMiddleware uses.
+
+    cd backend && python -m benchmarks.compression_benchmark --rows 1000 5000
+"""
+import argparse
+import json
+import random
+import time
+
+from compression import brotli, compress_bytes
+from benchmarks.datagen import make_customers, make_payments, make_transactions
+
+
+def measure(body: bytes, encoding: str, level: int, repeat: int) -> dict:
+    kwargs = {"brotli_quality": level} if encoding == "br" else {"gzip_level": level}
+    compressed = compress_bytes(body, encoding, **kwargs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compress_bytes(body, encoding, **kwargs)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    return {
+        "encoding": encoding,
+        "level": level,
+        "raw_bytes": len(body),
+        "compressed_bytes": len(compressed),
+        "saved_pct": round(100 * (1 - len(compressed) / len(body)), 1),
+        "cpu_ms": round(elapsed_ms, 2),
+        "mb_per_s": round(len(body) / 1e6 / (elapsed_ms / 1000), 1) if elapsed_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    customers = make_customers(200, rng)
+    settings = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+    if brotli is not None:
+        settings += [("br", 1), ("br", 4), ("br", 6)]
+
+    results = []
+    for rows in args.rows:
+        for payload, make in (("payments", make_payments), ("transactions", make_transactions)):
+            body = json.dumps(make(rows, customers, rng)).encode("utf-8")
+            for encoding, level in settings:
+                result = {"payload": payload, "rows": rows, **measure(body, encoding, level, args.repeat)}
+                results.append(result)
+                print(f"{payload:<13}{rows:>7} rows  {encoding:<4} {level:>2}  "
+                      f"{result['raw_bytes']:>10} -> {result['compressed_bytes']:>9} B  "
+                      f"saved {result['saved_pct']:>5}%  {result['cpu_ms']:>8} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Synthetic customers, payments and transactions for benchmarks.
+
+Documents have the same shape the API handlers write (ISO date strings,
+uuid ids, kuruş amounts, search keys, updated_seq, tenant_id). A scale is the number of payments;
+transactions match it and customers are a twentieth of it. The API needs a
+login, so a BENCH_USERNAME admin is seeded in the same tenant.
+
+    cd backend && python -m benchmarks.datagen --scale 100k --db muhasebe_bench
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from muhasebe.config import DEFAULT_TENANT_ID
+from muhasebe.search import build_customer_search_fields
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench123"
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BATCH_SIZE = 10_000
+
+FIRST_NAMES = ["Ahmet", "Ayşe", "Mehmet", "Fatma", "Mustafa", "Emine", "Ali", "Hatice", "Hüseyin",
+               "Zeynep", "İbrahim", "Elif", "Çağrı", "Şule", "Gökhan", "Özlem", "Ümit", "Işıl"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Öztürk", "Aydın", "Özdemir",
+              "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan"]
+BUSINESSES = ["Gıda", "Market", "Tekstil", "Manav", "Kırtasiye", "Şarküteri", "Kuruyemiş", "Nalbur"]
+DESCRIPTIONS = ["Mal alımı", "Kira ödemesi", "Fatura", "Veresiye satış", "Toptan alım faturası",
+                "Elektrik faturası", "Personel avansı", "Nakliye ücreti"]
+
+
+def scale_counts(scale: str) -> dict:
+    payments = SCALES[scale]
+    return {"customers": max(payments // 20, 10), "payments": payments, "transactions": payments}
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_customers(count: int, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    customers = []
+    for _ in range(count):
+        if rng.random() < 0.3:
+            name = f"{rng.choice(LAST_NAMES)} {rng.choice(BUSINESSES)} Ltd. Şti."
+        else:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        customers.append({
+            "id": _uuid(rng),
+            "name": name,
+            "phone": f"05{rng.randint(300000000, 599999999)}",
+            "address": f"{rng.choice(LAST_NAMES)} Mah. No:{rng.randint(1, 200)} İstanbul",
+            "tax_number": str(rng.randint(1000000000, 9999999999)),
+            "notes": rng.choice([None, "", "Peşin çalışır", "Ay sonu öder"]),
+            "created_at": (now - timedelta(days=rng.randint(0, 1000))).isoformat(),
+        })
+    return customers
+
+
+def make_payments(count: int, customers: list, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    payments = []
+    for _ in range(count):
+        customer = rng.choice(customers)
+        amount = rng.randint(5_000, 2_500_000)
+        paid = int(amount * rng.choice([0, 0, 0.25, 0.5, 1]))
+        created = now - timedelta(days=rng.randint(0, 720))
+        payments.append({
+            "id": _uuid(rng),
+            "customer_id": customer["id"],
+            "customer_name": customer["name"],
+            "amount": amount,
+            "paid_amount": paid,
+            "payment_type": rng.choice(["alacak", "borc"]),
+            "is_paid": paid >= amount,
+            "payment_date": created.isoformat() if paid >= amount else None,
+            "due_date": (created + timedelta(days=30)).isoformat(),
+            "description": rng.choice(DESCRIPTIONS),
+            "created_at": created.isoformat(),
+        })
+    return payments
+
+
+def make_transactions(count: int, customers: list, rng: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    transactions = []
+    for _ in range(count):
+        when = (now - timedelta(minutes=rng.randint(0, 1_000_000))).isoformat()
+        transactions.append({
+            "id": _uuid(rng),
+            "type": rng.choice(["gelir", "gider"]),
+            "payment_method": rng.choice(["nakit", "pos"]),
+            "amount": rng.randint(1_000, 1_000_000),
+            "description": f"{rng.choice(customers)['name']} - {rng.choice(DESCRIPTIONS)}",
+            "transaction_date": when,
+            "created_at": when,
+        })
+    return transactions
+
+
+def make_bench_user(tenant_id: str) -> dict:
+    from muhasebe.models import User
+    from muhasebe.security import pwd_context
+
+    user = User(username=BENCH_USERNAME, password=pwd_context.hash(BENCH_PASSWORD), role="admin",
+                tenant_id=tenant_id).model_dump()
+    user["created_at"] = user["created_at"].isoformat()
+    return user
+
+
+def seed(mongo_url: str, db_name: str, scale: str, seed_value: int = 42,
+         tenant_id: str = DEFAULT_TENANT_ID) -> dict:
+    """Drop and refill the sync collections of db_name; returns the counts"""
+    from pymongo import MongoClient
+
+    rng = random.Random(seed_value)
+    counts = scale_counts(scale)
+    db = MongoClient(mongo_url)[db_name]
+    for name in ("customers", "payments", "transactions", "tombstones", "counters"):
+        db.drop_collection(name)
+
+    seq = 0
+    customers = make_customers(counts["customers"], rng)
+    for customer in customers:
+        seq += 1
+        customer.update(build_customer_search_fields(customer["name"], customer["phone"], customer["tax_number"]))
+        customer["updated_seq"] = seq
+        customer["tenant_id"] = tenant_id
+    for start in range(0, len(customers), BATCH_SIZE):
+        db.customers.insert_many([dict(c) for c in customers[start:start + BATCH_SIZE]], ordered=False)
+
+    for name, make in (("payments", make_payments), ("transactions", make_transactions)):
+        remaining = counts[name]
+        while remaining:
+            batch = make(min(BATCH_SIZE, remaining), customers, rng)
+            for doc in batch:
+                seq += 1
+                doc["updated_seq"] = seq
+                doc["tenant_id"] = tenant_id
+            db[name].insert_many(batch, ordered=False)
+            remaining -= len(batch)
+
+    db.counters.insert_one({"_id": "updated_seq", "value": seq})
+    db.users.replace_one({"username": BENCH_USERNAME}, make_bench_user(tenant_id), upsert=True)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a benchmark database with synthetic data")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="muhasebe_bench")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if "bench" not in args.db:
+        parser.error("refusing to drop collections in a database whose name does not contain 'bench'")
+
+    started = time.perf_counter()
+    counts = seed(args.mongo_url, args.db, args.scale, args.seed)
+    print(f"Seeded {args.db}: {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Load scenarios against the API with latency percentiles, throughput and RSS.
+
+Runs in-process through httpx's ASGITransport (no network, startup events
+run after seeding) or against a running server with --base-url. Needs a local
+mongod; the benchmark database is dropped and refilled unless --no-seed.
+
+    cd backend && python -m benchmarks.loadtest --scale 100k --out results.json
+    cd backend && python -m benchmarks.loadtest --compare before.json --out after.json
+
+Results are written as JSON together with the git commit so runs from two
+commits can be compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.datagen import BENCH_PASSWORD, BENCH_USERNAME, SCALES, seed
+
+SCENARIOS = ("login_storm", "dashboard", "list_fetch", "search", "partial_payment_burst", "export")
+SEARCH_PREFIXES = ["ah", "ay", "yil", "kaya", "sah", "cel", "oz", "gida", "market", "053", "054"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def login(client: httpx.AsyncClient, credentials: dict):
+    """Log in once and send the token on every later request of the shared client"""
+    response = await client.post("/api/auth/login", json=credentials)
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+
+class Scenarios:
+    """One method per scenario; each call is one measured operation"""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, credentials: dict):
+        self.client = client
+        self.rng = rng
+        self.credentials = credentials
+        self.customer_ids = []
+        self.open_payment_ids = []
+
+    async def prepare(self):
+        customers = (await self.client.get("/api/customers")).json()
+        self.customer_ids = [c["id"] for c in customers]
+        payments = (await self.client.get("/api/payments")).json()
+        self.open_payment_ids = [p["id"] for p in payments if not p["is_paid"]]
+
+    async def login_storm(self, i: int):
+        return [await self.client.post("/api/auth/login", json=self.credentials)]
+
+    async def dashboard(self, i: int):
+        # The four requests Dashboard.js fires on every load
+        return await asyncio.gather(
+            self.client.get("/api/dashboard/stats"),
+            self.client.get("/api/customers"),
+            self.client.get("/api/payments"),
+            self.client.get("/api/transactions"),
+        )
+
+    async def list_fetch(self, i: int):
+        # The API has no paging parameters; these are the list calls the pages make
+        step = i % 4
+        if step == 0:
+            return [await self.client.get("/api/payments", params={"customer_id": self.rng.choice(self.customer_ids)})]
+        if step == 1:
+            return [await self.client.get("/api/customers/search", params={"q": self.rng.choice(SEARCH_PREFIXES)})]
+        if step == 2:
+            return [await self.client.get("/api/transactions")]
+        return [await self.client.get("/api/customers")]
+
+    async def search(self, i: int):
+        # Typeahead: short prefixes hit the search_terms fallback more often
+        prefix = self.rng.choice(SEARCH_PREFIXES)
+        return [await self.client.get("/api/customers/search", params={"q": prefix[:2 + i % 3]})]
+
+    async def partial_payment_burst(self, i: int):
+        payment_id = self.rng.choice(self.open_payment_ids)
+        return [await self.client.post("/api/payments/partial-payment", json={"payment_id": payment_id, "amount": 1.0})]
+
+    async def export(self, i: int):
+        report_type = ("summary", "payments", "transactions", "customers")[i % 4]
+        return [await self.client.get("/api/reports/export", params={"report_type": report_type})]
+
+
+async def run_scenario(scenarios: Scenarios, name: str, requests: int, concurrency: int) -> dict:
+    operation = getattr(scenarios, name)
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                responses = await operation(i)
+                if any(r.status_code >= 400 for r in responses):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        "name": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1) if duration else None,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_comparison(previous: dict, current: dict):
+    before = {s["name"]: s for s in previous["scenarios"]}
+    print(f"\nCompared with {previous['meta']['git_commit']} ({previous['meta']['scale']}):")
+    for scenario in current["scenarios"]:
+        old = before.get(scenario["name"])
+        if not old:
+            continue
+        parts = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if old[key]:
+                change = 100 * (scenario[key] - old[key]) / old[key]
+                parts.append(f"{key} {change:+.1f}%")
+        print(f"  {scenario['name']:<22} " + "  ".join(parts))
+
+
+async def main_async(args):
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120)
+        app = None
+    else:
+        import server
+        app = server.app
+        await app.router.startup()
+        # Indexes and the admin user are created in the background
+        await app.state.bootstrap_task
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "mode": "remote" if args.base_url else "in-process",
+            "base_url": args.base_url,
+            "scale": args.scale,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": [],
+    }
+
+    try:
+        credentials = {"username": args.username, "password": args.password}
+        await login(client, credentials)
+        scenarios = Scenarios(client, random.Random(args.seed), credentials)
+        await scenarios.prepare()
+        for name in args.scenarios:
+            result = await run_scenario(scenarios, name, args.requests, args.concurrency)
+            results["scenarios"].append(result)
+            print(f"{name:<22} {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']:>8} ms  "
+                  f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                  f"errors {result['errors']}  rss {result['peak_rss_mb']} MB")
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run load scenarios and write the results as JSON")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="muhasebe_bench")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in --db")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--username", default=BENCH_USERNAME, help="user to log in as (seeded unless --no-seed)")
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    if "bench" not in args.db:
+        parser.error("refusing to use a database whose name does not contain 'bench'")
+
+    # The in-process app reads these at import time
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+
+    if not args.no_seed:
+        started = time.perf_counter()
+        counts = seed(args.mongo_url, args.db, args.scale, args.seed)
+        print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(main_async(args))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Local three-node replica set for testing per-endpoint read routing.
+
+    cd backend && python -m benchmarks.replset start      # runs until Ctrl-C
+    cd backend && python -m benchmarks.replset verify     # in another shell
+
+`start` launches three mongod processes (ports 27117-27119, data in a temp
+directory) as replica set rs0 and prints the MONGO_URL to use. `verify`
+seeds a small benchmark database, logs in as the seeded bench user, runs
+the dashboard, statement, export and partial payment endpoints in-process
+and prints which member served each endpoint's reads. Reporting groups
+should land on a secondary, the partial payment on the primary. Needs
+`mongod` on PATH.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+PORTS = (27117, 27118, 27119)
+REPLICA_SET = "rs0"
+MONGO_URL = f"mongodb://{','.join(f'127.0.0.1:{p}' for p in PORTS)}/?replicaSet={REPLICA_SET}"
+
+
+def start():
+    from pymongo import MongoClient
+
+    data_dir = tempfile.mkdtemp(prefix="muhasebe-rs-")
+    processes = []
+    try:
+        for port in PORTS:
+            path = os.path.join(data_dir, str(port))
+            os.makedirs(path)
+            processes.append(subprocess.Popen(
+                ["mongod", "--replSet", REPLICA_SET, "--port", str(port), "--bind_ip", "127.0.0.1",
+                 "--dbpath", path, "--quiet"],
+                stdout=subprocess.DEVNULL
+            ))
+        time.sleep(2)
+        seed_client = MongoClient(f"mongodb://127.0.0.1:{PORTS[0]}", directConnection=True)
+        seed_client.admin.command("replSetInitiate", {
+            "_id": REPLICA_SET,
+            "members": [
+                {"_id": i, "host": f"127.0.0.1:{port}", "priority": 2 if i == 0 else 1}
+                for i, port in enumerate(PORTS)
+            ]
+        })
+        client = MongoClient(MONGO_URL)
+        while client.primary is None:
+            time.sleep(0.5)
+        print(f"Replica set {REPLICA_SET} ready, primary {client.primary[0]}:{client.primary[1]}")
+        print(f"MONGO_URL={MONGO_URL}")
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+async def verify_async(db_name: str):
+    from pymongo import monitoring
+    import httpx
+
+    served = defaultdict(set)
+    current = {"endpoint": None}
+
+    class ServedBy(monitoring.CommandListener):
+        def started(self, event):
+            if current["endpoint"] and event.command_name in ("find", "aggregate", "count"):
+                served[current["endpoint"]].add(f"{event.connection_id[0]}:{event.connection_id[1]}")
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    monitoring.register(ServedBy())
+
+    import server
+    from benchmarks.datagen import BENCH_PASSWORD, BENCH_USERNAME
+    from benchmarks.loadtest import login
+    from muhasebe.database import get_client
+    app = server.app
+    await app.router.startup()
+    await app.state.bootstrap_task
+    primary = "{}:{}".format(*get_client().primary)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://rs") as client:
+        await login(client, {"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+        customer_id = (await client.get("/api/customers")).json()[0]["id"]
+        payment_id = next(p["id"] for p in (await client.get("/api/payments")).json() if not p["is_paid"])
+        requests = {
+            "dashboard": ("GET", "/api/dashboard/stats", None),
+            "statements": ("GET", f"/api/customers/{customer_id}/summary", None),
+            "reports": ("GET", "/api/reports/export?report_type=payments", None),
+            "partial_payment": ("POST", "/api/payments/partial-payment", {"payment_id": payment_id, "amount": 1.0}),
+        }
+        for endpoint, (method, path, body) in requests.items():
+            current["endpoint"] = endpoint
+            response = await client.request(method, path, json=body)
+            current["endpoint"] = None
+            members = sorted(served[endpoint])
+            role = "primary" if members == [primary] else "secondary" if primary not in members else "mixed"
+            print(f"{endpoint:<16} {response.status_code}  {role:<9} {', '.join(members)}")
+
+    await app.router.shutdown()
+
+
+def verify(args):
+    from benchmarks.datagen import seed
+
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+    seed(args.mongo_url, args.db, "1k")
+    # Let the secondaries catch up before reading from them
+    time.sleep(2)
+    asyncio.run(verify_async(args.db))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local replica set for read routing tests")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("start", help="start three mongod processes as a replica set")
+    verify_parser = sub.add_parser("verify", help="show which member serves each endpoint group")
+    verify_parser.add_argument("--mongo-url", default=MONGO_URL)
+    verify_parser.add_argument("--db", default="muhasebe_bench_rs")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        if shutil.which("mongod") is None:
+            sys.exit("mongod not found on PATH")
+        start()
+    else:
+        if "bench" not in args.db:
+            parser.error("refusing to use a database whose name does not contain 'bench'")
+        verify(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Import-to-ready time of the backend, optionally compared with another commit.
+
+Each sample runs in a fresh interpreter and records:
+- import_ms:  `import server` (module import, app construction)
+- startup_ms: running the startup handlers, i.e. until the worker can serve
+- ready_ms:   until the first /api/health response
+- bootstrap_ms: until background startup tasks (indexes, admin user) finish,
+  when the app has them
+
+    cd backend && python -m benchmarks.startup_benchmark --samples 10
+    cd backend && python -m benchmarks.startup_benchmark --ref 91511cf --out startup.json
+
+--ref checks the given commit out into a temporary git worktree and measures
+it the same way, so the before/after numbers come from one run. Needs a local
+mongod because older revisions ping it during startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SAMPLE_SCRIPT = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    app = server.app
+    await app.router.startup()
+    serving = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+        await client.get("/api/health")
+    ready = time.perf_counter()
+    task = getattr(app.state, "bootstrap_task", None)
+    if task is not None:
+        await task
+    bootstrapped = time.perf_counter()
+    await app.router.shutdown()
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (serving - started) * 1000,
+        "ready_ms": (ready - started) * 1000,
+        "bootstrap_ms": (bootstrapped - started) * 1000,
+    }))
+
+asyncio.run(main())
+"""
+
+
+def measure(backend_dir: Path, samples: int, env: dict) -> dict:
+    runs = []
+    for _ in range(samples):
+        output = subprocess.check_output(
+            [sys.executable, "-c", SAMPLE_SCRIPT], cwd=backend_dir, env=env, text=True,
+            stderr=subprocess.DEVNULL,
+        )
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        key: {
+            "median": round(statistics.median(r[key] for r in runs), 1),
+            "min": round(min(r[key] for r in runs), 1),
+            "max": round(max(r[key] for r in runs), 1),
+        }
+        for key in runs[0]
+    }
+
+
+def measure_ref(ref: str, samples: int, env: dict) -> dict:
+    repo_root = BACKEND_DIR.parent
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = Path(tmp) / "worktree"
+        subprocess.check_call(["git", "worktree", "add", "--detach", str(worktree), ref], cwd=repo_root,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            return measure(worktree / "backend", samples, env)
+        finally:
+            subprocess.call(["git", "worktree", "remove", "--force", str(worktree)], cwd=repo_root)
+
+
+def print_result(label: str, result: dict):
+    print(label)
+    for key, value in result.items():
+        print(f"  {key:<13} median {value['median']:>8} ms  (min {value['min']}, max {value['max']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend import-to-ready time")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--ref", help="also measure this git commit for comparison")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="muhasebe_bench")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    env = {**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": args.db}
+    results = {"current": measure(BACKEND_DIR, args.samples, env)}
+    print_result("current tree", results["current"])
+    if args.ref:
+        results[args.ref] = measure_ref(args.ref, args.samples, env)
+        print_result(args.ref, results[args.ref])
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Negotiated gzip/brotli response compression.
+
+Starlette's GZipMiddleware has no brotli support and compresses every content
+type, including xlsx exports which are already zip archives. This middleware
+picks the best encoding the client accepts, skips small and already-compressed
+bodies, and compresses streaming responses chunk by chunk instead of buffering.
+"""
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies of these types are already compressed (xlsx/docx are zip files) or
+# must not be delayed by a compressor's internal buffering (SSE).
+EXEMPT_CONTENT_TYPES = (
+    "application/vnd.openxmlformats-officedocument",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/pdf",
+    "image/",
+    "audio/",
+    "video/",
+    "text/event-stream",
+)
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Return {encoding: q} for an Accept-Encoding header"""
+    encodings = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[token] = q
+    return encodings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    encodings = parse_accept_encoding(header)
+    if brotli is not None and encodings.get("br", 0) > 0:
+        return "br"
+    if encodings.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+            self._flush = self._impl.flush
+            self._finish = self._impl.finish
+            self._compress = self._impl.process
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self._flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._impl.flush
+            self._compress = self._impl.compress
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compress(data) + self._flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compress(data) + self._finish()
+
+
+def compress_bytes(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    return _Compressor(encoding, gzip_level, brotli_quality).finish(data)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, compressor
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+                if b"content-encoding" in headers or content_type.startswith(EXEMPT_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # Small single-chunk response, not worth the CPU
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                vary = b"Accept-Encoding"
+                headers = []
+                for k, v in start_message.get("headers", []):
+                    if k.lower() == b"vary":
+                        vary = v + b", " + vary
+                    elif k.lower() != b"content-length":
+                        headers.append((k, v))
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"vary", vary))
+
+                if not more_body:
+                    compressed = compressor.finish(body)
+                    headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                await send({**start_message, "headers": headers})
+
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,91 @@
+"""In-process pub/sub feeding the /api/events Server-Sent Events stream.
+
+Write handlers publish a small change event after their write commits; each
+connected SSE client owns a bounded queue. A client that stops reading is
+dropped instead of letting its queue grow without limit. Subscribers may
+pick a topic (the tenant) and then only get events published to it.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class EventBus:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[asyncio.Queue, Optional[str]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, topic: Optional[str] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = topic
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    def publish(self, event: dict, topic: Optional[str] = None):
+        for queue, subscribed in list(self._subscribers.items()):
+            if subscribed is not None and subscribed != topic:
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: replace its oldest event with None, which tells
+                # the stream to close so the client reconnects and resyncs
+                self._subscribers.pop(queue, None)
+                queue.get_nowait()
+                queue.put_nowait(None)
+                logging.warning("Dropping SSE subscriber with a full queue")
+
+
+def format_sse(event: dict, event_type: str = "change", event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def diff_balances(before: dict, after: dict) -> dict:
+    """Per-key difference of two balance contributions, zero entries dropped"""
+    delta = {}
+    for key in set(before) | set(after):
+        value = after.get(key, 0) - before.get(key, 0)
+        if value:
+            delta[key] = value
+    return delta
+
+
+def payment_contribution(payment: Optional[dict]) -> dict:
+    """What a payment adds to the dashboard's receivable/payable totals, in
+    the document's units (stored documents: kuruş)"""
+    if not payment or payment.get('is_paid'):
+        return {}
+    if payment['payment_type'] == 'alacak':
+        return {"total_receivable": payment['amount']}
+    if payment['payment_type'] == 'borc':
+        return {"total_payable": payment['amount']}
+    return {}
+
+
+def transaction_contribution(transaction: Optional[dict]) -> dict:
+    """What a transaction adds to the dashboard's cash/POS balances, in the
+    document's units"""
+    if not transaction:
+        return {}
+    amount = transaction['amount']
+    if transaction['type'] == 'gider':
+        amount = -amount
+    if transaction['payment_method'] == 'nakit':
+        return {"cash_balance": amount, "total_balance": amount}
+    if transaction['payment_method'] == 'pos':
+        return {"pos_balance": amount, "total_balance": amount}
+    return {}
@@ -0,0 +1,251 @@
+"""Idempotency-Key support for write endpoints.
+
+A client that sends `Idempotency-Key: <key>` with a POST to one of the
+configured paths gets the stored response replayed for any later request
+with the same key, without the handler running again. Keys are per user
+(requests without a valid token share one anonymous namespace) and per
+tenant, and expire with the TTL index on the collection.
+
+- First request: the key is reserved (status "processing") with a lock
+  that is renewed while the handler runs, and the response is stored
+  before its last chunk is sent.
+- Same key while the first is still running: 409 with Retry-After.
+- Same key after the first died mid-request (crash, shutdown timeout): its
+  lock has expired, so the retry takes the record over and runs the handler.
+- Same key with a different method, path or body: 422.
+- 5xx responses are not stored, so the retry runs the handler again.
+- A response that could not be stored (database error, or the record was
+  taken over) leaves the key marked failed: the handler's writes happened,
+  so retries get 409 instead of running it a second time.
+
+Replays need the unique index on the key. `prepare` creates it and is
+awaited before the first key is accepted; until it succeeds keyed requests
+get 503.
+
+Requests without the header only pay for one header lookup.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(body).hexdigest()
+    return f"{method} {path} {digest}"
+
+
+async def _json_response(send, status: int, detail: str, headers: Iterable = ()):
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app,
+        collection: Callable,
+        identify: Callable[[Optional[str]], Optional[str]],
+        paths: Iterable[str],
+        methods: Iterable[str] = ("POST",),
+        prepare: Optional[Callable[[], Awaitable]] = None,
+        lock_seconds: float = 120,
+    ):
+        self.app = app
+        # Called per request so a tenant-scoped collection picks up the
+        # tenant of the request
+        self.collection = collection
+        self.identify = identify
+        self.paths = set(paths)
+        self.methods = set(methods)
+        self.prepare = prepare
+        self._prepared = prepare is None
+        # A reservation not renewed for this long belongs to a dead request
+        self.lock_seconds = lock_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        key = None
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == IDEMPOTENCY_HEADER:
+                key = value.decode("latin-1").strip()
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _json_response(send, 400, f"Idempotency-Key en fazla {MAX_KEY_LENGTH} karakter olabilir")
+            return
+        if not self._prepared:
+            try:
+                await self.prepare()
+                self._prepared = True
+            except Exception as e:
+                logging.error(f"Idempotency key index unavailable: {str(e)}")
+                await _json_response(send, 503, "Sunucu hazırlanıyor, lütfen tekrar deneyin", [(b"retry-after", b"5")])
+                return
+        subject = self.identify(authorization) or "anonymous"
+
+        # The body is part of the fingerprint; read it here and hand the
+        # same messages to the app
+        messages = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        collection = self.collection()
+        record_key = f"{subject}:{key}"
+        fingerprint = request_fingerprint(scope["method"], scope["path"], body)
+        lock_id = uuid.uuid4().hex
+        try:
+            await collection.insert_one({
+                "key": record_key,
+                "fingerprint": fingerprint,
+                "status": "processing",
+                "lock_id": lock_id,
+                "locked_until": self._lock_expiry(),
+                "created_at": datetime.now(timezone.utc),
+            })
+        except DuplicateKeyError:
+            if not await self._take_over(collection, record_key, fingerprint, lock_id):
+                await self._replay(collection, record_key, fingerprint, send)
+                return
+
+        status_code = 500
+        content_type = None
+        chunks = []
+        store_attempted = False
+        stored = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, content_type, store_attempted, stored
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and status_code < 500:
+                    # Store before the last chunk so a retry from a client
+                    # that got the response never sees "processing"
+                    store_attempted = True
+                    stored = await self._store(collection, record_key, lock_id, status_code, content_type, b"".join(chunks))
+            await send(message)
+
+        renew_task = asyncio.create_task(self._renew(collection, record_key, lock_id))
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        finally:
+            renew_task.cancel()
+            if store_attempted and not stored:
+                await self._mark_failed(collection, record_key, lock_id)
+            elif not stored:
+                # Failed or 5xx: release the key so a retry runs the handler
+                try:
+                    await collection.delete_one({"key": record_key, "status": "processing", "lock_id": lock_id})
+                except Exception as e:
+                    logging.error(f"Failed to release idempotency key: {str(e)}")
+
+    def _lock_expiry(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lock_seconds)
+
+    async def _take_over(self, collection, record_key: str, fingerprint: str, lock_id: str) -> bool:
+        """Claim a reservation whose holder stopped renewing it; records from
+        before locks existed have no locked_until and count as expired"""
+        record = await collection.find_one_and_update(
+            {
+                "key": record_key,
+                "status": "processing",
+                "fingerprint": fingerprint,
+                "locked_until": {"$not": {"$gt": datetime.now(timezone.utc)}},
+            },
+            {"$set": {"lock_id": lock_id, "locked_until": self._lock_expiry()}},
+        )
+        return record is not None
+
+    async def _renew(self, collection, record_key: str, lock_id: str):
+        while True:
+            await asyncio.sleep(self.lock_seconds / 3)
+            try:
+                await collection.update_one(
+                    {"key": record_key, "status": "processing", "lock_id": lock_id},
+                    {"$set": {"locked_until": self._lock_expiry()}},
+                )
+            except Exception as e:
+                logging.error(f"Failed to renew idempotency key lock: {str(e)}")
+
+    async def _store(self, collection, record_key: str, lock_id: str, status: int, content_type: Optional[str],
+                     body: bytes) -> bool:
+        try:
+            result = await collection.update_one({"key": record_key, "lock_id": lock_id}, {"$set": {
+                "status": "completed",
+                "response_status": status,
+                "response_content_type": content_type,
+                "response_body": body,
+            }})
+        except Exception as e:
+            logging.error(f"Failed to store idempotent response: {str(e)}")
+            return False
+        if result.matched_count == 0:
+            # Our lock expired and a retry took the key over
+            logging.error(f"Idempotency key {record_key} was taken over before its response was stored")
+            return False
+        return True
+
+    async def _mark_failed(self, collection, record_key: str, lock_id: str):
+        try:
+            await collection.update_one({"key": record_key, "lock_id": lock_id}, {"$set": {"status": "failed"}})
+        except Exception as e:
+            logging.error(f"Failed to mark idempotency key as failed: {str(e)}")
+
+    async def _replay(self, collection, record_key: str, fingerprint: str, send):
+        record = await collection.find_one({"key": record_key}, {"_id": 0})
+        if record is not None and record["fingerprint"] != fingerprint:
+            await _json_response(send, 422, "Bu Idempotency-Key farklı bir istek için kullanılmış")
+            return
+        if record is not None and record["status"] == "failed":
+            await _json_response(send, 409, "Bu Idempotency-Key ile gönderilen istek işlendi ancak yanıtı saklanamadı")
+            return
+        if record is None or record["status"] != "completed":
+            # Still running, or released by a failure a moment ago
+            await _json_response(send, 409, "Bu Idempotency-Key ile gönderilen istek henüz tamamlanmadı",
+                                 [(b"retry-after", b"1")])
+            return
+
+        body = record["response_body"]
+        headers = [(b"content-length", str(len(body)).encode()), (REPLAYED_HEADER, b"true")]
+        if record.get("response_content_type"):
+            headers.append((b"content-type", record["response_content_type"].encode("latin-1")))
+        await send({"type": "http.response.start", "status": record["response_status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,249 @@
+"""Prometheus metrics for the API, MongoDB and the worker thread pools.
+
+- MetricsMiddleware: per-route request count, latency and in-flight requests,
+  labelled with the route template (/api/payments/{payment_id}) rather than
+  the raw path so label cardinality stays bounded.
+- MongoCommandListener / MongoPoolListener: pymongo monitoring hooks passed to
+  the Motor client for per-collection command latency and pool checkout wait.
+- MeteredPool: a thread pool for blocking work (bcrypt, xlsx rendering) that
+  reports how many jobs are queued and running.
+- SingleFlightCollector: request coalescing counters.
+
+When served with several worker processes (serve.py sets
+PROMETHEUS_MULTIPROC_DIR), /metrics aggregates the files every worker writes
+to that directory. Custom collectors such as SingleFlightCollector only
+describe their own process and are left out in that mode.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests by route and status",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled",
+    ["method", "route"], multiprocess_mode="livesum"
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command",
+    ["collection", "command"], buckets=MONGO_BUCKETS
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command",
+    ["collection", "command"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection",
+    ["address"], buckets=MONGO_BUCKETS
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total", "MongoDB connection checkouts that failed",
+    ["address", "reason"]
+)
+POOL_QUEUED = Gauge("worker_pool_queued_jobs", "Jobs waiting for a pool thread", ["pool"],
+                    multiprocess_mode="livesum")
+POOL_ACTIVE = Gauge("worker_pool_active_jobs", "Jobs currently running on a pool thread", ["pool"],
+                    multiprocess_mode="livesum")
+POOL_WAIT = Histogram(
+    "worker_pool_wait_seconds", "Time a job waited for a pool thread",
+    ["pool"], buckets=LATENCY_BUCKETS
+)
+
+# Commands whose first field is not a collection name
+_NON_COLLECTION_COMMANDS = {"ping", "hello", "ismaster", "isMaster", "buildinfo", "buildInfo",
+                            "endSessions", "saslStart", "saslContinue", "getMore", "killCursors"}
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def metrics_response_body() -> bytes:
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the aggregate on shutdown"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    def __init__(self, app, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    def _route_template(self, scope) -> str:
+        router = scope["app"].router
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUEST_COUNT.labels(method, route, str(status_code)).inc()
+            in_flight.dec()
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    if command_name in _NON_COLLECTION_COMMANDS:
+        return "-"
+    target = command.get(command_name)
+    return target if isinstance(target, str) else "-"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Per-collection command latency; pymongo reports the duration itself"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = command_collection(event.command_name, event.command)
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Checkout wait time. Start and end of a checkout happen on the same
+    thread, so a thread-local start timestamp pairs them up."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(f"{event.address[0]}:{event.address[1]}").observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_POOL_CHECKOUT_FAILURES.labels(f"{event.address[0]}:{event.address[1]}", str(event.reason)).inc()
+
+    # Remaining pool events are not measured
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+class MeteredPool:
+    """Thread pool for blocking calls that keeps them off the event loop"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args):
+        queued = POOL_QUEUED.labels(self.name)
+        active = POOL_ACTIVE.labels(self.name)
+        submitted = time.perf_counter()
+
+        def job():
+            queued.dec()
+            POOL_WAIT.labels(self.name).observe(time.perf_counter() - submitted)
+            active.inc()
+            try:
+                return fn(*args)
+            finally:
+                active.dec()
+
+        queued.inc()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, job)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class SingleFlightCollector:
+    """Exports the request coalescing counters of SingleFlight groups"""
+
+    def __init__(self, flights):
+        self.flights = flights
+
+    def collect(self):
+        calls = CounterMetricFamily("singleflight_calls", "Calls to a coalesced endpoint", labels=["group"])
+        executions = CounterMetricFamily("singleflight_executions", "Computations actually run", labels=["group"])
+        coalesced = CounterMetricFamily("singleflight_coalesced", "Calls that joined an in-flight computation", labels=["group"])
+        cache_hits = CounterMetricFamily("singleflight_cache_hits", "Calls served from the short result TTL", labels=["group"])
+        in_flight = GaugeMetricFamily("singleflight_in_flight", "Computations currently running", labels=["group"])
+        for flight in self.flights:
+            stats = flight.stats()
+            calls.add_metric([flight.name], stats["calls"])
+            executions.add_metric([flight.name], stats["executions"])
+            coalesced.add_metric([flight.name], stats["coalesced"])
+            cache_hits.add_metric([flight.name], stats["cache_hits"])
+            in_flight.add_metric([flight.name], stats["in_flight"])
+        return [calls, executions, coalesced, cache_hits, in_flight]
@@ -0,0 +1 @@
+"""Opensoftt Muhasebe backend. Build the ASGI app with muhasebe.app.create_app()."""
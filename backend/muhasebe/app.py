@@ -0,0 +1,127 @@
+"""App factory: middleware, domain routers and lifecycle hooks."""
+from fastapi import FastAPI, APIRouter
+from fastapi.responses import Response
+from starlette.middleware.cors import CORSMiddleware
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from compression import CompressionMiddleware
+from idempotency import IdempotencyMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
+from metrics import MetricsMiddleware, mark_worker_dead, metrics_response_body
+from profiling import ProfilingMiddleware
+from muhasebe import config
+from muhasebe.balances import stop_checkpoint_builder
+from muhasebe.bootstrap import ensure_idempotency_index, run_startup_tasks
+from muhasebe.changes import stop_change_stream, stop_tombstone_pruner
+from muhasebe.database import db, slow_op_logger, close_client
+from muhasebe.routers import auth, customers, payments, transactions, reports, periods, balances, system
+from muhasebe.routers.reports import export_pool
+from muhasebe.security import bcrypt_pool, is_admin_authorization, subject_from_authorization
+from muhasebe.tenancy import TenantMiddleware
+
+async def store_profile(profile: dict):
+    profile['created_at'] = datetime.now(timezone.utc)
+    await db.profiles.insert_one(profile)
+
+# Writes that clients may retry with an Idempotency-Key
+IDEMPOTENT_PATHS = (
+    "/api/payments",
+    "/api/payments/installments",
+    "/api/payments/partial-payment",
+    "/api/transactions",
+)
+
+# Reachable without a token
+PUBLIC_PATHS = (
+    "/api/",
+    "/api/health",
+    "/api/auth/login",
+    "/api/auth/change-password",
+)
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    
+    # Innermost, so replayed responses still get CORS headers, compression
+    # and metrics; inside TenantMiddleware, so keys are tenant-scoped
+    app.add_middleware(
+        IdempotencyMiddleware,
+        collection=lambda: db.idempotency_keys,
+        identify=subject_from_authorization,
+        paths=IDEMPOTENT_PATHS,
+        prepare=ensure_idempotency_index,
+        lock_seconds=config.IDEMPOTENCY_LOCK_SECONDS,
+    )
+    
+    # On-demand profiling: admins send X-Profile: 1 and get X-Profile-Id back
+    app.add_middleware(ProfilingMiddleware, authorize=is_admin_authorization, store=store_profile)
+    
+    # Tenant from the JWT; wraps profiling so stored profiles are tenant-scoped,
+    # and sits inside CORS so its 401s carry CORS headers
+    app.add_middleware(
+        TenantMiddleware,
+        public_paths=PUBLIC_PATHS,
+        query_token_paths=("/api/events",),
+    )
+    
+    # CORS configuration - MUST be before routes
+    if config.CORS_ORIGINS == '*':
+        allow_origins = ['*']
+    else:
+        allow_origins = [origin.strip() for origin in config.CORS_ORIGINS.split(',')]
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=600,
+    )
+    
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.COMPRESSION_MIN_SIZE,
+        gzip_level=config.COMPRESSION_LEVEL,
+        brotli_quality=config.BROTLI_QUALITY,
+    )
+    
+    # Request metrics; added last so it wraps the other middleware
+    app.add_middleware(MetricsMiddleware)
+    
+    @app.get("/metrics")
+    async def metrics():
+        return Response(metrics_response_body(), media_type=CONTENT_TYPE_LATEST)
+    
+    # All API routes live under /api
+    api_router = APIRouter(prefix="/api")
+    for module in (system, auth, customers, payments, transactions, reports, periods, balances):
+        api_router.include_router(module.router)
+    app.include_router(api_router)
+    
+    @app.on_event("startup")
+    async def startup_event():
+        logging.info("Application starting up...")
+        # Indexes, backfills and admin bootstrap don't block serving
+        app.state.bootstrap_task = asyncio.create_task(run_startup_tasks())
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        bootstrap_task = getattr(app.state, "bootstrap_task", None)
+        if bootstrap_task and not bootstrap_task.done():
+            bootstrap_task.cancel()
+            # Let it release the startup lease before the client closes
+            await asyncio.gather(bootstrap_task, return_exceptions=True)
+        stop_change_stream()
+        stop_checkpoint_builder()
+        stop_tombstone_pruner()
+        slow_op_logger.stop()
+        bcrypt_pool.shutdown()
+        export_pool.shutdown()
+        close_client()
+        mark_worker_dead()
+    
+    return app
@@ -0,0 +1,237 @@
+"""Point-in-time balances: kasa, POS and per-customer open items as of a date.
+
+A checkpoint stores the balances at a UTC midnight. A query takes the
+nearest checkpoint at or before `as_of` and applies only what is dated
+between the two, read by indexed date ranges from the live and archive
+collections. Cost depends on activity since the checkpoint, not on history.
+
+A customer's open items as of X are the payments created before X and not
+settled (is_paid with payment_date, or created_at if missing) before X,
+split into receivable (alacak) and payable (borc) like the dashboard.
+Balances are computed and stored in kuruş.
+
+Checkpoints are built per tenant by a background task on one worker: daily
+for the last BALANCE_CHECKPOINT_DAILY_DAYS days, monthly before that. A write dated
+before the newest checkpoint drops the checkpoints after that date; they are
+rebuilt on the next run.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from muhasebe.config import BALANCE_CHECKPOINT_DAILY_DAYS, BALANCE_CHECKPOINT_INTERVAL_SECONDS
+from muhasebe.database import db, tenant_ids
+from muhasebe.lease import lease
+from muhasebe.money import as_kurus
+from muhasebe.periods import as_datetime, find_with_archive
+from muhasebe.tenancy import tenant_scope
+
+CHECKPOINTS_COLLECTION = "balance_checkpoints"
+CHECKPOINT_ROWS_COLLECTION = "balance_checkpoint_customers"
+ROW_BATCH_SIZE = 1000
+
+checkpoint_task = None
+
+def utc_midnight(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(value: datetime) -> datetime:
+    return (value.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def open_amount(payment: dict, at: Optional[datetime]) -> int:
+    """Amount of a payment still open at `at` (None: before any data)"""
+    if at is None or as_datetime(payment['created_at']) >= at:
+        return 0
+    if payment.get('is_paid'):
+        settled = payment.get('payment_date') or payment['created_at']
+        if as_datetime(settled) < at:
+            return 0
+    return as_kurus(payment['amount'])
+
+# Queries
+async def nearest_checkpoint(cutoff: datetime) -> Optional[dict]:
+    return await db[CHECKPOINTS_COLLECTION].find_one(
+        {"as_of": {"$lte": cutoff.isoformat()}}, {"_id": 0}, sort=[("as_of", -1)]
+    )
+
+async def balances_at(cutoff: datetime) -> dict:
+    """Balances covering everything dated before cutoff"""
+    cutoff = cutoff.astimezone(timezone.utc)
+    checkpoint = await nearest_checkpoint(cutoff)
+    start = as_datetime(checkpoint['as_of']) if checkpoint else None
+    
+    cash_balance = as_kurus(checkpoint['cash_balance']) if checkpoint else 0
+    pos_balance = as_kurus(checkpoint['pos_balance']) if checkpoint else 0
+    customers = defaultdict(lambda: {"receivable": 0, "payable": 0})
+    if checkpoint:
+        async for row in db[CHECKPOINT_ROWS_COLLECTION].find({"checkpoint_id": checkpoint['id']}, {"_id": 0}):
+            customers[row['customer_id']].update(receivable=as_kurus(row['receivable']), payable=as_kurus(row['payable']))
+    
+    window = {"$lt": cutoff.isoformat()}
+    if start:
+        window["$gte"] = start.isoformat()
+    
+    transactions = await find_with_archive(
+        "transactions", {"transaction_date": window}, {"type": 1, "payment_method": 1, "amount": 1}
+    )
+    for transaction in transactions:
+        amount = as_kurus(transaction['amount'])
+        if transaction['type'] == 'gider':
+            amount = -amount
+        if transaction['payment_method'] == 'nakit':
+            cash_balance += amount
+        elif transaction['payment_method'] == 'pos':
+            pos_balance += amount
+    
+    # Payments opened or settled inside the window
+    payments = await find_with_archive(
+        "payments",
+        {"$or": [{"created_at": window}, {"is_paid": True, "payment_date": window}]},
+        {"customer_id": 1, "amount": 1, "payment_type": 1, "is_paid": 1, "payment_date": 1, "created_at": 1}
+    )
+    for payment in payments:
+        change = open_amount(payment, cutoff) - open_amount(payment, start)
+        if change and payment['payment_type'] in ('alacak', 'borc'):
+            key = "receivable" if payment['payment_type'] == 'alacak' else "payable"
+            customers[payment['customer_id']][key] += change
+    
+    return {
+        "as_of": cutoff.isoformat(),
+        "checkpoint": checkpoint['as_of'] if checkpoint else None,
+        "cash_balance": cash_balance,
+        "pos_balance": pos_balance,
+        "customers": {cid: totals for cid, totals in customers.items() if totals['receivable'] or totals['payable']}
+    }
+
+# Invalidation
+async def invalidate_checkpoints(*dates):
+    """Drop checkpoints that include data dated at any of `dates`.
+    
+    Writes dated today can't touch a checkpoint (the newest is today's
+    midnight) and return without a database call.
+    """
+    dates = [as_datetime(d).astimezone(timezone.utc) for d in dates if d]
+    if not dates:
+        return
+    since = min(dates)
+    if since >= utc_midnight(datetime.now(timezone.utc)):
+        return
+    # Tells a builder that is mid-computation its result may be stale
+    await db.counters.update_one({"_id": "checkpoint_epoch"}, {"$inc": {"value": 1}}, upsert=True)
+    stale = await db[CHECKPOINTS_COLLECTION].find({"as_of": {"$gt": since.isoformat()}}, {"_id": 0, "id": 1}).to_list(None)
+    if stale:
+        await delete_checkpoints([c['id'] for c in stale])
+
+async def delete_checkpoints(ids: list):
+    await db[CHECKPOINTS_COLLECTION].delete_many({"id": {"$in": ids}})
+    await db[CHECKPOINT_ROWS_COLLECTION].delete_many({"checkpoint_id": {"$in": ids}})
+
+async def checkpoint_epoch() -> int:
+    counter = await db.counters.find_one({"_id": "checkpoint_epoch"})
+    return counter['value'] if counter else 0
+
+# Building
+async def earliest_activity() -> Optional[datetime]:
+    dates = []
+    for kind, field in (("transactions", "transaction_date"), ("payments", "created_at")):
+        names = [kind] + await db.list_collection_names(filter={"name": {"$regex": f"^{kind}_archive_"}})
+        for name in names:
+            document = await db[name].find_one({field: {"$ne": None}}, {"_id": 0, field: 1}, sort=[(field, 1)])
+            if document:
+                dates.append(as_datetime(document[field]))
+    return min(dates) if dates else None
+
+async def save_checkpoint(as_of: datetime, balances: dict) -> bool:
+    checkpoint_id = str(uuid.uuid4())
+    rows = [
+        {"checkpoint_id": checkpoint_id, "customer_id": customer_id, **totals}
+        for customer_id, totals in balances['customers'].items()
+    ]
+    for start in range(0, len(rows), ROW_BATCH_SIZE):
+        await db[CHECKPOINT_ROWS_COLLECTION].insert_many(rows[start:start + ROW_BATCH_SIZE])
+    # Rows first, so a visible checkpoint is always complete
+    try:
+        await db[CHECKPOINTS_COLLECTION].insert_one({
+            "id": checkpoint_id,
+            "as_of": as_of.isoformat(),
+            "cash_balance": balances['cash_balance'],
+            "pos_balance": balances['pos_balance'],
+            "customer_count": len(rows),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+    except DuplicateKeyError:
+        await db[CHECKPOINT_ROWS_COLLECTION].delete_many({"checkpoint_id": checkpoint_id})
+        return False
+    return True
+
+async def build_checkpoints():
+    """Fill in checkpoints up to today's midnight, each from the one before"""
+    today = utc_midnight(datetime.now(timezone.utc))
+    daily_from = today - timedelta(days=BALANCE_CHECKPOINT_DAILY_DAYS)
+    
+    latest = await db[CHECKPOINTS_COLLECTION].find_one({}, {"_id": 0}, sort=[("as_of", -1)])
+    if latest:
+        target = as_datetime(latest['as_of'])
+    else:
+        earliest = await earliest_activity()
+        if earliest is None:
+            return
+        # Nothing is dated before the first month start: an empty base checkpoint
+        target = utc_midnight(earliest).replace(day=1)
+        await save_checkpoint(target, {"cash_balance": 0, "pos_balance": 0, "customers": {}})
+    
+    built = 0
+    while True:
+        target = min(next_month(target), daily_from) if target < daily_from else target + timedelta(days=1)
+        if target > today:
+            break
+        epoch = await checkpoint_epoch()
+        balances = await balances_at(target)
+        if not await save_checkpoint(target, balances):
+            continue
+        if await checkpoint_epoch() != epoch:
+            # A backdated write landed while computing; rebuild on the next run
+            stale = await db[CHECKPOINTS_COLLECTION].find_one({"as_of": target.isoformat()}, {"_id": 0, "id": 1})
+            if stale:
+                await delete_checkpoints([stale['id']])
+            break
+        built += 1
+    
+    # Daily checkpoints past the retention window thin out to month starts
+    pruned = await db[CHECKPOINTS_COLLECTION].find(
+        {"as_of": {"$lt": daily_from.isoformat(), "$not": {"$regex": "-01T00:00:00"}}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    if pruned:
+        await delete_checkpoints([c['id'] for c in pruned])
+    if built or pruned:
+        logging.info(f"Balance checkpoints: {built} built, {len(pruned)} pruned")
+
+async def run_checkpoint_builder():
+    while True:
+        try:
+            async with lease("balance-checkpoints", BALANCE_CHECKPOINT_INTERVAL_SECONDS) as acquired:
+                if acquired:
+                    for tenant_id in await tenant_ids():
+                        with tenant_scope(tenant_id):
+                            await build_checkpoints()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Balance checkpoint build failed: {str(e)}")
+        await asyncio.sleep(BALANCE_CHECKPOINT_INTERVAL_SECONDS)
+
+def start_checkpoint_builder():
+    global checkpoint_task
+    if checkpoint_task is None:
+        checkpoint_task = asyncio.create_task(run_checkpoint_builder())
+
+def stop_checkpoint_builder():
+    global checkpoint_task
+    if checkpoint_task is not None:
+        checkpoint_task.cancel()
+        checkpoint_task = None
@@ -0,0 +1,258 @@
+"""One-time startup work: indexes, data backfills and the default admin user.
+
+Runs as a background task after the app starts serving, so worker boot
+doesn't wait for MongoDB; if MongoDB is down, or a task fails, it retries
+with backoff. With several workers only the one holding the
+startup lease does the one-time part; the rest just start their own
+per-process services.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from muhasebe.balances import CHECKPOINTS_COLLECTION, CHECKPOINT_ROWS_COLLECTION, start_checkpoint_builder
+from muhasebe.changes import SYNC_COLLECTIONS, backfill_updated_seq, start_change_stream, start_tombstone_pruner
+from muhasebe.config import (
+    PROFILE_TTL_SECONDS, IDEMPOTENCY_TTL_SECONDS, STARTUP_LEASE_SECONDS, STARTUP_RETRY_INITIAL_SECONDS,
+    STARTUP_RETRY_MAX_SECONDS, DEFAULT_TENANT_ID
+)
+from muhasebe.database import db, all_tenants_db, slow_op_logger, test_db_connection
+from muhasebe.lease import lease
+from muhasebe.models import User
+from muhasebe.money import MONEY_FIELDS, to_kurus
+from muhasebe.periods import PERIODS_COLLECTION, BALANCES_COLLECTION, resume_period_close
+from muhasebe.search import build_customer_search_fields
+from muhasebe.security import pwd_context, bcrypt_pool
+from muhasebe.tenancy import TENANT_FIELD, UNSCOPED_COLLECTIONS, tenant_index
+
+# Indexes
+# Every query is tenant-scoped, so every index except the global username
+# and the TTL indexes leads with tenant_id
+IDEMPOTENCY_KEY_INDEX = ("idempotency_keys", tenant_index("key"), {"unique": True})
+INDEXES = [
+    ("users", "username", {"unique": True}),
+    ("users", tenant_index("id"), {}),
+    ("customers", tenant_index("id"), {}),
+    ("customers", tenant_index("search_key"), {}),
+    ("customers", tenant_index("search_terms"), {}),
+    ("payments", tenant_index("id"), {}),
+    ("payments", tenant_index("plan_id", "installment_no"), {}),
+    ("transactions", tenant_index("id"), {}),
+    *[(name, tenant_index("updated_seq"), {}) for name in SYNC_COLLECTIONS],
+    ("tombstones", tenant_index("updated_seq"), {}),
+    # Period close: live balances filter on these, archival scans them
+    ("transactions", tenant_index("transaction_date"), {}),
+    ("payments", tenant_index("is_paid", "payment_date"), {}),
+    (PERIODS_COLLECTION, tenant_index("period_end"), {}),
+    (BALANCES_COLLECTION, tenant_index("period_id", "customer_id"), {}),
+    # Point-in-time balances read payments by the dates they open and settle
+    ("payments", tenant_index("created_at"), {}),
+    (CHECKPOINTS_COLLECTION, tenant_index("as_of"), {"unique": True}),
+    (CHECKPOINTS_COLLECTION, tenant_index("id"), {}),
+    (CHECKPOINT_ROWS_COLLECTION, tenant_index("checkpoint_id"), {}),
+    ("profiles", tenant_index("id"), {}),
+    ("profiles", "created_at", {"expireAfterSeconds": PROFILE_TTL_SECONDS}),
+    IDEMPOTENCY_KEY_INDEX,
+    ("idempotency_keys", "created_at", {"expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS}),
+]
+
+async def ensure_indexes():
+    """Create every index, each on its own so one failure doesn't leave the
+    rest (unique idempotency keys, TTLs) missing; raises if any failed"""
+    await remove_duplicate_users()
+    failed = []
+    for name, keys, options in INDEXES:
+        try:
+            await db[name].create_index(keys, **options)
+        except Exception as e:
+            logging.error(f"Error creating index {keys} on {name}: {str(e)}")
+            failed.append(name)
+    try:
+        await drop_untenanted_indexes()
+    except Exception as e:
+        logging.error(f"Error dropping superseded indexes: {str(e)}")
+        failed.append("untenanted")
+    if failed:
+        raise RuntimeError(f"Indexes incomplete on {', '.join(sorted(set(failed)))}")
+    logging.info("Indexes ensured")
+
+async def ensure_idempotency_index():
+    """Replays rely on this unique index, so the idempotency middleware
+    creates it before accepting its first key instead of waiting for
+    ensure_indexes"""
+    name, keys, options = IDEMPOTENCY_KEY_INDEX
+    await db[name].create_index(keys, **options)
+
+async def remove_duplicate_users():
+    """Keep the oldest user of each username. Concurrent first logins could
+    each create the admin before the unique index existed, and the index
+    can't be built while they remain."""
+    duplicates = all_tenants_db.users.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$username", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ])
+    async for group in duplicates:
+        await all_tenants_db.users.delete_many({"_id": {"$in": group['ids'][1:]}})
+        logging.warning(f"Removed {len(group['ids']) - 1} duplicate users named {group['_id']}")
+
+# Indexes from before tenancy, superseded by the tenant_id-led ones above.
+# The unique as_of index would also reject two tenants' checkpoints.
+UNTENANTED_INDEXES = {
+    "customers": ["id_1", "search_key_1", "search_terms_1", "updated_seq_1"],
+    "payments": ["updated_seq_1", "is_paid_1_payment_date_1", "created_at_1"],
+    "transactions": ["updated_seq_1", "transaction_date_1"],
+    "tombstones": ["updated_seq_1"],
+    "profiles": ["id_1"],
+    PERIODS_COLLECTION: ["period_end_1"],
+    BALANCES_COLLECTION: ["period_id_1_customer_id_1"],
+    CHECKPOINTS_COLLECTION: ["as_of_1", "id_1"],
+    CHECKPOINT_ROWS_COLLECTION: ["checkpoint_id_1"],
+}
+
+async def drop_untenanted_indexes():
+    for name, indexes in UNTENANTED_INDEXES.items():
+        existing = await all_tenants_db[name].index_information()
+        for index in indexes:
+            if index in existing:
+                await all_tenants_db[name].drop_index(index)
+
+async def backfill_tenant_ids():
+    """Assign documents written before tenancy to the default tenant"""
+    for name in await all_tenants_db.list_collection_names():
+        if name in UNSCOPED_COLLECTIONS or name.startswith("system."):
+            continue
+        await all_tenants_db[name].update_many(
+            {TENANT_FIELD: {"$exists": False}}, {"$set": {TENANT_FIELD: DEFAULT_TENANT_ID}}
+        )
+
+MONEY_MIGRATION_BATCH_SIZE = 1000
+
+async def migrate_money_fields():
+    """Convert float lira amounts, written before kuruş storage, in batches.
+    
+    The documents still holding a float are the remaining work, so an
+    interrupted run continues where it stopped. Each update only applies
+    while its fields are still floats; a write that stored kuruş in between
+    wins. Completion is recorded so later startups skip the scans.
+    """
+    if await all_tenants_db.counters.find_one({"_id": "money_kurus_migration"}):
+        return
+    converted = 0
+    for name in sorted(await all_tenants_db.list_collection_names()):
+        # payments_archive_2024 holds payments
+        fields = MONEY_FIELDS.get(name.split("_archive_")[0])
+        if not fields:
+            continue
+        collection = all_tenants_db[name]
+        while True:
+            batch = await collection.find(
+                {"$or": [{field: {"$type": "double"}} for field in fields]}, {field: 1 for field in fields}
+            ).limit(MONEY_MIGRATION_BATCH_SIZE).to_list(MONEY_MIGRATION_BATCH_SIZE)
+            if not batch:
+                break
+            requests = []
+            for doc in batch:
+                floats = [field for field in fields if isinstance(doc.get(field), float)]
+                requests.append(UpdateOne(
+                    {"_id": doc['_id'], **{field: {"$type": "double"} for field in floats}},
+                    {"$set": {field: to_kurus(doc[field]) for field in floats}}
+                ))
+            await collection.bulk_write(requests, ordered=False)
+            converted += len(batch)
+    await all_tenants_db.counters.update_one(
+        {"_id": "money_kurus_migration"},
+        {"$set": {"done_at": datetime.now(timezone.utc).isoformat(), "converted": converted}},
+        upsert=True
+    )
+    logging.info(f"Money fields converted to kuruş: {converted} documents")
+
+async def backfill_customer_search_fields():
+    """Add search keys to customers created before /customers/search existed"""
+    cursor = db.customers.find({"search_key": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1, "phone": 1, "tax_number": 1})
+    async for customer in cursor:
+        await db.customers.update_one(
+            {"id": customer['id']},
+            {"$set": build_customer_search_fields(customer.get('name', ''), customer.get('phone'), customer.get('tax_number'))}
+        )
+
+# Initialize admin user
+async def init_admin():
+    admin = await db.users.find_one({"username": "admin"})
+    if not admin:
+        hashed_password = await bcrypt_pool.run(pwd_context.hash, "admin123")
+        admin_user = User(
+            username="admin",
+            password=hashed_password,
+            role="admin"
+        )
+        doc = admin_user.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        await db.users.insert_one(doc)
+        logging.info("Admin user created: admin/admin123")
+    else:
+        logging.info("Admin user already exists")
+
+# Startup
+# All idempotent, so a failed one is simply run again on the next attempt
+ONE_TIME_TASKS = (
+    backfill_tenant_ids,
+    ensure_indexes,
+    migrate_money_fields,
+    backfill_customer_search_fields,
+    backfill_updated_seq,
+    init_admin,
+)
+
+async def retry_with_backoff(what: str, step):
+    """Await step() until it succeeds, waiting twice as long after each failure"""
+    delay = STARTUP_RETRY_INITIAL_SECONDS
+    while True:
+        try:
+            return await step()
+        except Exception as e:
+            logging.error(f"{what} failed, retrying in {delay:.0f}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+
+async def wait_for_database():
+    if not await test_db_connection():
+        raise ConnectionError("MongoDB is unreachable")
+
+async def run_one_time_tasks(pending: list):
+    """Run the pending tasks under the startup lease, dropping each one that
+    succeeds; raises while any remain"""
+    async with lease("startup-tasks", STARTUP_LEASE_SECONDS) as acquired:
+        if not acquired:
+            logging.info("Another worker is running the startup tasks")
+            return
+        for task in list(pending):
+            try:
+                await task()
+                pending.remove(task)
+            except Exception as e:
+                logging.error(f"Startup task {task.__name__} failed: {str(e)}")
+    if pending:
+        raise RuntimeError(f"{', '.join(task.__name__ for task in pending)} still pending")
+
+async def run_startup_tasks():
+    """Nothing here gives up: a database that is down at boot, or a task that
+    fails, is retried with backoff until the worker shuts down"""
+    await retry_with_backoff("Database connection", wait_for_database)
+    
+    # Per-process services that don't depend on the one-time work
+    await retry_with_backoff("Slow-op logger", lambda: slow_op_logger.start(db))
+    start_change_stream()
+    
+    pending = list(ONE_TIME_TASKS)
+    await retry_with_backoff("Startup tasks", lambda: run_one_time_tasks(pending))
+    
+    # Checkpoints must not be built from documents the backfills haven't reached
+    start_checkpoint_builder()
+    start_tombstone_pruner()
+    logging.info("Startup tasks complete")
+    
+    # Runs on whichever worker takes the period-close lease
+    await retry_with_backoff("Period close resume", resume_period_close)
@@ -0,0 +1,228 @@
+"""Everything that happens around a write: sync sequence numbers, tombstones,
+invalidating coalesced reads and publishing live change events."""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from events import EventBus
+from metrics import REGISTRY, SingleFlightCollector
+from singleflight import SingleFlight
+from muhasebe.config import (
+    SINGLEFLIGHT_TTL, CHANGE_STREAMS_ENABLED, SYNC_WATERMARK_LAG, SYNC_TOMBSTONE_RETENTION_DAYS,
+    SYNC_TOMBSTONE_PRUNE_INTERVAL_SECONDS
+)
+from muhasebe.database import db, all_tenants_db
+from muhasebe.lease import lease
+from muhasebe.money import delta_to_lira
+from muhasebe.tenancy import TENANT_FIELD, current_tenant
+
+# Sync sequence
+# Every write to customers, payments and transactions is stamped with a value
+# from a single counter so /sync can return "everything after token N".
+SYNC_COLLECTIONS = ("customers", "payments", "transactions")
+
+async def next_seq(count: int = 1, session=None) -> int:
+    """Reserve `count` sequence values and return the highest of them. With a
+    transaction's session the reservation commits or rolls back with it, and
+    other writers wait on the counter until it does, so reserve as late in
+    the transaction as the writes allow."""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "updated_seq"},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if session is None:
+        # An uncommitted value may be handed out again after a rollback
+        observe_seq(counter['value'])
+    return counter['value']
+
+async def current_seq() -> int:
+    counter = await db.counters.find_one({"_id": "updated_seq"})
+    value = counter['value'] if counter else 0
+    observe_seq(value)
+    return value
+
+# Sync watermark
+# A writer reserves its seq before its write lands, so a reader can see the
+# counter at N while the document with seq N isn't there yet; a token of N
+# would skip it for good. /sync hands out a watermark instead: a counter value
+# this process read at least SYNC_WATERMARK_LAG seconds ago, by when every
+# write holding a seq up to it has landed. Changes above the watermark are
+# returned again on the next call; clients apply them by id.
+_seq_samples = deque()  # (monotonic time, counter value), oldest first
+SEQ_SAMPLE_INTERVAL = 1.0
+
+def observe_seq(value: int):
+    now = time.monotonic()
+    # One sample a second is plenty; skipping a newer value only makes the
+    # watermark lower, never unsafe
+    if not _seq_samples or _seq_samples[-1][0] <= now - SEQ_SAMPLE_INTERVAL:
+        _seq_samples.append((now, value))
+    # Keep the newest sample that is old enough, and the younger ones
+    while len(_seq_samples) > 1 and _seq_samples[1][0] <= now - SYNC_WATERMARK_LAG:
+        _seq_samples.popleft()
+
+async def sync_watermark(since: int = 0) -> int:
+    """Highest token that can't skip a write still in flight; `since` when this
+    process hasn't been up for SYNC_WATERMARK_LAG yet"""
+    observe_seq(await current_seq())
+    if _seq_samples and _seq_samples[0][0] <= time.monotonic() - SYNC_WATERMARK_LAG:
+        return max(since, _seq_samples[0][1])
+    return since
+
+async def record_tombstone(collection: str, entity_id: str) -> int:
+    seq = await next_seq()
+    await db.tombstones.insert_one({
+        "collection": collection,
+        "id": entity_id,
+        "updated_seq": seq,
+        "deleted_at": datetime.now(timezone.utc).isoformat()
+    })
+    return seq
+
+# Tombstone retention
+# A tombstone only matters to clients that synced before the deletion. Once
+# past SYNC_TOMBSTONE_RETENTION_DAYS and below the watermark it is pruned,
+# after the highest pruned seq has been recorded: a /sync token below that
+# may have missed deletions and gets 410, and the client starts over from 0.
+TOMBSTONES_PRUNED_SEQ = "tombstones_pruned_seq"
+tombstone_prune_task = None
+
+async def tombstones_pruned_seq() -> int:
+    counter = await db.counters.find_one({"_id": TOMBSTONES_PRUNED_SEQ})
+    return counter['value'] if counter else 0
+
+async def prune_tombstones() -> int:
+    """Delete expired tombstones of every tenant; returns how many"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)).isoformat()
+    # 0 until this process has watched the counter for SYNC_WATERMARK_LAG
+    watermark = await sync_watermark()
+    newest = await all_tenants_db.tombstones.aggregate([
+        {"$match": {"deleted_at": {"$lt": cutoff}, "updated_seq": {"$lte": watermark}}},
+        {"$group": {"_id": None, "seq": {"$max": "$updated_seq"}}}
+    ]).to_list(1)
+    if not newest:
+        return 0
+    pruned_seq = newest[0]['seq']
+    await db.counters.update_one({"_id": TOMBSTONES_PRUNED_SEQ}, {"$max": {"value": pruned_seq}}, upsert=True)
+    result = await all_tenants_db.tombstones.delete_many(
+        {"deleted_at": {"$lt": cutoff}, "updated_seq": {"$lte": pruned_seq}}
+    )
+    return result.deleted_count
+
+async def run_tombstone_pruner():
+    while True:
+        try:
+            async with lease("tombstone-prune", SYNC_TOMBSTONE_PRUNE_INTERVAL_SECONDS) as acquired:
+                if acquired:
+                    pruned = await prune_tombstones()
+                    if pruned:
+                        logging.info(f"Pruned {pruned} sync tombstones")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Tombstone pruning failed: {str(e)}")
+        await asyncio.sleep(SYNC_TOMBSTONE_PRUNE_INTERVAL_SECONDS)
+
+def start_tombstone_pruner():
+    global tombstone_prune_task
+    if tombstone_prune_task is None:
+        tombstone_prune_task = asyncio.create_task(run_tombstone_pruner())
+
+def stop_tombstone_pruner():
+    global tombstone_prune_task
+    if tombstone_prune_task is not None:
+        tombstone_prune_task.cancel()
+        tombstone_prune_task = None
+
+async def backfill_updated_seq():
+    """Stamp documents written before sync existed so a full sync returns them"""
+    for name in SYNC_COLLECTIONS:
+        cursor = db[name].find({"updated_seq": {"$exists": False}}, {"_id": 0, "id": 1})
+        async for doc in cursor:
+            await db[name].update_one({"id": doc['id']}, {"$set": {"updated_seq": await next_seq()}})
+
+# Request coalescing
+# Identical concurrent requests to the heavy read endpoints share one
+# computation. SINGLEFLIGHT_TTL_SECONDS additionally reuses a finished result
+# briefly; any write clears it. Keys include the tenant.
+dashboard_flight = SingleFlight("dashboard_stats", ttl=SINGLEFLIGHT_TTL)
+summary_flight = SingleFlight("customer_summary", ttl=SINGLEFLIGHT_TTL)
+export_flight = SingleFlight("reports_export", ttl=SINGLEFLIGHT_TTL)
+READ_FLIGHTS = (dashboard_flight, summary_flight, export_flight)
+
+REGISTRY.register(SingleFlightCollector(READ_FLIGHTS))
+
+def invalidate_read_flights():
+    for flight in READ_FLIGHTS:
+        flight.clear()
+
+# Live change events
+# Handlers publish to the in-process bus after each committed write, with
+# balance deltas computed in kuruş and sent in lira like the stats. With
+# EVENTS_CHANGE_STREAMS=1 a MongoDB change stream (replica set only) feeds the
+# bus instead, so every worker sees writes made by the others; those events
+# carry no balance delta and clients refetch the stats.
+event_bus = EventBus()
+change_stream_task = None
+
+def publish_change(collection: str, action: str, entity_id: str, seq: int, delta: Optional[dict] = None):
+    invalidate_read_flights()
+    if CHANGE_STREAMS_ENABLED:
+        return
+    event_bus.publish({
+        "collection": collection,
+        "action": action,
+        "id": entity_id,
+        "seq": seq,
+        "delta": delta_to_lira(delta or {})
+    }, topic=current_tenant.get())
+
+async def watch_change_streams():
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": list(SYNC_COLLECTIONS) + ["tombstones"]},
+        "operationType": {"$in": ["insert", "update", "replace"]}
+    }}]
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get('fullDocument')
+                    if not doc or 'id' not in doc:
+                        continue
+                    if change['ns']['coll'] == "tombstones":
+                        collection, action = doc['collection'], "deleted"
+                    else:
+                        collection = change['ns']['coll']
+                        action = "created" if change['operationType'] == "insert" else "updated"
+                    invalidate_read_flights()
+                    event_bus.publish({
+                        "collection": collection,
+                        "action": action,
+                        "id": doc['id'],
+                        "seq": doc.get('updated_seq'),
+                        "delta": None
+                    }, topic=doc.get(TENANT_FIELD))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Change stream error, retrying: {str(e)}")
+            await asyncio.sleep(5)
+
+def start_change_stream():
+    global change_stream_task
+    if CHANGE_STREAMS_ENABLED and change_stream_task is None:
+        change_stream_task = asyncio.create_task(watch_change_streams())
+
+def stop_change_stream():
+    global change_stream_task
+    if change_stream_task is not None:
+        change_stream_task.cancel()
+        change_stream_task = None
@@ -0,0 +1,99 @@
+"""Settings read from the environment (and backend/.env) once, at import.
+
+Reading settings has no side effects beyond the dotenv load; connecting to
+MongoDB happens lazily in muhasebe.database.
+"""
+import os
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+# Connection pool, per worker process: with N workers the server sees up to
+# N * MONGO_MAX_POOL_SIZE connections
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+
+# Read routing per endpoint group. Writes, and every read outside these
+# groups (cashier flows such as partial payments), stay on the primary.
+# Max staleness is in seconds; MongoDB requires at least 90 (-1: no bound).
+READ_GROUPS = {
+    group: {
+        "read_preference": os.environ.get(f'READ_PREFERENCE_{group.upper()}', 'secondaryPreferred'),
+        "read_concern": os.environ.get(f'READ_CONCERN_{group.upper()}', 'local'),
+        "max_staleness": int(os.environ.get(f'READ_MAX_STALENESS_{group.upper()}', '90')),
+    }
+    for group in ("reports", "dashboard", "statements")
+}
+
+# One-time startup tasks run on a single worker under this lease
+STARTUP_LEASE_SECONDS = float(os.environ.get('STARTUP_LEASE_SECONDS', '60'))
+
+# Startup work that fails (MongoDB down at boot, ...) is retried with
+# exponential backoff between these bounds
+STARTUP_RETRY_INITIAL_SECONDS = float(os.environ.get('STARTUP_RETRY_INITIAL_SECONDS', '1'))
+STARTUP_RETRY_MAX_SECONDS = float(os.environ.get('STARTUP_RETRY_MAX_SECONDS', '60'))
+
+# Auth
+SECRET_KEY = os.environ.get('SECRET_KEY', 'opensoftt-default-secret-key-change-in-production')
+if SECRET_KEY == 'opensoftt-default-secret-key-change-in-production':
+    logging.warning("WARNING: Using default SECRET_KEY. Set SECRET_KEY environment variable in production!")
+ALGORITHM = "HS256"
+
+# Tenancy: company of the initial admin and of work outside a request
+DEFAULT_TENANT_ID = os.environ.get('DEFAULT_TENANT_ID', 'default')
+
+# CORS
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+
+# Response compression (gzip, or brotli when installed and accepted)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+
+# Thread pools for blocking work
+BCRYPT_POOL_SIZE = int(os.environ.get('BCRYPT_POOL_SIZE', '4'))
+EXPORT_POOL_SIZE = int(os.environ.get('EXPORT_POOL_SIZE', '2'))
+
+# Request coalescing on heavy read endpoints
+SINGLEFLIGHT_TTL = float(os.environ.get('SINGLEFLIGHT_TTL_SECONDS', '0'))
+
+# Live change events
+CHANGE_STREAMS_ENABLED = os.environ.get('EVENTS_CHANGE_STREAMS', '0') == '1'
+SSE_HEARTBEAT_SECONDS = 15
+
+# /sync tokens trail the counter by this much: the longest a write may take
+# between reserving its seq and landing
+SYNC_WATERMARK_LAG = float(os.environ.get('SYNC_WATERMARK_LAG_SECONDS', '30'))
+# Most documents one /sync call returns (clients may ask for fewer)
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '1000'))
+# Tombstones are pruned this long after the deletion; clients whose token is
+# older than the newest pruned one do a full sync
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', '90'))
+SYNC_TOMBSTONE_PRUNE_INTERVAL_SECONDS = float(os.environ.get('SYNC_TOMBSTONE_PRUNE_INTERVAL_SECONDS', '3600'))
+
+# Slow operation log: commands over SLOW_OP_THRESHOLD_MS (0 disables) are
+# recorded in the capped slow_ops collection, a sample of them with explain
+SLOW_OP_THRESHOLD_MS = float(os.environ.get('SLOW_OP_THRESHOLD_MS', '100'))
+SLOW_OP_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_OP_EXPLAIN_SAMPLE_RATE', '0.2'))
+
+# On-demand request profiles
+PROFILE_TTL_SECONDS = int(os.environ.get('PROFILE_TTL_SECONDS', '86400'))
+
+# Responses stored for Idempotency-Key replays
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+# A request that stops renewing its key for this long (crashed worker) is
+# taken over by the next retry; keep it above GRACEFUL_TIMEOUT
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '120'))
+
+# Point-in-time balances: checkpoints are daily for the last
+# BALANCE_CHECKPOINT_DAILY_DAYS days and monthly before that
+BALANCE_CHECKPOINT_DAILY_DAYS = int(os.environ.get('BALANCE_CHECKPOINT_DAILY_DAYS', '62'))
+BALANCE_CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get('BALANCE_CHECKPOINT_INTERVAL_SECONDS', '3600'))
@@ -0,0 +1,164 @@
+"""Lazily created Motor client.
+
+`db` can be imported anywhere at module level; the client is only created
+on first use, so importing the app does not touch the network. Collections
+taken from `db` are scoped to the current tenant (see muhasebe.tenancy);
+`all_tenants_db` is the unscoped database.
+
+Inside `read_group("reports")` (or "dashboard", "statements") collections
+also carry that group's read preference and read concern from
+config.READ_GROUPS, so heavy reads can go to secondaries while writes and
+cashier reads stay on the primary.
+
+`write_transaction()` groups multi-collection writes in a transaction where
+the deployment supports one (replica set or sharded cluster).
+"""
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.errors import PyMongoError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, make_read_preference, read_pref_mode_from_name
+
+from metrics import MongoCommandListener, MongoPoolListener
+from slowops import SlowOpLogger
+from muhasebe import config
+from muhasebe.tenancy import TENANT_FIELD, UNSCOPED_COLLECTIONS, TenantCollection, current_tenant
+
+slow_op_logger = SlowOpLogger(
+    threshold_ms=config.SLOW_OP_THRESHOLD_MS,
+    explain_sample_rate=config.SLOW_OP_EXPLAIN_SAMPLE_RATE,
+    tenant=current_tenant.get
+)
+
+_client: Optional[AsyncIOMotorClient] = None
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        if not config.MONGO_URL or not config.DB_NAME:
+            raise RuntimeError("MONGO_URL and DB_NAME must be set")
+        _client = AsyncIOMotorClient(
+            config.MONGO_URL,
+            maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=config.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=config.MONGO_MAX_IDLE_TIME_MS,
+            event_listeners=[MongoCommandListener(), MongoPoolListener(), slow_op_logger]
+        )
+    return _client
+
+def get_db():
+    return get_client()[config.DB_NAME]
+
+# Read routing
+current_read_group: ContextVar[Optional[str]] = ContextVar("current_read_group", default=None)
+
+def build_read_options(settings: dict) -> dict:
+    mode = read_pref_mode_from_name(settings['read_preference'])
+    preference = make_read_preference(mode, None, max_staleness=settings['max_staleness'] if mode else -1)
+    return {"read_preference": preference, "read_concern": ReadConcern(settings['read_concern'])}
+
+READ_OPTIONS = {group: build_read_options(settings) for group, settings in config.READ_GROUPS.items()}
+
+@contextmanager
+def read_group(group: str):
+    token = current_read_group.set(group)
+    try:
+        yield
+    finally:
+        current_read_group.reset(token)
+
+def read_routing() -> dict:
+    """Effective read preference and concern of each endpoint group"""
+    return {
+        group: {"read_preference": options['read_preference'].document, "read_concern": options['read_concern'].level}
+        for group, options in READ_OPTIONS.items()
+    }
+
+class _LazyDatabase:
+    """Stands in for the Motor database until the client exists"""
+
+    def __init__(self, scoped: bool):
+        self.scoped = scoped
+
+    def _collection(self, collection):
+        group = current_read_group.get()
+        if group is not None:
+            options = READ_OPTIONS[group]
+            if options['read_preference'] != Primary() or options['read_concern'].level:
+                collection = collection.with_options(**options)
+        if self.scoped and collection.name not in UNSCOPED_COLLECTIONS:
+            return TenantCollection(collection)
+        return collection
+
+    def __getattr__(self, name):
+        value = getattr(get_db(), name)
+        if isinstance(value, AsyncIOMotorCollection):
+            return self._collection(value)
+        return value
+
+    def __getitem__(self, name):
+        return self._collection(get_db()[name])
+
+db = _LazyDatabase(scoped=True)
+all_tenants_db = _LazyDatabase(scoped=False)
+
+# Transactions
+_supports_transactions: Optional[bool] = None
+
+async def supports_transactions() -> bool:
+    """Replica sets and mongos support transactions, a standalone server doesn't"""
+    global _supports_transactions
+    if _supports_transactions is None:
+        try:
+            hello = await get_client().admin.command("hello")
+            _supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except Exception as e:
+            logging.warning(f"Could not detect transaction support: {str(e)}")
+            _supports_transactions = False
+    return _supports_transactions
+
+@asynccontextmanager
+async def write_transaction():
+    """A session with a started transaction, committed when the block exits
+    and aborted if it raises. On a standalone server yields None and the
+    block's writes (which pass session=None) apply one by one.
+    
+    Two transactions writing the same document (the sync counter, say)
+    conflict and one of them aborts; the client gets 409 and may retry."""
+    if not await supports_transactions():
+        yield None
+        return
+    async with await get_client().start_session() as session:
+        try:
+            async with session.start_transaction():
+                yield session
+        except PyMongoError as e:
+            if e.has_error_label("TransientTransactionError"):
+                raise HTTPException(status_code=409, detail="Kayıt aynı anda değiştirildi, lütfen tekrar deneyin") from e
+            raise
+
+async def tenant_ids() -> list:
+    """Every tenant that has at least one user"""
+    return await all_tenants_db.users.distinct(TENANT_FIELD)
+
+# Test MongoDB connection on startup
+async def test_db_connection():
+    try:
+        await get_client().admin.command('ping')
+        logging.info("MongoDB connection successful")
+        return True
+    except Exception as e:
+        logging.error(f"MongoDB connection failed: {str(e)}")
+        return False
+
+def close_client():
+    global _client, _supports_transactions
+    if _client is not None:
+        _client.close()
+        _client = None
+    _supports_transactions = None
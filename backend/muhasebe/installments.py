@@ -0,0 +1,30 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import List
+
+# Installment (taksit) plans
+# A plan is a set of ordinary payments sharing a plan_id. Amounts are split
+# in kuruş so the installments add up to the total exactly; the rounding
+# remainder goes on the last one.
+INSTALLMENT_INTERVALS = ("weekly", "monthly")
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Same day `months` later, clamped to the end of shorter months"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+def due_dates(first_due_date: datetime, count: int, interval: str, every: int = 1) -> List[datetime]:
+    if interval == "weekly":
+        return [first_due_date + timedelta(weeks=every * i) for i in range(count)]
+    # Always offset from the first date so the 31st doesn't drift to the 28th
+    return [add_months(first_due_date, every * i) for i in range(count)]
+
+def split_amount(total_kurus: int, count: int) -> List[int]:
+    if total_kurus < count:
+        # Some installments would be 0 kuruş
+        raise ValueError(f"{total_kurus} kuruş can't be split into {count} installments")
+    base = total_kurus // count
+    return [base] * (count - 1) + [total_kurus - base * (count - 1)]
@@ -0,0 +1,63 @@
+"""MongoDB-backed leases for work that must run on only one worker at a time.
+
+A lease is a document in `leases` keyed by name. Taking it only succeeds when
+it is free, expired or already ours; a duplicate-key error on the upsert
+means another worker holds it. While held, the lease is renewed in the
+background so long tasks don't lose it, and it expires on its own if the
+holder dies.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from muhasebe.database import db
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+async def acquire_lease(name: str, ttl_seconds: float) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        await db.leases.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": WORKER_ID}]},
+            {"$set": {
+                "owner": WORKER_ID,
+                "acquired_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds)
+            }},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def release_lease(name: str):
+    await db.leases.delete_one({"_id": name, "owner": WORKER_ID})
+
+async def _renew_lease(name: str, ttl_seconds: float):
+    while True:
+        await asyncio.sleep(ttl_seconds / 3)
+        try:
+            await db.leases.update_one(
+                {"_id": name, "owner": WORKER_ID},
+                {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)}}
+            )
+        except Exception as e:
+            logging.error(f"Failed to renew lease {name}: {str(e)}")
+
+@asynccontextmanager
+async def lease(name: str, ttl_seconds: float = 60):
+    """Yield True if this worker holds the lease for the duration of the block"""
+    acquired = await acquire_lease(name, ttl_seconds)
+    renew_task = asyncio.create_task(_renew_lease(name, ttl_seconds)) if acquired else None
+    try:
+        yield acquired
+    finally:
+        if renew_task:
+            renew_task.cancel()
+            await release_lease(name)
@@ -0,0 +1,146 @@
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict
+from typing import Annotated, Optional
+import uuid
+from datetime import datetime, timezone
+
+from muhasebe.money import to_kurus, to_lira
+
+# Lira amount, rounded to whole kuruş as it is stored
+Lira = Annotated[float, AfterValidator(lambda value: to_lira(to_kurus(value)))]
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    username: str
+    password: str
+    role: str = "user"
+    tenant_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class UserCreate(BaseModel):
+    username: str
+    password: str
+    role: str = "user"
+    tenant_id: Optional[str] = None  # another company; default-tenant admins only
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    username: str
+    role: str
+    tenant_id: Optional[str] = None
+    created_at: datetime
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class LoginResponse(BaseModel):
+    token: str
+    user: UserResponse
+
+class ChangePasswordRequest(BaseModel):
+    username: str
+    old_password: str
+    new_password: str
+
+class Customer(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    tax_number: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class CustomerCreate(BaseModel):
+    name: str
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    tax_number: Optional[str] = None
+    notes: Optional[str] = None
+
+class Payment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    customer_id: str
+    customer_name: str
+    amount: Lira
+    paid_amount: Lira = 0.0
+    payment_type: str  # "alacak" or "borc"
+    is_paid: bool = False
+    payment_date: Optional[datetime] = None
+    due_date: datetime
+    description: Optional[str] = None
+    plan_id: Optional[str] = None  # installment plan this payment belongs to
+    installment_no: Optional[int] = None
+    installment_count: Optional[int] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class PaymentCreate(BaseModel):
+    customer_id: str
+    customer_name: str
+    amount: Lira
+    payment_type: str
+    is_paid: bool = False
+    payment_date: Optional[datetime] = None
+    due_date: datetime
+    description: Optional[str] = None
+
+class PaymentUpdate(BaseModel):
+    amount: Optional[Lira] = None
+    paid_amount: Optional[Lira] = None
+    is_paid: Optional[bool] = None
+    payment_date: Optional[datetime] = None
+    due_date: Optional[datetime] = None
+    description: Optional[str] = None
+
+class InstallmentPlanCreate(BaseModel):
+    customer_id: str
+    customer_name: str
+    total_amount: Lira = Field(gt=0)
+    installment_count: int = Field(ge=1, le=360)
+    payment_type: str
+    first_due_date: datetime
+    interval: str = "monthly"  # "weekly" or "monthly"
+    every: int = Field(default=1, ge=1)  # e.g. every 2 months
+    description: Optional[str] = None
+
+class InstallmentReschedule(BaseModel):
+    first_due_date: datetime  # new due date of the first unpaid installment
+    interval: str = "monthly"
+    every: int = Field(default=1, ge=1)
+
+class PartialPaymentRequest(BaseModel):
+    payment_id: str
+    amount: Lira = Field(gt=0)
+
+class Transaction(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str  # "gelir" or "gider"
+    payment_method: str  # "nakit" or "pos"
+    amount: Lira
+    description: str
+    transaction_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class TransactionCreate(BaseModel):
+    type: str
+    payment_method: str
+    amount: Lira
+    description: str
+    transaction_date: Optional[datetime] = None
+
+class DashboardStats(BaseModel):
+    total_receivable: float
+    total_payable: float
+    total_customers: int
+    cash_balance: float
+    pos_balance: float
+    total_balance: float
+
+class PeriodCloseRequest(BaseModel):
+    period_end: datetime  # exclusive: records dated before this are closed
+    label: Optional[str] = None
@@ -0,0 +1,98 @@
+"""Money amounts: integer kuruş in the database, lira at the API.
+
+Payment and transaction amounts are stored as integer kuruş, so sums are
+exact, MongoDB's $sum can total them in the database, and comparisons such
+as "is this payment fully paid" don't depend on float rounding. Requests
+and responses keep using lira; handlers convert with store_amounts() before
+a write and serve_amounts() before returning stored documents.
+
+Documents written before the conversion hold float lira until the startup
+migration (bootstrap.migrate_money_fields) reaches them. Until then readers
+treat a stored float as lira and an integer as kuruş: as_kurus() in Python,
+kurus_expr() in aggregations.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+
+KURUS_PER_LIRA = 100
+
+# Stored amount fields per collection: payments and transactions (and their
+# archives), then the period close and balance checkpoint snapshots
+MONEY_FIELDS = {
+    "payments": ("amount", "paid_amount"),
+    "transactions": ("amount",),
+    "period_closes": ("cash_balance", "pos_balance"),
+    "period_balances": ("total_debt", "total_paid", "total_remaining"),
+    "balance_checkpoints": ("cash_balance", "pos_balance"),
+    "balance_checkpoint_customers": ("receivable", "payable"),
+}
+
+# Keys of live dashboard deltas (events.payment_contribution, ...) that are amounts
+MONEY_DELTA_KEYS = ("total_receivable", "total_payable", "cash_balance", "pos_balance", "total_balance")
+
+def to_kurus(lira) -> int:
+    # Through a decimal, so 0.29 is 29 kuruş and not 28.999...; a float keeps
+    # 15 significant digits, as MongoDB's $toDecimal does in kurus_expr, and
+    # halves round away from zero there too
+    text = format(lira, '.15g') if isinstance(lira, float) else str(lira)
+    return int((Decimal(text) * KURUS_PER_LIRA).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def to_lira(kurus: int) -> float:
+    return kurus / KURUS_PER_LIRA
+
+def as_kurus(value) -> int:
+    """A stored amount in kuruş; floats are lira written before the migration"""
+    if value is None:
+        return 0
+    if isinstance(value, float):
+        return to_kurus(value)
+    return int(value)
+
+def kurus_expr(field: str) -> dict:
+    """Aggregation expression for a stored amount in kuruş, see as_kurus.
+    
+    Rounds exactly like to_kurus. $round would work on the binary double and
+    round half to even, so 1.005 would come out as 100 here and 101 there.
+    """
+    path = f"${field}"
+    return {"$cond": [
+        {"$eq": [{"$type": path}, "double"]},
+        {"$let": {
+            "vars": {"scaled": {"$multiply": [{"$toDecimal": path}, KURUS_PER_LIRA]}},
+            "in": {"$toLong": {"$trunc": {"$add": [
+                "$$scaled", {"$cond": [{"$lt": ["$$scaled", 0]}, -0.5, 0.5]}
+            ]}}}
+        }},
+        {"$ifNull": [path, 0]}
+    ]}
+
+def signed_amount_expr() -> dict:
+    """A transaction's amount in kuruş, negative for gider"""
+    amount = kurus_expr("amount")
+    return {"$cond": [{"$eq": ["$type", "gider"]}, {"$multiply": [amount, -1]}, amount]}
+
+def store_amounts(doc: dict, kind: str) -> dict:
+    """Lira amounts of a document built from a request model -> kuruş, in place"""
+    for field in MONEY_FIELDS[kind]:
+        if doc.get(field) is not None:
+            doc[field] = to_kurus(doc[field])
+    return doc
+
+def load_amounts(doc: Optional[dict], kind: str) -> Optional[dict]:
+    """Stored amounts -> kuruş integers, in place, whatever their age"""
+    if doc:
+        for field in MONEY_FIELDS[kind]:
+            if field in doc:
+                doc[field] = as_kurus(doc[field])
+    return doc
+
+def serve_amounts(doc: Optional[dict], kind: str) -> Optional[dict]:
+    """Stored amounts -> lira for a response, in place"""
+    if doc:
+        for field in MONEY_FIELDS[kind]:
+            if field in doc:
+                doc[field] = to_lira(as_kurus(doc[field]))
+    return doc
+
+def delta_to_lira(delta: dict) -> dict:
+    return {key: to_lira(value) if key in MONEY_DELTA_KEYS else value for key, value in delta.items()}
@@ -0,0 +1,287 @@
+"""Period close (dönem kapanışı) and archival of settled records.
+
+Closing a period at `period_end` (exclusive):
+
+1. The close is recorded as `closing`. From then on nothing dated before
+   period_end can be written, changed or deleted.
+2. The closing kasa/POS balances and per-customer payment totals are
+   snapshotted, carried forward from the previous close, and the close becomes
+   `archiving`. From here live balances are the snapshot plus whatever lies
+   after period_end, whether or not it has been moved yet.
+3. Fully paid payments settled before period_end and the period's
+   transactions are moved in batches to per-year archive collections
+   (payments_archive_2024, ...), with sync tombstones, and the close is `done`.
+
+Every step can be repeated, so an interrupted close is picked up again on
+the next startup. Reports read live and archive collections together.
+"""
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+
+from muhasebe.changes import current_seq, next_seq, publish_change
+from muhasebe.config import DEFAULT_TENANT_ID
+from muhasebe.database import db, all_tenants_db
+from muhasebe.lease import lease
+from muhasebe.money import as_kurus, kurus_expr, signed_amount_expr
+from muhasebe.tenancy import TENANT_FIELD, current_tenant, tenant_index, tenant_scope
+
+PERIODS_COLLECTION = "period_closes"
+BALANCES_COLLECTION = "period_balances"
+ARCHIVE_BATCH_SIZE = 1000
+CLOSE_LEASE_SECONDS = 120
+
+# A close in one of these states has a snapshot that live balances start from
+SNAPSHOT_STATUSES = ("archiving", "done")
+
+_close_tasks = set()
+
+# Archives are read by date range for reports and point-in-time balances
+ARCHIVE_INDEXES = {
+    "payments": [tenant_index("id"), tenant_index("created_at"), tenant_index("is_paid", "payment_date")],
+    "transactions": [tenant_index("id"), tenant_index("transaction_date")],
+}
+
+def archive_collection(kind: str, year: str) -> str:
+    return f"{kind}_archive_{year}"
+
+def settled_before(period_end: str) -> dict:
+    """Payments that were fully paid before period_end"""
+    return {"is_paid": True, "$or": [
+        {"payment_date": {"$lt": period_end}},
+        {"payment_date": None, "created_at": {"$lt": period_end}}
+    ]}
+
+def dated_before(period_end: str) -> dict:
+    return {"transaction_date": {"$lt": period_end}}
+
+def _settle_date(payment: dict):
+    return payment.get('payment_date') or payment['created_at']
+
+def as_datetime(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+# Lookups
+async def latest_close(statuses=None) -> Optional[dict]:
+    query = {"status": {"$in": list(statuses)}} if statuses else {}
+    return await db[PERIODS_COLLECTION].find_one(query, {"_id": 0}, sort=[("period_end", -1)])
+
+async def snapshot_close() -> Optional[dict]:
+    """The close live balances start from, if any"""
+    return await latest_close(SNAPSHOT_STATUSES)
+
+async def customer_snapshot(period_id: str, customer_id: str) -> Optional[dict]:
+    return await db[BALANCES_COLLECTION].find_one({"period_id": period_id, "customer_id": customer_id}, {"_id": 0})
+
+async def archive_collections(kind: str) -> list:
+    names = await db.list_collection_names(filter={"name": {"$regex": f"^{kind}_archive_"}})
+    return sorted(names)
+
+async def find_with_archive(kind: str, query: dict, projection: Optional[dict] = None) -> list:
+    """Live and archived documents matching query; a document caught halfway
+    through a move is returned once"""
+    projection = {**(projection or {}), "_id": 0}
+    if len(projection) > 1:
+        projection["id"] = 1
+    documents = await db[kind].find(query, projection).to_list(None)
+    seen = {d['id'] for d in documents}
+    for name in await archive_collections(kind):
+        for document in await db[name].find(query, projection).to_list(None):
+            if document['id'] not in seen:
+                seen.add(document['id'])
+                documents.append(document)
+    return documents
+
+async def aggregate_with_archive(kind: str, pipeline: list) -> list:
+    """Rows of pipeline run on the live and each archive collection; callers
+    merge them. Unlike find_with_archive, a document caught halfway through
+    a move is counted twice."""
+    rows = await db[kind].aggregate(pipeline).to_list(None)
+    for name in await archive_collections(kind):
+        rows += await db[name].aggregate(pipeline).to_list(None)
+    return rows
+
+# Write guards
+async def ensure_period_open(when):
+    """Reject writes dated inside a closed (or closing) period"""
+    if when is None:
+        return
+    close = await latest_close()
+    if close and as_datetime(when) < as_datetime(close['period_end']):
+        raise HTTPException(status_code=400, detail="Kapanmış döneme ait kayıt değiştirilemez")
+
+async def ensure_payment_open(payment: dict):
+    if payment.get('is_paid'):
+        await ensure_period_open(_settle_date(payment))
+
+# Closing
+async def start_period_close(period_end: datetime, label: Optional[str], closed_by: str) -> dict:
+    period_end = as_datetime(period_end).astimezone(timezone.utc)
+    if period_end > datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="Dönem sonu gelecekte olamaz")
+    
+    previous = await latest_close()
+    if previous and previous['status'] != "done":
+        raise HTTPException(status_code=409, detail="Önceki dönem kapanışı henüz tamamlanmadı")
+    if previous and period_end <= as_datetime(previous['period_end']):
+        raise HTTPException(status_code=400, detail="Dönem sonu önceki kapanıştan sonra olmalı")
+    
+    close = {
+        "id": str(uuid.uuid4()),
+        "label": label or str((period_end - timedelta(microseconds=1)).year),
+        "period_end": period_end.isoformat(),
+        "previous_id": previous['id'] if previous else None,
+        "previous_end": previous['period_end'] if previous else None,
+        "status": "closing",
+        "closed_by": closed_by,
+        "closed_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db[PERIODS_COLLECTION].insert_one(dict(close))
+    _spawn_close(close)
+    return close
+
+def _spawn_close(close: dict):
+    task = asyncio.create_task(run_period_close(close))
+    _close_tasks.add(task)
+    task.add_done_callback(_close_tasks.discard)
+
+async def resume_period_close():
+    """Finish closes, of any tenant, that were interrupted by a restart"""
+    unfinished = all_tenants_db[PERIODS_COLLECTION].find({"status": {"$in": ["closing", "archiving"]}}, {"_id": 0})
+    async for close in unfinished:
+        tenant_id = close.get(TENANT_FIELD) or DEFAULT_TENANT_ID
+        logging.info(f"Resuming period close {close['label']} of {tenant_id}")
+        with tenant_scope(tenant_id):
+            await run_period_close(close)
+
+async def run_period_close(close: dict):
+    async with lease(f"period-close:{current_tenant.get()}", CLOSE_LEASE_SECONDS) as acquired:
+        if not acquired:
+            logging.info(f"Period close {close['label']} is running on another worker")
+            return
+        try:
+            close = await db[PERIODS_COLLECTION].find_one({"id": close['id']}, {"_id": 0})
+            if close['status'] == "closing":
+                await snapshot_balances(close)
+                close['status'] = "archiving"
+                publish_change("periods", "closed", close['id'], await current_seq())
+            if close['status'] == "archiving":
+                moved = {
+                    "archived_payments": await archive_documents(close, "payments", settled_before(close['period_end'])),
+                    "archived_transactions": await archive_documents(close, "transactions", dated_before(close['period_end']))
+                }
+                await db[PERIODS_COLLECTION].update_one(
+                    {"id": close['id']},
+                    {"$set": {**moved, "status": "done", "archived_at": datetime.now(timezone.utc).isoformat()}}
+                )
+                publish_change("periods", "archived", close['id'], await current_seq())
+                logging.info(f"Period {close['label']} closed: {moved}")
+        except Exception as e:
+            logging.error(f"Period close {close['label']} failed, will resume on restart: {str(e)}")
+
+async def snapshot_balances(close: dict):
+    """Closing balances = previous close + everything live dated before period_end"""
+    previous = None
+    if close.get('previous_id'):
+        previous = await db[PERIODS_COLLECTION].find_one({"id": close['previous_id']}, {"_id": 0})
+    
+    # Kasa and POS, in kuruş
+    balances = {
+        "nakit": as_kurus(previous['cash_balance']) if previous else 0,
+        "pos": as_kurus(previous['pos_balance']) if previous else 0
+    }
+    async for row in db.transactions.aggregate([
+        {"$match": dated_before(close['period_end'])},
+        {"$group": {"_id": "$payment_method", "total": {"$sum": signed_amount_expr()}}}
+    ]):
+        if row['_id'] in balances:
+            balances[row['_id']] += row['total']
+    
+    # Per-customer totals of the settled payments, as the customer summary counts them
+    customers = defaultdict(lambda: {"total_debt": 0, "total_paid": 0, "total_payments": 0})
+    if previous:
+        async for row in db[BALANCES_COLLECTION].find({"period_id": previous['id']}, {"_id": 0}):
+            customers[row['customer_id']].update(
+                total_debt=as_kurus(row['total_debt']),
+                total_paid=as_kurus(row['total_paid']),
+                total_payments=row['total_payments']
+            )
+    is_borc = {"$eq": ["$payment_type", "borc"]}
+    async for row in db.payments.aggregate([
+        {"$match": settled_before(close['period_end'])},
+        {"$group": {
+            "_id": "$customer_id",
+            "total_debt": {"$sum": {"$cond": [is_borc, kurus_expr("amount"), 0]}},
+            "total_paid": {"$sum": {"$cond": [is_borc, kurus_expr("paid_amount"), 0]}},
+            "total_payments": {"$sum": 1}
+        }}
+    ]):
+        totals = customers[row['_id']]
+        for key in ("total_debt", "total_paid", "total_payments"):
+            totals[key] += row[key]
+    
+    # Safe to repeat: a resumed close rewrites its rows
+    await db[BALANCES_COLLECTION].delete_many({"period_id": close['id']})
+    rows = [
+        {"period_id": close['id'], "customer_id": customer_id, **totals,
+         "total_remaining": totals['total_debt'] - totals['total_paid']}
+        for customer_id, totals in customers.items()
+    ]
+    for start in range(0, len(rows), ARCHIVE_BATCH_SIZE):
+        await db[BALANCES_COLLECTION].insert_many(rows[start:start + ARCHIVE_BATCH_SIZE])
+    
+    await db[PERIODS_COLLECTION].update_one({"id": close['id']}, {"$set": {
+        "status": "archiving",
+        "cash_balance": balances['nakit'],
+        "pos_balance": balances['pos'],
+        "customer_count": len(rows)
+    }})
+
+async def archive_documents(close: dict, kind: str, query: dict) -> int:
+    """Move matching documents to per-year archive collections in batches"""
+    date_field = "transaction_date" if kind == "transactions" else None
+    moved = 0
+    indexed = set()
+    while True:
+        batch = await db[kind].find(query).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not batch:
+            return moved
+        
+        by_year = defaultdict(list)
+        for document in batch:
+            when = document[date_field] if date_field else _settle_date(document)
+            year = when[:4] if isinstance(when, str) else str(when.year)
+            by_year[year].append(document)
+        for year, documents in by_year.items():
+            name = archive_collection(kind, year)
+            if name not in indexed:
+                for keys in ARCHIVE_INDEXES[kind]:
+                    await db[name].create_index(keys)
+                indexed.add(name)
+            try:
+                await db[name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Already copied by an interrupted earlier run
+                if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                    raise
+        
+        # Archived records leave the live set; sync clients drop them like deletions
+        last_seq = await next_seq(len(batch))
+        deleted_at = datetime.now(timezone.utc).isoformat()
+        await db.tombstones.insert_many([
+            {"collection": kind, "id": document['id'], "updated_seq": last_seq - len(batch) + 1 + i,
+             "deleted_at": deleted_at, "archived_in": close['id']}
+            for i, document in enumerate(batch)
+        ])
+        await db[kind].delete_many({"_id": {"$in": [document['_id'] for document in batch]}})
+        moved += len(batch)
@@ -0,0 +1,45 @@
+"""Sparse fieldsets: `fields=id,name` on read endpoints.
+
+The requested fields become a MongoDB projection, so the rest of each
+document is never sent, decoded or allocated, and the response is validated
+and serialized by a model holding only those fields. `id` is always included.
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter, create_model
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Requested fields in the model's field order, None when not requested"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen alan: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+def field_projection(fields: Tuple[str, ...]) -> dict:
+    return {"_id": 0, **{name: 1 for name in fields}}
+
+
+@lru_cache(maxsize=128)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    """List adapter for a model with only `fields`; older documents may lack
+    fields added later, so every field is optional"""
+    partial = create_model(
+        f"{model.__name__}Fields",
+        **{name: (Optional[model.model_fields[name].annotation], None) for name in fields}
+    )
+    return TypeAdapter(List[partial])
+
+
+def sparse_response(model: Type[BaseModel], fields: Tuple[str, ...], docs: list) -> Response:
+    # Returned as a Response so the route's full response_model is skipped
+    adapter = partial_model(model, fields)
+    return Response(content=adapter.dump_json(adapter.validate_python(docs)), media_type="application/json")
@@ -0,0 +1,120 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
+from datetime import datetime
+import logging
+import jwt
+from pymongo.errors import DuplicateKeyError
+
+from muhasebe.config import SECRET_KEY, ALGORITHM, DEFAULT_TENANT_ID
+from muhasebe.database import db, all_tenants_db
+from muhasebe.models import User, UserCreate, UserResponse, LoginRequest, LoginResponse, ChangePasswordRequest
+from muhasebe.security import pwd_context, bcrypt_pool, require_admin
+from muhasebe.tenancy import TENANT_FIELD, current_tenant, tenant_scope
+
+router = APIRouter()
+
+# Auth endpoints
+@router.post("/auth/login", response_model=LoginResponse)
+async def login(request: LoginRequest):
+    # Usernames are unique across tenants; the user's tenant goes into the token
+    # Auto-create admin if doesn't exist (for production first-time login)
+    admin_exists = await all_tenants_db.users.find_one({"username": "admin"})
+    if not admin_exists:
+        try:
+            hashed_password = await bcrypt_pool.run(pwd_context.hash, "admin123")
+            admin_user = User(
+                username="admin",
+                password=hashed_password,
+                role="admin",
+                tenant_id=DEFAULT_TENANT_ID
+            )
+            doc = admin_user.model_dump()
+            doc['created_at'] = doc['created_at'].isoformat()
+            await all_tenants_db.users.insert_one(doc)
+            logging.info("Admin user auto-created during login attempt")
+        except Exception as e:
+            logging.error(f"Failed to auto-create admin: {str(e)}")
+    
+    user = await all_tenants_db.users.find_one({"username": request.username}, {"_id": 0})
+    if not user:
+        raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
+    
+    if not await bcrypt_pool.run(pwd_context.verify, request.password, user['password']):
+        raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
+    
+    if isinstance(user['created_at'], str):
+        user['created_at'] = datetime.fromisoformat(user['created_at'])
+    
+    user[TENANT_FIELD] = user.get(TENANT_FIELD) or DEFAULT_TENANT_ID
+    token = jwt.encode(
+        {"username": user['username'], "role": user['role'], TENANT_FIELD: user[TENANT_FIELD]},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    
+    user_response = UserResponse(**user)
+    return LoginResponse(token=token, user=user_response)
+
+@router.post("/auth/change-password")
+async def change_password(request: ChangePasswordRequest):
+    user = await all_tenants_db.users.find_one({"username": request.username})
+    if not user:
+        raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    
+    if not await bcrypt_pool.run(pwd_context.verify, request.old_password, user['password']):
+        raise HTTPException(status_code=401, detail="Mevcut şifre hatalı")
+    
+    new_hashed = await bcrypt_pool.run(pwd_context.hash, request.new_password)
+    await all_tenants_db.users.update_one(
+        {"username": request.username},
+        {"$set": {"password": new_hashed}}
+    )
+    return {"message": "Şifre başarıyla değiştirildi"}
+
+# User management (admin only)
+@router.get("/users", response_model=List[UserResponse])
+async def get_users(_: dict = Depends(require_admin)):
+    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
+    for user in users:
+        if isinstance(user['created_at'], str):
+            user['created_at'] = datetime.fromisoformat(user['created_at'])
+    return users
+
+@router.post("/users", response_model=UserResponse)
+async def create_user(user_data: UserCreate, _: dict = Depends(require_admin)):
+    # Users join the admin's company; an admin of the default tenant can
+    # provision another company by creating its first user there
+    tenant_id = current_tenant.get()
+    if user_data.tenant_id and user_data.tenant_id != tenant_id:
+        if tenant_id != DEFAULT_TENANT_ID:
+            raise HTTPException(status_code=403, detail="Bu işlem için yönetici yetkisi gerekiyor")
+        tenant_id = user_data.tenant_id
+    
+    # Check if username exists (usernames are unique across tenants)
+    existing = await all_tenants_db.users.find_one({"username": user_data.username})
+    if existing:
+        raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten mevcut")
+    
+    hashed_password = await bcrypt_pool.run(pwd_context.hash, user_data.password)
+    user = User(username=user_data.username, password=hashed_password, role=user_data.role)
+    doc = user.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    try:
+        with tenant_scope(tenant_id):
+            await db.users.insert_one(doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent request for the same username
+        raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten mevcut")
+    
+    return UserResponse(**doc)
+
+@router.delete("/users/{user_id}")
+async def delete_user(user_id: str, _: dict = Depends(require_admin)):
+    user = await db.users.find_one({"id": user_id})
+    if not user:
+        raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    
+    if user['username'] == 'admin':
+        raise HTTPException(status_code=400, detail="Admin kullanıcısı silinemez")
+    
+    await db.users.delete_one({"id": user_id})
+    return {"message": "Kullanıcı silindi"}
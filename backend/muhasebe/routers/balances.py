@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException
+from datetime import timedelta
+
+from muhasebe.balances import balances_at
+from muhasebe.database import db, read_group
+from muhasebe.money import to_lira
+from muhasebe.periods import as_datetime
+
+router = APIRouter()
+
+# Point-in-time balances
+@router.get("/balances")
+async def get_balances(as_of: str):
+    """Kasa, POS and per-customer open items as of a date or instant.
+    
+    A plain date (2025-03-31) means the end of that day (UTC); a datetime
+    means just before that instant.
+    """
+    try:
+        cutoff = as_datetime(as_of)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz tarih")
+    if len(as_of) == 10:
+        cutoff += timedelta(days=1)
+    
+    with read_group("statements"):
+        balances = await balances_at(cutoff)
+        
+        names = {}
+        if balances['customers']:
+            async for customer in db.customers.find(
+                {"id": {"$in": list(balances['customers'])}}, {"_id": 0, "id": 1, "name": 1}
+            ):
+                names[customer['id']] = customer['name']
+    
+    return {
+        "as_of": balances['as_of'],
+        "checkpoint": balances['checkpoint'],
+        "cash_balance": to_lira(balances['cash_balance']),
+        "pos_balance": to_lira(balances['pos_balance']),
+        "total_balance": to_lira(balances['cash_balance'] + balances['pos_balance']),
+        "customers": [
+            {
+                "customer_id": customer_id,
+                "customer_name": names.get(customer_id),
+                "receivable": to_lira(totals['receivable']),
+                "payable": to_lira(totals['payable']),
+                "balance": to_lira(totals['receivable'] - totals['payable'])
+            }
+            for customer_id, totals in balances['customers'].items()
+        ]
+    }
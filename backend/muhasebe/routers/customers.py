@@ -0,0 +1,233 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from typing import List, Optional
+from datetime import datetime, timezone
+import re
+
+from events import diff_balances, payment_contribution
+from muhasebe.balances import invalidate_checkpoints
+from muhasebe.changes import next_seq, publish_change, summary_flight
+from muhasebe.database import db, read_group, write_transaction
+from muhasebe.models import Customer, CustomerCreate
+from muhasebe.money import as_kurus, kurus_expr, load_amounts, to_lira
+from muhasebe.periods import archive_collections, latest_close, snapshot_close, customer_snapshot, settled_before
+from muhasebe.projection import parse_fields, field_projection, sparse_response
+from muhasebe.search import SEARCH_RESULT_LIMIT, fold_search_text, digits_only, build_customer_search_fields
+from muhasebe.tenancy import TENANT_FIELD, current_tenant
+
+router = APIRouter()
+
+SUMMARY_CUSTOMER_PROJECTION = {"_id": 0, "search_key": 0, "search_terms": 0, "updated_seq": 0, TENANT_FIELD: 0}
+
+# Customer endpoints
+@router.get("/customers", response_model=List[Customer])
+async def get_customers(fields: Optional[str] = None):
+    field_list = parse_fields(fields, Customer)
+    if field_list:
+        customers = await db.customers.find({}, field_projection(field_list)).to_list(1000)
+        return sparse_response(Customer, field_list, customers)
+    
+    customers = await db.customers.find({}, {"_id": 0}).to_list(1000)
+    for customer in customers:
+        if isinstance(customer['created_at'], str):
+            customer['created_at'] = datetime.fromisoformat(customer['created_at'])
+    return customers
+
+@router.get("/customers/search", response_model=List[Customer])
+async def search_customers(q: str, limit: int = 10):
+    """Typeahead search on name, phone and tax number; name prefix matches rank first"""
+    limit = max(1, min(limit, SEARCH_RESULT_LIMIT))
+    stripped = q.strip()
+    if stripped and re.fullmatch(r'[\d\s()+\-]+', stripped):
+        needle = digits_only(stripped).lstrip('0') or digits_only(stripped)
+    else:
+        needle = fold_search_text(stripped)
+    if not needle:
+        return []
+    
+    prefix = {"$regex": f"^{re.escape(needle)}"}
+    projection = {"_id": 0, "search_key": 0, "search_terms": 0}
+    
+    # Whole name starts with the query
+    customers = await db.customers.find({"search_key": prefix}, projection).sort("search_key", 1).to_list(limit)
+    
+    # Any word of the name, the phone or the tax number starts with the query.
+    # The multikey search_terms index can't return these in search_key order,
+    # and a sort would be a blocking in-memory one, so the few results are
+    # ordered here instead
+    if len(customers) < limit:
+        seen = [c['id'] for c in customers]
+        matches = await db.customers.find(
+            {"search_terms": prefix, "id": {"$nin": seen}}, projection
+        ).to_list(limit - len(customers))
+        customers += sorted(matches, key=lambda c: fold_search_text(c['name']))
+    
+    for customer in customers:
+        if isinstance(customer['created_at'], str):
+            customer['created_at'] = datetime.fromisoformat(customer['created_at'])
+    return customers
+
+@router.post("/customers", response_model=Customer)
+async def create_customer(customer_data: CustomerCreate):
+    customer = Customer(**customer_data.model_dump())
+    doc = customer.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    doc.update(build_customer_search_fields(customer.name, customer.phone, customer.tax_number))
+    doc['updated_seq'] = await next_seq()
+    await db.customers.insert_one(doc)
+    publish_change("customers", "created", customer.id, doc['updated_seq'], {"total_customers": 1})
+    return customer
+
+@router.put("/customers/{customer_id}", response_model=Customer)
+async def update_customer(customer_id: str, customer_data: CustomerCreate, cascade: bool = False, dry_run: bool = False):
+    """Update a customer. Payments keep the customer_name they were written
+    with unless cascade=true, which copies a new name to its payments, live
+    and archived, in one update per collection (the customers page sends it
+    when the name changed); dry_run only counts the payments that would
+    change."""
+    existing = await db.customers.find_one({"id": customer_id}, {"_id": 0, "id": 1})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Cari bulunamadı")
+    
+    # Payments still carrying another name; empty once the rename went through
+    stale = {"customer_id": customer_id, "customer_name": {"$ne": customer_data.name}}
+    archives = await archive_collections("payments") if cascade else []
+    if dry_run:
+        payments = await db.payments.count_documents(stale) if cascade else 0
+        archived_payments = 0
+        for archive in archives:
+            archived_payments += await db[archive].count_documents(stale)
+        # As a Response so the route's response_model is skipped
+        return JSONResponse({"dry_run": True, "payments": payments, "archived_payments": archived_payments})
+    
+    update_data = customer_data.model_dump()
+    update_data.update(build_customer_search_fields(customer_data.name, customer_data.phone, customer_data.tax_number))
+    async with write_transaction() as session:
+        # Reserved in the transaction, right before the writes, so they land
+        # well within the sync watermark lag; one seq for all renamed payments
+        last_seq = await next_seq(2 if cascade else 1, session=session)
+        update_data['updated_seq'] = last_seq - 1 if cascade else last_seq
+        payment_seq = last_seq if cascade else None
+        await db.customers.update_one({"id": customer_id}, {"$set": update_data}, session=session)
+        if cascade:
+            await db.payments.update_many(
+                stale, {"$set": {"customer_name": customer_data.name, "updated_seq": payment_seq}}, session=session
+            )
+            for archive in archives:
+                await db[archive].update_many(stale, {"$set": {"customer_name": customer_data.name}}, session=session)
+    publish_change("customers", "updated", customer_id, payment_seq or update_data['updated_seq'])
+    
+    updated = await db.customers.find_one({"id": customer_id}, {"_id": 0})
+    if isinstance(updated['created_at'], str):
+        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    return Customer(**updated)
+
+@router.delete("/customers/{customer_id}")
+async def delete_customer(customer_id: str, cascade: bool = False, dry_run: bool = False):
+    """Delete a customer. One with payments is only deleted with cascade,
+    which deletes its live payments in the same transaction; payments
+    already archived by a period close stay with that period. dry_run
+    returns the number of payments a cascade would delete."""
+    customer = await db.customers.find_one({"id": customer_id}, {"_id": 0, "id": 1})
+    if not customer:
+        raise HTTPException(status_code=404, detail="Cari bulunamadı")
+    
+    owned = {"customer_id": customer_id}
+    payment_count = await db.payments.count_documents(owned)
+    if dry_run:
+        return {"dry_run": True, "payments": payment_count}
+    if payment_count and not cascade:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Carinin {payment_count} ödemesi var; ödemeleriyle birlikte silmek için cascade=true gönderin"
+        )
+    if payment_count:
+        # Same rule as deleting them one by one (periods.ensure_payment_open)
+        close = await latest_close()
+        if close and await db.payments.count_documents({**owned, **settled_before(close['period_end'])}):
+            raise HTTPException(status_code=400, detail="Kapanmış döneme ait kayıt değiştirilemez")
+    
+    projection = {"_id": 0, "id": 1, "amount": 1, "payment_type": 1, "is_paid": 1, "created_at": 1, "payment_date": 1}
+    async with write_transaction() as session:
+        result = await db.customers.delete_one({"id": customer_id}, session=session)
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Cari bulunamadı")
+        payments = await db.payments.find(owned, projection, session=session).to_list(None) if cascade else []
+        ids = [payment['id'] for payment in payments]
+        if ids:
+            await db.payments.delete_many({"id": {"$in": ids}}, session=session)
+        
+        # Reserved in the transaction, so the tombstones' seqs commit with
+        # the deletes and a rolled back delete gives them back
+        last_seq = await next_seq(len(ids) + 1, session=session)
+        first_seq = last_seq - len(ids)
+        deleted_at = datetime.now(timezone.utc).isoformat()
+        deleted = [("payments", payment_id) for payment_id in ids] + [("customers", customer_id)]
+        await db.tombstones.insert_many([
+            {"collection": collection, "id": entity_id, "updated_seq": first_seq + i, "deleted_at": deleted_at}
+            for i, (collection, entity_id) in enumerate(deleted)
+        ], session=session)
+    
+    # One event with the combined delta instead of one per payment
+    removed = {}
+    for payment in payments:
+        for key, value in payment_contribution(load_amounts(payment, "payments")).items():
+            removed[key] = removed.get(key, 0) + value
+    if payments:
+        await invalidate_checkpoints(*(date for payment in payments for date in (payment['created_at'], payment.get('payment_date'))))
+    publish_change("customers", "deleted", customer_id, last_seq, {"total_customers": -1, **diff_balances(removed, {})})
+    return {"message": "Cari silindi", "deleted_payments": len(ids)}
+
+@router.get("/customers/{customer_id}/summary")
+async def get_customer_summary(customer_id: str, fields: Optional[str] = None):
+    """Get customer's total debt and payment history; `fields` limits the customer object"""
+    field_list = parse_fields(fields, Customer)
+    with read_group("statements"):
+        return await summary_flight.do(
+            (current_tenant.get(), customer_id, field_list),
+            lambda: compute_customer_summary(customer_id, field_list)
+        )
+
+async def compute_customer_summary(customer_id: str, fields: Optional[tuple] = None):
+    # Returned as stored (no response_model), so leave out the internal fields
+    projection = field_projection(fields) if fields else SUMMARY_CUSTOMER_PROJECTION
+    customer = await db.customers.find_one({"id": customer_id}, projection)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Cari bulunamadı")
+    
+    # Payments settled in closed periods are counted in the last close's snapshot
+    query = {"customer_id": customer_id}
+    total_debt = 0
+    total_paid = 0
+    total_payments = 0
+    close = await snapshot_close()
+    if close:
+        query["$nor"] = [settled_before(close['period_end'])]
+        snapshot = await customer_snapshot(close['id'], customer_id)
+        if snapshot:
+            total_debt = as_kurus(snapshot['total_debt'])
+            total_paid = as_kurus(snapshot['total_paid'])
+            total_payments = snapshot['total_payments']
+    
+    # Summed in the database, in kuruş
+    is_borc = {"$eq": ["$payment_type", "borc"]}
+    async for row in db.payments.aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "total_debt": {"$sum": {"$cond": [is_borc, kurus_expr("amount"), 0]}},
+            "total_paid": {"$sum": {"$cond": [is_borc, kurus_expr("paid_amount"), 0]}},
+            "total_payments": {"$sum": 1}
+        }}
+    ]):
+        total_debt += row['total_debt']
+        total_paid += row['total_paid']
+        total_payments += row['total_payments']
+    
+    return {
+        "customer": customer,
+        "total_debt": to_lira(total_debt),
+        "total_paid": to_lira(total_paid),
+        "total_remaining": to_lira(total_debt - total_paid),
+        "total_payments": total_payments
+    }
@@ -0,0 +1,340 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from datetime import datetime, timezone, timedelta
+import uuid
+from pymongo import ReturnDocument, UpdateOne
+
+from events import diff_balances, payment_contribution, transaction_contribution
+from muhasebe.balances import invalidate_checkpoints
+from muhasebe.changes import next_seq, record_tombstone, publish_change
+from muhasebe.database import db, write_transaction
+from muhasebe.installments import INSTALLMENT_INTERVALS, due_dates, split_amount
+from muhasebe.money import to_kurus, to_lira, store_amounts, load_amounts, serve_amounts
+from muhasebe.models import Payment, PaymentCreate, PartialPaymentRequest, Transaction, InstallmentPlanCreate, InstallmentReschedule
+from muhasebe.periods import ensure_payment_open
+from muhasebe.projection import parse_fields, field_projection, sparse_response
+from muhasebe.tenancy import tenant_filter
+
+router = APIRouter()
+
+# Payment endpoints
+@router.get("/payments", response_model=List[Payment])
+async def get_payments(customer_id: Optional[str] = None, fields: Optional[str] = None):
+    query = {}
+    if customer_id:
+        query["customer_id"] = customer_id
+    
+    field_list = parse_fields(fields, Payment)
+    if field_list:
+        payments = await db.payments.find(query, field_projection(field_list)).to_list(1000)
+        return sparse_response(Payment, field_list, [serve_amounts(p, "payments") for p in payments])
+    
+    payments = await db.payments.find(query, {"_id": 0}).to_list(1000)
+    for payment in payments:
+        serve_amounts(payment, "payments")
+        if isinstance(payment['created_at'], str):
+            payment['created_at'] = datetime.fromisoformat(payment['created_at'])
+        if isinstance(payment['due_date'], str):
+            payment['due_date'] = datetime.fromisoformat(payment['due_date'])
+        if payment.get('payment_date') and isinstance(payment['payment_date'], str):
+            payment['payment_date'] = datetime.fromisoformat(payment['payment_date'])
+    return payments
+
+@router.get("/payments/upcoming")
+async def get_upcoming_payments(days: int = 7):
+    """Get payments due in next N days"""
+    today = datetime.now(timezone.utc)
+    future_date = today + timedelta(days=days)
+    
+    payments = await db.payments.find({
+        "is_paid": False,
+        "due_date": {
+            "$gte": today.isoformat(),
+            "$lte": future_date.isoformat()
+        }
+    }, {"_id": 0}).to_list(1000)
+    
+    for payment in payments:
+        serve_amounts(payment, "payments")
+        if isinstance(payment['created_at'], str):
+            payment['created_at'] = datetime.fromisoformat(payment['created_at'])
+        if isinstance(payment['due_date'], str):
+            payment['due_date'] = datetime.fromisoformat(payment['due_date'])
+        if payment.get('payment_date') and isinstance(payment['payment_date'], str):
+            payment['payment_date'] = datetime.fromisoformat(payment['payment_date'])
+    
+    return payments
+
+@router.post("/payments", response_model=Payment)
+async def create_payment(payment_data: PaymentCreate):
+    payment = Payment(**payment_data.model_dump())
+    doc = payment.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    doc['due_date'] = doc['due_date'].isoformat()
+    if doc.get('payment_date'):
+        doc['payment_date'] = doc['payment_date'].isoformat()
+    store_amounts(doc, "payments")
+    await ensure_payment_open(doc)
+    doc['updated_seq'] = await next_seq()
+    await db.payments.insert_one(doc)
+    await invalidate_checkpoints(doc['created_at'], doc.get('payment_date'))
+    publish_change("payments", "created", payment.id, doc['updated_seq'], payment_contribution(doc))
+    return payment
+
+# Installment plans
+def _payment_response(payment: dict) -> dict:
+    serve_amounts(payment, "payments")
+    for field in ('created_at', 'due_date', 'payment_date'):
+        if payment.get(field) and isinstance(payment[field], str):
+            payment[field] = datetime.fromisoformat(payment[field])
+    return payment
+
+@router.post("/payments/installments")
+async def create_installment_plan(plan: InstallmentPlanCreate):
+    """Create every installment of a plan in one insert"""
+    if plan.interval not in INSTALLMENT_INTERVALS:
+        raise HTTPException(status_code=400, detail="Geçersiz taksit aralığı")
+    
+    plan_id = str(uuid.uuid4())
+    count = plan.installment_count
+    total = to_kurus(plan.total_amount)
+    if total < count:
+        raise HTTPException(status_code=400, detail="Her taksit en az 0,01 TL olmalı")
+    amounts = split_amount(total, count)
+    dates = due_dates(plan.first_due_date, count, plan.interval, plan.every)
+    last_seq = await next_seq(count)
+    
+    docs = []
+    for i, (amount, due_date) in enumerate(zip(amounts, dates)):
+        description = f"{plan.description} - " if plan.description else ""
+        payment = Payment(
+            customer_id=plan.customer_id,
+            customer_name=plan.customer_name,
+            amount=to_lira(amount),
+            payment_type=plan.payment_type,
+            due_date=due_date,
+            description=f"{description}Taksit {i + 1}/{count}",
+            plan_id=plan_id,
+            installment_no=i + 1,
+            installment_count=count
+        )
+        doc = payment.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['due_date'] = doc['due_date'].isoformat()
+        store_amounts(doc, "payments")
+        await ensure_payment_open(doc)
+        doc['updated_seq'] = last_seq - count + 1 + i
+        docs.append(doc)
+    
+    await db.payments.insert_many(docs)
+    await invalidate_checkpoints(*(doc['created_at'] for doc in docs))
+    for doc in docs:
+        publish_change("payments", "created", doc['id'], doc['updated_seq'], payment_contribution(doc))
+    
+    return {"plan_id": plan_id, "installments": [Payment(**_payment_response(doc)) for doc in docs]}
+
+@router.get("/payments/installments/{plan_id}", response_model=List[Payment])
+async def get_installment_plan(plan_id: str):
+    payments = await db.payments.find({"plan_id": plan_id}, {"_id": 0}).sort("installment_no", 1).to_list(None)
+    if not payments:
+        raise HTTPException(status_code=404, detail="Taksit planı bulunamadı")
+    return [_payment_response(payment) for payment in payments]
+
+@router.put("/payments/installments/{plan_id}")
+async def reschedule_installment_plan(plan_id: str, request: InstallmentReschedule):
+    """Move the unpaid installments of a plan, first one to first_due_date"""
+    if request.interval not in INSTALLMENT_INTERVALS:
+        raise HTTPException(status_code=400, detail="Geçersiz taksit aralığı")
+    
+    unpaid = await db.payments.find(
+        {"plan_id": plan_id, "is_paid": False}, {"_id": 0, "id": 1}
+    ).sort("installment_no", 1).to_list(None)
+    if not unpaid:
+        raise HTTPException(status_code=404, detail="Ödenmemiş taksit bulunamadı")
+    
+    dates = due_dates(request.first_due_date, len(unpaid), request.interval, request.every)
+    async with write_transaction() as session:
+        last_seq = await next_seq(len(unpaid), session=session)
+        first_seq = last_seq - len(unpaid) + 1
+        await db.payments.bulk_write([
+            UpdateOne(
+                tenant_filter({"id": payment['id'], "is_paid": False}),
+                {"$set": {"due_date": due_date.isoformat(), "updated_seq": first_seq + i}}
+            )
+            for i, (payment, due_date) in enumerate(zip(unpaid, dates))
+        ], ordered=False, session=session)
+    # Due dates don't change any balance
+    for i, payment in enumerate(unpaid):
+        publish_change("payments", "updated", payment['id'], first_seq + i)
+    
+    return {"message": "Taksitler yeniden planlandı", "rescheduled": len(unpaid)}
+
+@router.delete("/payments/installments/{plan_id}")
+async def cancel_installment_plan(plan_id: str):
+    """Delete the installments nothing has been paid on; paid and partially
+    paid ones stay as the record of what was collected"""
+    untouched = {"plan_id": plan_id, "is_paid": False, "paid_amount": {"$in": [0, None]}}
+    # Read, deleted and tombstoned together, so sync never misses a cancelled
+    # installment and a payment landing meanwhile isn't tombstoned
+    async with write_transaction() as session:
+        open_installments = await db.payments.find(untouched, {"_id": 0}, session=session).to_list(None)
+        if not open_installments:
+            raise HTTPException(status_code=404, detail="İptal edilecek taksit bulunamadı")
+        ids = [payment['id'] for payment in open_installments]
+        await db.payments.delete_many({**untouched, "id": {"$in": ids}}, session=session)
+        last_seq = await next_seq(len(ids), session=session)
+        first_seq = last_seq - len(ids) + 1
+        deleted_at = datetime.now(timezone.utc).isoformat()
+        await db.tombstones.insert_many([
+            {"collection": "payments", "id": payment_id, "updated_seq": first_seq + i, "deleted_at": deleted_at}
+            for i, payment_id in enumerate(ids)
+        ], session=session)
+    
+    for payment in open_installments:
+        load_amounts(payment, "payments")
+    await invalidate_checkpoints(*(payment['created_at'] for payment in open_installments))
+    
+    for i, payment in enumerate(open_installments):
+        publish_change("payments", "deleted", payment['id'], first_seq + i, diff_balances(payment_contribution(payment), {}))
+    
+    kept = await db.payments.count_documents({"plan_id": plan_id})
+    return {"message": "Taksit planı iptal edildi", "cancelled": len(ids), "kept": kept}
+
+@router.post("/payments/partial-payment")
+async def make_partial_payment(request: PartialPaymentRequest):
+    """Make a partial payment on a debt"""
+    payment = await db.payments.find_one({"id": request.payment_id}, {"_id": 0})
+    if not payment:
+        raise HTTPException(status_code=404, detail="Ödeme bulunamadı")
+    await ensure_payment_open(payment)
+    stored = {"amount": payment['amount'], "paid_amount": payment.get('paid_amount')}
+    load_amounts(payment, "payments")
+    
+    # In kuruş, so paying off the exact remainder always settles the payment
+    current_paid = payment.get('paid_amount', 0)
+    amount = to_kurus(request.amount)
+    remaining = payment['amount'] - current_paid
+    if payment.get('is_paid') or remaining <= 0:
+        raise HTTPException(status_code=400, detail="Bu ödeme zaten tamamen ödenmiş")
+    if amount > remaining:
+        raise HTTPException(status_code=400, detail="Ödeme tutarı kalan borcu aşamaz")
+    is_fully_paid = amount == remaining
+    
+    update = {"$set": {"updated_seq": await next_seq()}}
+    if is_fully_paid or any(isinstance(value, float) for value in stored.values()):
+        # Settling, or converting a document still in float lira: only if
+        # nothing was paid or edited since the read
+        guard = {"id": request.payment_id, "is_paid": {"$ne": True}, **stored}
+        update["$set"].update(amount=payment['amount'], paid_amount=current_paid + amount)
+        if is_fully_paid:
+            update["$set"].update(is_paid=True, payment_date=datetime.now(timezone.utc).isoformat())
+    else:
+        # Concurrent partial payments add up, as long as none of them reaches
+        # the amount; the one that would settle it must take the branch above
+        guard = {
+            "id": request.payment_id,
+            "is_paid": {"$ne": True},
+            "amount": payment['amount'],
+            "$or": [
+                {"paid_amount": {"$lt": payment['amount'] - amount}},
+                {"paid_amount": {"$exists": False}}
+            ]
+        }
+        update["$inc"] = {"paid_amount": amount}
+    
+    updated = await db.payments.find_one_and_update(guard, update, {"_id": 0}, return_document=ReturnDocument.AFTER)
+    if not updated:
+        raise HTTPException(status_code=409, detail="Kayıt aynı anda değiştirildi, lütfen tekrar deneyin")
+    load_amounts(updated, "payments")
+    new_paid = updated['paid_amount']
+    publish_change(
+        "payments", "updated", request.payment_id, updated['updated_seq'],
+        diff_balances(payment_contribution(payment), payment_contribution(updated))
+    )
+    
+    # AUTOMATICALLY ADD TO KASA (CASH TRANSACTIONS)
+    # When we pay a debt (borc), it's an expense (gider) from our cash
+    if payment['payment_type'] == 'borc':
+        # Borç ödedik = Kasadan gider
+        transaction = Transaction(
+            type='gider',
+            payment_method='nakit',
+            amount=request.amount,
+            description=f"{payment['customer_name']} - Borç ödemesi (Ödeme ID: {request.payment_id[:8]})"
+        )
+        doc = store_amounts(transaction.model_dump(), "transactions")
+        doc['transaction_date'] = doc['transaction_date'].isoformat()
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['updated_seq'] = await next_seq()
+        await db.transactions.insert_one(doc)
+        publish_change("transactions", "created", transaction.id, doc['updated_seq'], transaction_contribution(doc))
+    elif payment['payment_type'] == 'alacak':
+        # Alacak tahsil ettik = Kasaya gelir
+        transaction = Transaction(
+            type='gelir',
+            payment_method='nakit',
+            amount=request.amount,
+            description=f"{payment['customer_name']} - Alacak tahsilatı (Ödeme ID: {request.payment_id[:8]})"
+        )
+        doc = store_amounts(transaction.model_dump(), "transactions")
+        doc['transaction_date'] = doc['transaction_date'].isoformat()
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['updated_seq'] = await next_seq()
+        await db.transactions.insert_one(doc)
+        publish_change("transactions", "created", transaction.id, doc['updated_seq'], transaction_contribution(doc))
+    
+    return {
+        "message": "Ödeme kaydedildi ve kasaya yansıtıldı",
+        "paid_amount": to_lira(new_paid),
+        "remaining": to_lira(payment['amount'] - new_paid),
+        "is_fully_paid": is_fully_paid,
+        "cash_transaction_created": True
+    }
+
+@router.put("/payments/{payment_id}", response_model=Payment)
+async def update_payment(payment_id: str, payment_data: PaymentCreate):
+    existing = await db.payments.find_one({"id": payment_id}, {"_id": 0})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Ödeme bulunamadı")
+    
+    update_data = store_amounts(payment_data.model_dump(), "payments")
+    if update_data.get('payment_date'):
+        update_data['payment_date'] = update_data['payment_date'].isoformat()
+    update_data['due_date'] = update_data['due_date'].isoformat()
+    await ensure_payment_open(existing)
+    await ensure_payment_open({**existing, **update_data})
+    update_data['updated_seq'] = await next_seq()
+    
+    await db.payments.update_one({"id": payment_id}, {"$set": update_data})
+    
+    updated = await db.payments.find_one({"id": payment_id}, {"_id": 0})
+    await invalidate_checkpoints(existing['created_at'], existing.get('payment_date'), updated.get('payment_date'))
+    load_amounts(existing, "payments")
+    load_amounts(updated, "payments")
+    publish_change(
+        "payments", "updated", payment_id, update_data['updated_seq'],
+        diff_balances(payment_contribution(existing), payment_contribution(updated))
+    )
+    serve_amounts(updated, "payments")
+    if isinstance(updated['created_at'], str):
+        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
+    if isinstance(updated['due_date'], str):
+        updated['due_date'] = datetime.fromisoformat(updated['due_date'])
+    if updated.get('payment_date') and isinstance(updated['payment_date'], str):
+        updated['payment_date'] = datetime.fromisoformat(updated['payment_date'])
+    return Payment(**updated)
+
+@router.delete("/payments/{payment_id}")
+async def delete_payment(payment_id: str):
+    existing = await db.payments.find_one({"id": payment_id}, {"_id": 0})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Ödeme bulunamadı")
+    await ensure_payment_open(existing)
+    
+    payment = await db.payments.find_one_and_delete({"id": payment_id}, {"_id": 0})
+    if not payment:
+        raise HTTPException(status_code=404, detail="Ödeme bulunamadı")
+    await invalidate_checkpoints(payment['created_at'], payment.get('payment_date'))
+    seq = await record_tombstone("payments", payment_id)
+    publish_change("payments", "deleted", payment_id, seq, diff_balances(payment_contribution(load_amounts(payment, "payments")), {}))
+    return {"message": "Ödeme silindi"}
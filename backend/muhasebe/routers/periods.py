@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Depends
+
+from muhasebe.database import db
+from muhasebe.models import PeriodCloseRequest
+from muhasebe.money import serve_amounts
+from muhasebe.periods import PERIODS_COLLECTION, BALANCES_COLLECTION, start_period_close
+from muhasebe.security import require_admin
+
+router = APIRouter()
+
+# Period close (admin)
+@router.get("/periods")
+async def get_periods(_: dict = Depends(require_admin)):
+    """Closed periods, newest first"""
+    closes = await db[PERIODS_COLLECTION].find({}, {"_id": 0}).sort("period_end", -1).to_list(100)
+    return [serve_amounts(close, PERIODS_COLLECTION) for close in closes]
+
+@router.post("/periods/close", status_code=202)
+async def close_period(request: PeriodCloseRequest, user: dict = Depends(require_admin)):
+    """Snapshot balances up to period_end and archive the settled records.
+    
+    Archiving runs in the background; poll GET /periods/{id} until its status
+    is `done`. Balances are correct as soon as the status is `archiving`.
+    """
+    return await start_period_close(request.period_end, request.label, user.get('username', 'admin'))
+
+@router.get("/periods/{period_id}")
+async def get_period(period_id: str, _: dict = Depends(require_admin)):
+    close = await db[PERIODS_COLLECTION].find_one({"id": period_id}, {"_id": 0})
+    if not close:
+        raise HTTPException(status_code=404, detail="Dönem bulunamadı")
+    return serve_amounts(close, PERIODS_COLLECTION)
+
+@router.get("/periods/{period_id}/balances")
+async def get_period_balances(period_id: str, _: dict = Depends(require_admin)):
+    """Closing per-customer payment totals of a period"""
+    rows = await db[BALANCES_COLLECTION].find({"period_id": period_id}, {"_id": 0}).to_list(None)
+    return [serve_amounts(row, BALANCES_COLLECTION) for row in rows]
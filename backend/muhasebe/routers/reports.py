@@ -0,0 +1,230 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from collections import defaultdict
+from datetime import datetime
+from io import BytesIO
+
+from metrics import MeteredPool
+from muhasebe.changes import dashboard_flight, export_flight
+from muhasebe.config import EXPORT_POOL_SIZE
+from muhasebe.database import db, read_group
+from muhasebe.models import DashboardStats
+from muhasebe.money import as_kurus, kurus_expr, signed_amount_expr, load_amounts, serve_amounts, to_lira
+from muhasebe.periods import snapshot_close, find_with_archive, aggregate_with_archive
+from muhasebe.tenancy import current_tenant
+
+router = APIRouter()
+
+# xlsx rendering is CPU bound; run it off the event loop
+export_pool = MeteredPool("export", EXPORT_POOL_SIZE)
+
+# Dashboard stats
+@router.get("/dashboard/stats", response_model=DashboardStats)
+async def get_dashboard_stats():
+    # May be read from a secondary, up to READ_MAX_STALENESS_DASHBOARD behind
+    with read_group("dashboard"):
+        return await dashboard_flight.do(current_tenant.get(), compute_dashboard_stats)
+
+async def compute_dashboard_stats() -> DashboardStats:
+    # Totals are summed in the database, in kuruş
+    # Calculate receivables and payables
+    open_totals = {"alacak": 0, "borc": 0}
+    async for row in db.payments.aggregate([
+        {"$match": {"is_paid": {"$ne": True}, "payment_type": {"$in": list(open_totals)}}},
+        {"$group": {"_id": "$payment_type", "total": {"$sum": kurus_expr("amount")}}}
+    ]):
+        open_totals[row['_id']] = row['total']
+    
+    # Count customers
+    total_customers = await db.customers.count_documents({})
+    
+    # Calculate cash balances, starting from the last period close
+    close = await snapshot_close()
+    balances = {
+        "nakit": as_kurus(close['cash_balance']) if close else 0,
+        "pos": as_kurus(close['pos_balance']) if close else 0
+    }
+    query = {"transaction_date": {"$gte": close['period_end']}} if close else {}
+    async for row in db.transactions.aggregate([
+        {"$match": query},
+        {"$group": {"_id": "$payment_method", "total": {"$sum": signed_amount_expr()}}}
+    ]):
+        if row['_id'] in balances:
+            balances[row['_id']] += row['total']
+    
+    return DashboardStats(
+        total_receivable=to_lira(open_totals['alacak']),
+        total_payable=to_lira(open_totals['borc']),
+        total_customers=total_customers,
+        cash_balance=to_lira(balances['nakit']),
+        pos_balance=to_lira(balances['pos']),
+        total_balance=to_lira(balances['nakit'] + balances['pos'])
+    )
+
+# Excel export
+@router.get("/reports/export")
+async def export_to_excel(report_type: str, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    with read_group("reports"):
+        content = await export_flight.do(
+            (current_tenant.get(), report_type, start_date, end_date),
+            lambda: build_report(report_type, start_date, end_date)
+        )
+    filename = f"{report_type}_raporu_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    
+    return StreamingResponse(
+        BytesIO(content),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+async def build_report(report_type: str, start_date: Optional[str], end_date: Optional[str]) -> bytes:
+    """Render a report to xlsx bytes; shared between coalesced export requests"""
+    # pandas takes ~0.5s to import; only load it once someone exports
+    import pandas as pd
+    
+    query = {}
+    
+    # Add date filter if provided
+    if start_date and end_date:
+        query['created_at'] = {
+            "$gte": start_date,
+            "$lte": end_date
+        }
+    
+    if report_type == "customers":
+        customers = await db.customers.find({}, {"_id": 0}).to_list(10000)
+        df = pd.DataFrame(customers)
+        if len(df) > 0:
+            df = df[['name', 'phone', 'address', 'tax_number', 'notes']]
+            df.columns = ['Cari Adı', 'Telefon', 'Adres', 'Vergi No', 'Notlar']
+    
+    elif report_type == "payments":
+        payments = await find_with_archive("payments", query)
+        df = pd.DataFrame([serve_amounts(p, "payments") for p in payments])
+        if len(df) > 0:
+            df = df[['customer_name', 'amount', 'payment_type', 'is_paid', 'due_date', 'description']]
+            df.columns = ['Cari', 'Tutar', 'Tür', 'Ödendi', 'Vade Tarihi', 'Açıklama']
+    
+    elif report_type == "transactions":
+        transactions = await find_with_archive("transactions", query)
+        df = pd.DataFrame([serve_amounts(t, "transactions") for t in transactions])
+        if len(df) > 0:
+            df = df[['type', 'payment_method', 'amount', 'description', 'transaction_date']]
+            df.columns = ['Tür', 'Ödeme Yöntemi', 'Tutar', 'Açıklama', 'Tarih']
+    
+    elif report_type == "summary":
+        # Generate comprehensive summary report
+        customers = await db.customers.find({}, {"_id": 0}).to_list(10000)
+        
+        # Apply date filter to payments and transactions if provided
+        payment_query = {}
+        transaction_query = {}
+        if start_date and end_date:
+            payment_query['created_at'] = {"$gte": start_date, "$lte": end_date}
+            transaction_query['created_at'] = {"$gte": start_date, "$lte": end_date}
+        
+        # Closed periods live in the archive collections. Payment totals are
+        # summed in the database (kuruş); only the open debts listed below
+        # are fetched. Every transaction is listed, so those are summed here.
+        payment_totals = defaultdict(int)
+        for row in await aggregate_with_archive("payments", [
+            {"$match": payment_query},
+            {"$group": {"_id": {"type": "$payment_type", "paid": "$is_paid"}, "total": {"$sum": kurus_expr("amount")}}}
+        ]):
+            payment_totals[(row['_id']['type'], bool(row['_id'].get('paid')))] += row['total']
+        open_debts = await find_with_archive("payments", {**payment_query, "payment_type": "borc", "is_paid": {"$ne": True}})
+        transactions = await find_with_archive("transactions", transaction_query)
+        for transaction in transactions:
+            load_amounts(transaction, "transactions")
+        
+        # Calculate totals
+        total_receivable = to_lira(payment_totals[('alacak', False)])
+        total_payable = to_lira(payment_totals[('borc', False)])
+        total_paid = to_lira(sum(total for (_, paid), total in payment_totals.items() if paid))
+        total_income = to_lira(sum(t['amount'] for t in transactions if t['type'] == 'gelir'))
+        total_expense = to_lira(sum(t['amount'] for t in transactions if t['type'] == 'gider'))
+        cash_balance = to_lira(sum(t['amount'] if t['type'] == 'gelir' else -t['amount'] for t in transactions))
+        
+        # Create detailed summary with customer debts
+        summary_rows = []
+        
+        # Add header
+        summary_rows.append({
+            'Kategori': 'GENEL DURUM',
+            'Tutar': '',
+            'Tarih': '',
+            'Açıklama': ''
+        })
+        
+        summary_rows.append({'Kategori': 'Toplam Cari Sayısı', 'Tutar': f'{len(customers)} Adet', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'Toplam Alacak', 'Tutar': f'{total_receivable:.2f} ₺', 'Tarih': '', 'Açıklama': 'Ödenmemiş alacaklar'})
+        summary_rows.append({'Kategori': 'Toplam Borç', 'Tutar': f'{total_payable:.2f} ₺', 'Tarih': '', 'Açıklama': 'Ödenmemiş borçlar'})
+        summary_rows.append({'Kategori': 'Ödenen', 'Tutar': f'{total_paid:.2f} ₺', 'Tarih': '', 'Açıklama': 'Tamamlanan ödemeler'})
+        summary_rows.append({'Kategori': 'Kalan', 'Tutar': f'{(total_receivable - total_payable):.2f} ₺', 'Tarih': '', 'Açıklama': 'Alacak - Borç'})
+        
+        summary_rows.append({'Kategori': '', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'KASA DURUMU', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'Toplam Gelir', 'Tutar': f'{total_income:.2f} ₺', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'Toplam Gider', 'Tutar': f'{total_expense:.2f} ₺', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'GELİR - GİDER FARKI', 'Tutar': f'{(total_income - total_expense):.2f} ₺', 'Tarih': '', 'Açıklama': 'Net kasa kazancı/kaybı'})
+        summary_rows.append({'Kategori': 'Kasadaki Para', 'Tutar': f'{cash_balance:.2f} ₺', 'Tarih': '', 'Açıklama': 'Güncel kasa bakiyesi'})
+        summary_rows.append({'Kategori': '', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'NET MALİ DURUM', 'Tutar': f'{(cash_balance + total_receivable - total_payable):.2f} ₺', 'Tarih': '', 'Açıklama': 'Kasa + Alacak - Borç'})
+        
+        # Add customer debts details
+        summary_rows.append({'Kategori': '', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'CARİ BORÇLARI DETAYI', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        
+        debts_by_customer = defaultdict(list)
+        for debt in open_debts:
+            debts_by_customer[debt['customer_id']].append(load_amounts(debt, "payments"))
+        for customer in customers:
+            customer_debts = debts_by_customer.get(customer['id'])
+            if customer_debts:
+                summary_rows.append({'Kategori': f'{customer["name"]} - TOPLAM BORÇ', 'Tutar': f'{to_lira(sum(d["amount"] for d in customer_debts)):.2f} ₺', 'Tarih': '', 'Açıklama': ''})
+                for debt in customer_debts:
+                    summary_rows.append({
+                        'Kategori': f'  {customer["name"]}',
+                        'Tutar': f'{to_lira(debt["amount"]):.2f} ₺',
+                        'Tarih': debt['created_at'] if isinstance(debt['created_at'], str) else debt['created_at'].isoformat(),
+                        'Açıklama': debt.get('description', '-')
+                    })
+        
+        # Add income details
+        summary_rows.append({'Kategori': '', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'GELİRLER DETAYI', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        
+        for transaction in [t for t in transactions if t['type'] == 'gelir']:
+            summary_rows.append({
+                'Kategori': 'Gelir',
+                'Tutar': f'{to_lira(transaction["amount"]):.2f} ₺',
+                'Tarih': transaction['transaction_date'] if isinstance(transaction['transaction_date'], str) else transaction['transaction_date'].isoformat(),
+                'Açıklama': f"{transaction['description']} ({transaction['payment_method']})"
+            })
+        
+        # Add expense details
+        summary_rows.append({'Kategori': '', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        summary_rows.append({'Kategori': 'GİDERLER DETAYI', 'Tutar': '', 'Tarih': '', 'Açıklama': ''})
+        
+        for transaction in [t for t in transactions if t['type'] == 'gider']:
+            summary_rows.append({
+                'Kategori': 'Gider',
+                'Tutar': f'{to_lira(transaction["amount"]):.2f} ₺',
+                'Tarih': transaction['transaction_date'] if isinstance(transaction['transaction_date'], str) else transaction['transaction_date'].isoformat(),
+                'Açıklama': f"{transaction['description']} ({transaction['payment_method']})"
+            })
+        
+        df = pd.DataFrame(summary_rows)
+    
+    else:
+        raise HTTPException(status_code=400, detail="Geçersiz rapor tipi")
+    
+    return await export_pool.run(render_xlsx, df)
+
+def render_xlsx(df) -> bytes:
+    import pandas as pd
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Rapor')
+    return output.getvalue()
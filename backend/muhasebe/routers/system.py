@@ -0,0 +1,214 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, Response
+from typing import Optional
+import asyncio
+import logging
+import os
+
+from events import format_sse
+from slowops import SLOW_OPS_COLLECTION
+from muhasebe.changes import SYNC_COLLECTIONS, READ_FLIGHTS, event_bus, sync_watermark, tombstones_pruned_seq
+from muhasebe.config import SSE_HEARTBEAT_SECONDS, DEFAULT_TENANT_ID, SYNC_PAGE_SIZE
+from muhasebe.database import db, all_tenants_db, slow_op_logger, read_routing
+from muhasebe.models import User
+from muhasebe.money import MONEY_FIELDS, serve_amounts
+from muhasebe.tenancy import TENANT_FIELD, current_tenant
+from muhasebe.security import pwd_context, bcrypt_pool, require_admin
+
+router = APIRouter()
+
+@router.get("/")
+async def root():
+    return {"message": "Hello World"}
+
+@router.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "opensoftt-muhasebe"}
+
+@router.get("/debug/config")
+async def debug_config():
+    """Debug endpoint to check configuration"""
+    return {
+        "cors_origins": os.environ.get('CORS_ORIGINS', 'not set'),
+        "db_name": os.environ.get('DB_NAME', 'not set'),
+        "backend_running": True
+    }
+
+@router.get("/debug/read-routing")
+async def debug_read_routing():
+    """Read preference and concern of each endpoint group"""
+    return read_routing()
+
+@router.get("/debug/singleflight")
+async def debug_singleflight():
+    """Coalescing counters for the heavy read endpoints"""
+    return {flight.name: flight.stats() for flight in READ_FLIGHTS}
+
+@router.post("/debug/init-admin")
+async def force_init_admin():
+    """Force admin user creation - for troubleshooting"""
+    try:
+        # Same as the login bootstrap: one admin, in the default tenant
+        admin_exists = await all_tenants_db.users.find_one({"username": "admin"})
+        if admin_exists:
+            return {"message": "Admin user already exists", "username": "admin"}
+        
+        hashed_password = await bcrypt_pool.run(pwd_context.hash, "admin123")
+        admin_user = User(
+            username="admin",
+            password=hashed_password,
+            role="admin",
+            tenant_id=DEFAULT_TENANT_ID
+        )
+        doc = admin_user.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        await all_tenants_db.users.insert_one(doc)
+        
+        return {"message": "Admin user created successfully", "username": "admin", "password": "admin123"}
+    except Exception as e:
+        logging.error(f"Failed to create admin: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create admin: {str(e)}")
+
+# Delta sync
+SYNC_PROJECTIONS = {
+    **{name: {"_id": 0, "search_key": 0, "search_terms": 0} for name in SYNC_COLLECTIONS},
+    "tombstones": {"_id": 0}
+}
+
+@router.get("/sync")
+async def sync_changes(since: int = 0, limit: int = SYNC_PAGE_SIZE):
+    """Return customers, payments and transactions changed or deleted after `since`.
+    
+    Clients store the returned token and pass it back on the next call. Changed
+    documents are full records; deletions come back as ids under `deleted`.
+    A change may be returned by more than one call, so clients apply them by id.
+    At most `limit` documents come back; while `has_more` is true the client
+    calls again with the new token. A token older than the retained tombstones
+    gets 410, and the client starts over from 0.
+    """
+    if since and since < await tombstones_pruned_seq():
+        raise HTTPException(status_code=410, detail="Senkronizasyon belirteci çok eski, tam senkronizasyon gerekli")
+    limit = max(1, min(limit, SYNC_PAGE_SIZE))
+    
+    # Taken before the queries, and below any seq still in flight (see
+    # changes.sync_watermark); changes after it come back on the next call
+    watermark = await sync_watermark(since)
+    pages = {}
+    for name, projection in SYNC_PROJECTIONS.items():
+        pages[name] = await db[name].find(
+            {"updated_seq": {"$gt": since}}, projection
+        ).sort("updated_seq", 1).to_list(limit)
+    
+    # A full page may stop partway through its last seq (documents written
+    # together share one), and the combined page must not pass `limit`; the
+    # page ends below whichever comes first
+    seqs = sorted(doc['updated_seq'] for docs in pages.values() for doc in docs)
+    ends = [docs[-1]['updated_seq'] for docs in pages.values() if len(docs) == limit]
+    if len(seqs) > limit:
+        ends.append(seqs[limit])
+    if ends:
+        page_end = min(ends) - 1
+        if page_end < seqs[0]:
+            # More than `limit` documents share the first seq: all of them
+            page_end = seqs[0]
+            for name, projection in SYNC_PROJECTIONS.items():
+                pages[name] = await db[name].find({"updated_seq": page_end}, projection).to_list(None)
+        else:
+            pages = {name: [doc for doc in docs if doc['updated_seq'] <= page_end] for name, docs in pages.items()}
+        token = min(page_end, watermark)
+        has_more = token > since
+    else:
+        token, has_more = watermark, False
+    
+    for name in SYNC_COLLECTIONS:
+        if name in MONEY_FIELDS:
+            for doc in pages[name]:
+                serve_amounts(doc, name)
+    deleted = {name: [] for name in SYNC_COLLECTIONS}
+    for tombstone in pages.pop("tombstones"):
+        deleted[tombstone['collection']].append(tombstone['id'])
+    
+    return {**pages, "deleted": deleted, "token": token, "has_more": has_more}
+
+# Slow operation log (admin)
+@router.get("/admin/slow-ops")
+async def get_slow_ops(
+    limit: int = 50,
+    collection: Optional[str] = None,
+    min_duration_ms: Optional[float] = None,
+    _: dict = Depends(require_admin)
+):
+    """Most recent slow MongoDB operations of the caller's company, newest first"""
+    # slow_ops is shared by all tenants, so the tenant is filtered explicitly
+    query = {TENANT_FIELD: current_tenant.get()}
+    if collection:
+        query['collection'] = collection
+    if min_duration_ms is not None:
+        query['duration_ms'] = {"$gte": min_duration_ms}
+    
+    records = await db[SLOW_OPS_COLLECTION].find(query, {"_id": 0}).sort("$natural", -1).to_list(min(limit, 500))
+    return {
+        "threshold_ms": slow_op_logger.threshold_ms,
+        "explain_sample_rate": slow_op_logger.explain_sample_rate,
+        "records": records
+    }
+
+# Request profiles (admin)
+@router.get("/admin/profiles")
+async def get_profiles(limit: int = 50, _: dict = Depends(require_admin)):
+    """Recently captured request profiles, without their payloads"""
+    return await db.profiles.find(
+        {}, {"_id": 0, "html": 0, "speedscope": 0, "text": 0}
+    ).sort("created_at", -1).to_list(min(limit, 500))
+
+@router.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "html", _: dict = Depends(require_admin)):
+    """Download a profile as pyinstrument HTML, speedscope JSON or cProfile text"""
+    profile = await db.profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    
+    if profile['engine'] == "cprofile":
+        return Response(profile['text'], media_type="text/plain; charset=utf-8")
+    if format == "speedscope":
+        return Response(
+            profile['speedscope'],
+            media_type="application/json",
+            headers={"Content-Disposition": f"attachment; filename=profile_{profile_id}.speedscope.json"}
+        )
+    if format == "html":
+        return Response(profile['html'], media_type="text/html; charset=utf-8")
+    raise HTTPException(status_code=400, detail="Geçersiz profil formatı")
+
+# Server-Sent Events
+@router.get("/events")
+async def stream_events(request: Request):
+    """Push entity change notifications and dashboard balance deltas.
+    
+    Each `change` event carries the sync seq as its id. A `resync` event means
+    events were dropped; the client should refetch (or call /sync) and reconnect.
+    """
+    async def event_stream():
+        queue = event_bus.subscribe(topic=current_tenant.get())
+        try:
+            yield format_sse({"token": await sync_watermark()}, event_type="ready")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    yield format_sse({}, event_type="resync")
+                    break
+                yield format_sse(event, event_id=event.get('seq'))
+        finally:
+            event_bus.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
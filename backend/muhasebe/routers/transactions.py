@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from datetime import datetime, timezone
+
+from events import diff_balances, transaction_contribution
+from muhasebe.balances import invalidate_checkpoints
+from muhasebe.changes import next_seq, record_tombstone, publish_change
+from muhasebe.database import db
+from muhasebe.money import store_amounts, load_amounts, serve_amounts
+from muhasebe.models import Transaction, TransactionCreate
+from muhasebe.periods import ensure_period_open
+from muhasebe.projection import parse_fields, field_projection, sparse_response
+
+router = APIRouter()
+
+# Transaction endpoints
+@router.get("/transactions", response_model=List[Transaction])
+async def get_transactions(fields: Optional[str] = None):
+    field_list = parse_fields(fields, Transaction)
+    if field_list:
+        transactions = await db.transactions.find({}, field_projection(field_list)).to_list(1000)
+        return sparse_response(Transaction, field_list, [serve_amounts(t, "transactions") for t in transactions])
+    
+    transactions = await db.transactions.find({}, {"_id": 0}).to_list(1000)
+    for transaction in transactions:
+        serve_amounts(transaction, "transactions")
+        if isinstance(transaction['transaction_date'], str):
+            transaction['transaction_date'] = datetime.fromisoformat(transaction['transaction_date'])
+        if isinstance(transaction['created_at'], str):
+            transaction['created_at'] = datetime.fromisoformat(transaction['created_at'])
+    return transactions
+
+@router.post("/transactions", response_model=Transaction)
+async def create_transaction(transaction_data: TransactionCreate):
+    if transaction_data.transaction_date is None:
+        transaction_data.transaction_date = datetime.now(timezone.utc)
+    await ensure_period_open(transaction_data.transaction_date)
+    
+    transaction = Transaction(**transaction_data.model_dump())
+    doc = store_amounts(transaction.model_dump(), "transactions")
+    doc['transaction_date'] = doc['transaction_date'].isoformat()
+    doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_seq'] = await next_seq()
+    await db.transactions.insert_one(doc)
+    await invalidate_checkpoints(doc['transaction_date'])
+    publish_change("transactions", "created", transaction.id, doc['updated_seq'], transaction_contribution(doc))
+    return transaction
+
+@router.delete("/transactions/{transaction_id}")
+async def delete_transaction(transaction_id: str):
+    existing = await db.transactions.find_one({"id": transaction_id}, {"_id": 0, "transaction_date": 1})
+    if not existing:
+        raise HTTPException(status_code=404, detail="İşlem bulunamadı")
+    await ensure_period_open(existing['transaction_date'])
+    
+    transaction = await db.transactions.find_one_and_delete({"id": transaction_id}, {"_id": 0})
+    if not transaction:
+        raise HTTPException(status_code=404, detail="İşlem bulunamadı")
+    await invalidate_checkpoints(transaction['transaction_date'])
+    seq = await record_tombstone("transactions", transaction_id)
+    publish_change("transactions", "deleted", transaction_id, seq, diff_balances(transaction_contribution(load_amounts(transaction, "transactions")), {}))
+    return {"message": "İşlem silindi"}
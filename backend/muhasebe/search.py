@@ -0,0 +1,44 @@
+import re
+from typing import Optional
+
+# Customer search helpers
+# Turkish letters are folded to their ASCII base so "ışık", "IŞIK" and "isik"
+# all produce the same key. Keys are stored on the customer document and
+# indexed, so typeahead lookups are anchored index range scans.
+TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i',
+    'Ş': 's', 'ş': 's',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ü': 'u', 'ü': 'u',
+    'Ö': 'o', 'ö': 'o',
+    'Ç': 'c', 'ç': 'c',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+})
+SEARCH_RESULT_LIMIT = 50
+
+def fold_search_text(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    folded = value.translate(TURKISH_FOLD).lower()
+    folded = re.sub(r'[^0-9a-z]+', ' ', folded)
+    return ' '.join(folded.split())
+
+def digits_only(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return re.sub(r'\D', '', value)
+
+def build_customer_search_fields(name: str, phone: Optional[str] = None, tax_number: Optional[str] = None) -> dict:
+    """Normalized keys used by /customers/search"""
+    search_key = fold_search_text(name)
+    terms = set(search_key.split())
+    if search_key:
+        terms.add(search_key)
+    for number in (digits_only(phone), digits_only(tax_number)):
+        if number:
+            terms.add(number)
+            if number.lstrip('0'):
+                terms.add(number.lstrip('0'))
+    return {"search_key": search_key, "search_terms": sorted(terms)}
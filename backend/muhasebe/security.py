@@ -0,0 +1,49 @@
+from fastapi import HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from passlib.context import CryptContext
+from typing import Optional
+import jwt
+
+from metrics import MeteredPool
+from muhasebe.config import SECRET_KEY, ALGORITHM, BCRYPT_POOL_SIZE
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# bcrypt is deliberately slow; run it off the event loop
+bcrypt_pool = MeteredPool("bcrypt", BCRYPT_POOL_SIZE)
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    """Decode the JWT issued by /auth/login"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Oturum açmanız gerekiyor")
+    try:
+        return jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Geçersiz oturum")
+
+async def require_admin(user: dict = Depends(get_current_user)) -> dict:
+    if user.get('role') != 'admin':
+        raise HTTPException(status_code=403, detail="Bu işlem için yönetici yetkisi gerekiyor")
+    return user
+
+def is_admin_authorization(authorization: Optional[str]) -> bool:
+    """Same check as require_admin, for middleware that only has the raw header"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return False
+    return payload.get('role') == 'admin'
+
+def subject_from_authorization(authorization: Optional[str]) -> Optional[str]:
+    """Username of a valid token, None otherwise"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    return payload.get('username')
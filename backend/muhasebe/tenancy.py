@@ -0,0 +1,173 @@
+"""Multi-company tenancy.
+
+Every business document (users, customers, payments, transactions and the
+records derived from them) carries a `tenant_id`. The tenant of a request
+comes from the `tenant_id` claim of its JWT. API requests without a valid
+token carrying that claim (including tokens issued before tenancy) get 401;
+only login and health checks are public.
+
+TenantMiddleware puts the tenant in a context variable, and the `db` proxy
+hands out TenantCollection wrappers that add it to every filter, aggregation
+and inserted document, so handlers query as if the database held only their
+company. Every compound index leads with tenant_id, which is also the
+natural shard key prefix for large tenants.
+
+Work outside a request (startup, background builders) runs as the default
+tenant unless wrapped in `tenant_scope`. `all_tenants_db` bypasses scoping
+for the few lookups that must (login by username, per-tenant job loops).
+"""
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional
+from urllib.parse import parse_qs
+
+import jwt
+
+from muhasebe.config import SECRET_KEY, ALGORITHM, DEFAULT_TENANT_ID
+
+TENANT_FIELD = "tenant_id"
+
+# Operational collections shared by all tenants
+UNSCOPED_COLLECTIONS = {"counters", "leases", "slow_ops"}
+
+def tenant_index(*fields) -> list:
+    """Compound index keys led by tenant_id; fields are names or (name, direction)"""
+    return [(TENANT_FIELD, 1)] + [f if isinstance(f, tuple) else (f, 1) for f in fields]
+
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT_ID)
+
+@contextmanager
+def tenant_scope(tenant_id: str):
+    token = current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+def tenant_from_authorization(authorization: Optional[str]) -> Optional[str]:
+    """Tenant claim of a valid token; None without one"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    return payload.get(TENANT_FIELD) or None
+
+async def _unauthorized(send):
+    body = json.dumps({"detail": "Oturum açmanız gerekiyor"}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 401,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"www-authenticate", b"Bearer"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class TenantMiddleware:
+    """Requests under `prefix` need a token with a tenant claim, except
+    `public_paths` (login, health), which run as the default tenant. Paths in
+    `query_token_paths` may pass the token as `?token=`, for EventSource,
+    which cannot set headers."""
+
+    def __init__(self, app, prefix: str = "/api/", public_paths: Iterable[str] = (),
+                 query_token_paths: Iterable[str] = ()):
+        self.app = app
+        self.prefix = prefix
+        self.public_paths = set(public_paths)
+        self.query_token_paths = set(query_token_paths)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith(self.prefix) or path in self.public_paths:
+            await self.app(scope, receive, send)
+            return
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        if authorization is None and path in self.query_token_paths:
+            token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+            if token:
+                authorization = f"Bearer {token[0]}"
+        tenant_id = tenant_from_authorization(authorization)
+        if tenant_id is None:
+            await _unauthorized(send)
+            return
+        with tenant_scope(tenant_id):
+            await self.app(scope, receive, send)
+
+def tenant_filter(filter: Optional[dict] = None) -> dict:
+    """filter restricted to the current tenant"""
+    return {**(filter or {}), TENANT_FIELD: current_tenant.get()}
+
+class TenantCollection:
+    """Motor collection restricted to the current tenant.
+
+    bulk_write passes through unscoped, since pymongo's request objects
+    don't expose their filters; build its requests with tenant_filter() and
+    stamp inserted documents with the tenant.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        # Index management, name, database, ... pass through
+        return getattr(self._collection, name)
+
+    @staticmethod
+    def _scoped(filter: Optional[dict]) -> dict:
+        return tenant_filter(filter)
+
+    @staticmethod
+    def _stamped(document: dict) -> dict:
+        document[TENANT_FIELD] = current_tenant.get()
+        return document
+
+    def find(self, filter=None, *args, **kwargs):
+        return self._collection.find(self._scoped(filter), *args, **kwargs)
+
+    async def find_one(self, filter=None, *args, **kwargs):
+        return await self._collection.find_one(self._scoped(filter), *args, **kwargs)
+
+    async def find_one_and_update(self, filter, update, *args, **kwargs):
+        return await self._collection.find_one_and_update(self._scoped(filter), update, *args, **kwargs)
+
+    async def find_one_and_delete(self, filter, *args, **kwargs):
+        return await self._collection.find_one_and_delete(self._scoped(filter), *args, **kwargs)
+
+    async def count_documents(self, filter, *args, **kwargs):
+        return await self._collection.count_documents(self._scoped(filter), *args, **kwargs)
+
+    async def distinct(self, key, filter=None, *args, **kwargs):
+        return await self._collection.distinct(key, self._scoped(filter), *args, **kwargs)
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        return self._collection.aggregate([{"$match": self._scoped(None)}] + list(pipeline), *args, **kwargs)
+
+    async def insert_one(self, document, *args, **kwargs):
+        return await self._collection.insert_one(self._stamped(document), *args, **kwargs)
+
+    async def insert_many(self, documents, *args, **kwargs):
+        return await self._collection.insert_many([self._stamped(d) for d in documents], *args, **kwargs)
+
+    async def update_one(self, filter, update, *args, **kwargs):
+        return await self._collection.update_one(self._scoped(filter), update, *args, **kwargs)
+
+    async def update_many(self, filter, update, *args, **kwargs):
+        return await self._collection.update_many(self._scoped(filter), update, *args, **kwargs)
+
+    async def replace_one(self, filter, replacement, *args, **kwargs):
+        return await self._collection.replace_one(self._scoped(filter), self._stamped(replacement), *args, **kwargs)
+
+    async def delete_one(self, filter, *args, **kwargs):
+        return await self._collection.delete_one(self._scoped(filter), *args, **kwargs)
+
+    async def delete_many(self, filter, *args, **kwargs):
+        return await self._collection.delete_many(self._scoped(filter), *args, **kwargs)
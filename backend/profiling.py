@@ -0,0 +1,143 @@
+"""On-demand profiling of single API requests.
+
+An admin sends `X-Profile: 1` with any /api request. The request is profiled
+(pyinstrument when installed, cProfile otherwise), the result is stored under
+a short id and the response carries `X-Profile-Id`. Requests without the
+header only pay for one header lookup.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import secrets
+import time
+from typing import Awaitable, Callable, Optional
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument is optional, cProfile is always available
+    Profiler = None
+
+PROFILE_HEADER = b"x-profile"
+
+
+class _PyinstrumentSession:
+    engine = "pyinstrument"
+
+    def __init__(self):
+        # async_mode follows the request's task across awaits and ignores
+        # other requests running on the same event loop
+        self.profiler = Profiler(async_mode="enabled")
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self) -> dict:
+        self.profiler.stop()
+        return {
+            "html": self.profiler.output_html(),
+            "speedscope": self.profiler.output(renderer=SpeedscopeRenderer()),
+        }
+
+
+class _CProfileSession:
+    engine = "cprofile"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self) -> dict:
+        self.profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(80)
+        return {"text": output.getvalue()}
+
+
+def new_profile_session():
+    return _PyinstrumentSession() if Profiler is not None else _CProfileSession()
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        authorize: Callable[[Optional[str]], bool],
+        store: Callable[[dict], Awaitable[None]],
+        path_prefix: str = "/api",
+    ):
+        self.app = app
+        self.authorize = authorize
+        self.store = store
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        requested = False
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                requested = value not in (b"", b"0", b"false")
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+        if not requested or not self.authorize(authorization):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = secrets.token_urlsafe(6)
+        session = new_profile_session()
+        status_code = 500
+        stored = False
+        started = time.perf_counter()
+
+        async def finish():
+            nonlocal stored
+            if stored:
+                return
+            stored = True
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                result = session.stop()
+                await self.store({
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query_string": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "engine": session.engine,
+                    **result,
+                })
+            except Exception as e:
+                logging.error(f"Failed to store profile {profile_id}: {str(e)}")
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode("latin-1"))],
+                }
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Store before the last chunk so the id is downloadable once
+                # the client has the full response
+                await finish()
+            await send(message)
+
+        try:
+            session.start()
+        except (ValueError, RuntimeError):
+            # Another request is already being profiled on this thread
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await finish()
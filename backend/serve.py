@@ -0,0 +1,104 @@
+"""Production entry point: several uvicorn worker processes behind one port.
+
+    cd backend && WEB_CONCURRENCY=4 python serve.py
+
+A single event loop tops out at one core, and bcrypt, xlsx rendering and JSON
+encoding all compete for it. Running one worker per core multiplies
+throughput; each worker has its own MongoDB pool, thread pools and event bus.
+
+Live events (/api/events) and the invalidation of coalesced reads are per
+process, so a write handled by one worker is only seen by the others through
+a MongoDB change stream. Several workers therefore need EVENTS_CHANGE_STREAMS=1
+and a replica set or sharded cluster; without it serve.py runs one worker and
+refuses WEB_CONCURRENCY > 1.
+
+Settings (environment):
+    WEB_CONCURRENCY          worker processes (default: CPU count with change
+                             streams, else 1)
+    HOST / PORT              bind address (default 0.0.0.0:8001)
+    GRACEFUL_TIMEOUT         seconds to let in-flight requests finish on
+                             SIGTERM before connections are closed (default 30)
+    MONGO_MAX_POOL_SIZE      connections per worker; size it so that
+                             workers * pool stays under the server's limit
+
+One-time startup work (indexes, backfills, admin user) is done by whichever
+worker takes the `startup-tasks` lease in MongoDB. Prometheus metrics are
+aggregated across workers through PROMETHEUS_MULTIPROC_DIR, which is set to a
+fresh directory here when not given.
+
+`uvicorn server:app` still works for development with a single process.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from typing import Optional
+
+import uvicorn
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from muhasebe.config import CHANGE_STREAMS_ENABLED, MONGO_URL
+
+
+def change_streams_available(mongo_url: str) -> Optional[bool]:
+    """True on a replica set or sharded cluster, False on a standalone server,
+    None when MongoDB can't be reached to tell"""
+    try:
+        client = MongoClient(mongo_url, serverSelectionTimeoutMS=5000)
+    except PyMongoError:
+        return None
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError:
+        return None
+    finally:
+        client.close()
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def main():
+    default_workers = (os.cpu_count() or 1) if CHANGE_STREAMS_ENABLED else 1
+    workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
+    if workers > 1:
+        if not CHANGE_STREAMS_ENABLED:
+            sys.exit(
+                "WEB_CONCURRENCY > 1 needs EVENTS_CHANGE_STREAMS=1: without change streams, "
+                "workers miss each other's writes in live events and cached reads"
+            )
+        available = change_streams_available(MONGO_URL)
+        if available is False:
+            sys.exit(
+                "EVENTS_CHANGE_STREAMS=1 needs a replica set or sharded cluster; "
+                "run a single-node replica set or set WEB_CONCURRENCY=1"
+            )
+        if available is None:
+            # Workers retry MongoDB on their own; the change stream logs its errors
+            print("serve.py: MongoDB unreachable, change stream support not verified", file=sys.stderr)
+
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", "8001"))
+    graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+
+    if workers > 1:
+        # Must be set before any worker imports prometheus_client; stale files
+        # from a previous run would be counted as live workers
+        multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        if multiproc_dir:
+            shutil.rmtree(multiproc_dir, ignore_errors=True)
+            os.makedirs(multiproc_dir)
+        else:
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="muhasebe-metrics-")
+
+    uvicorn.run(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        proxy_headers=True,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
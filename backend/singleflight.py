@@ -0,0 +1,70 @@
+"""Request coalescing for expensive read endpoints.
+
+Concurrent calls with the same key share one computation: the first caller
+starts it as a task and everyone awaits that task. With a ttl the finished
+result is also reused for a short while. Writes call clear() so a cached
+result never outlives the data it was computed from.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    def __init__(self, name: str, ttl: float = 0.0):
+        self.name = name
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._generation = 0
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+
+        if self.ttl > 0:
+            cached = self._results.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return cached[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            generation = self._generation
+            task.add_done_callback(lambda t: self._finish(key, t, generation))
+
+        # shield: a caller that disconnects must not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task, generation: int):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # A result computed across a clear() may predate the write; don't cache it
+        if generation != self._generation:
+            return
+        if self.ttl > 0 and not task.cancelled() and task.exception() is None:
+            self._results[key] = (time.monotonic() + self.ttl, task.result())
+
+    def clear(self):
+        # Callers arriving after a write start a fresh computation
+        self._generation += 1
+        self._results.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "in_flight": len(self._inflight),
+            "ttl_seconds": self.ttl,
+        }
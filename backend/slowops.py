@@ -0,0 +1,225 @@
+"""Slow MongoDB operation log with sampled explain plans.
+
+SlowOpLogger is a pymongo CommandListener registered on the Motor client.
+Commands slower than the threshold are handed from the driver thread to an
+asyncio task which, for a sample of them, runs explain("executionStats") and
+stores one record per operation in the capped `slow_ops` collection. Only the
+shape of the filter is stored, never the values; explain output is reduced
+to stage names, index names and counters for the same reason. Records carry
+the tenant the command ran for, so each company only sees its own.
+"""
+import asyncio
+import json
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+SLOW_OPS_COLLECTION = "slow_ops"
+SLOW_OPS_CAPPED_BYTES = 16 * 1024 * 1024
+EXPLAIN_MAX_CHARS = 64 * 1024
+
+# Commands that can be explained, and where their filter lives
+EXPLAINABLE_COMMANDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+    "update": "updates",
+    "delete": "deletes",
+}
+# Driver/session fields that explain rejects or that don't belong to the operation
+_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "$clusterTime",
+                   "$db", "$readPreference", "readConcern", "writeConcern"}
+# Explain keys that hold nested plan nodes; of the rest only numbers (the
+# execution stats) and the names below are kept. parsedQuery, filter and
+# indexBounds hold the query's literal values and are dropped.
+_PLAN_CHILDREN = {"queryPlanner", "winningPlan", "queryPlan", "executionStats", "executionStages",
+                  "inputStage", "inputStages", "stages", "$cursor", "shards"}
+_PLAN_NAMES = {"stage", "indexName", "shardName"}
+
+
+def query_shape(value):
+    """Replace literal values with '?' but keep field names and operators"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [query_shape(value[0])] if value else []
+    return "?"
+
+
+def command_filter(command_name: str, command: dict):
+    field = EXPLAINABLE_COMMANDS.get(command_name)
+    value = command.get(field) if field else None
+    if command_name in ("update", "delete") and value:
+        # Bulk write: shape of the first statement's query
+        value = value[0].get("q")
+    return query_shape(value) if value is not None else None
+
+
+def plan_stages(explain: dict) -> list:
+    """Stage names of the winning plan, outermost first (e.g. FETCH, IXSCAN)"""
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "stage" in node and isinstance(node["stage"], str):
+                stages.append(node["stage"])
+            for key, child in node.items():
+                if key not in ("rejectedPlans", "allPlansExecution"):
+                    walk(child)
+        elif isinstance(node, list):
+            for child in node:
+                walk(child)
+
+    walk(explain.get("queryPlanner", {}).get("winningPlan") or explain)
+    return stages
+
+
+def redact_plan(node):
+    """Explain output without literal values: plan structure, stage and index
+    names and numeric stats. Aggregation stages keep their name only."""
+    if isinstance(node, list):
+        return [redact_plan(child) for child in node]
+    if not isinstance(node, dict):
+        return None
+    kept = {}
+    for key, value in node.items():
+        if key in _PLAN_CHILDREN:
+            kept[key] = redact_plan(value)
+        elif key in _PLAN_NAMES and isinstance(value, str):
+            kept[key] = value
+        elif key.startswith("$"):
+            kept["stage"] = key
+        elif isinstance(value, (int, float)):
+            kept[key] = value
+    return kept
+
+
+class SlowOpLogger(monitoring.CommandListener):
+    """`tenant` is called on the driver thread when a command starts (Motor
+    runs it in a copy of the caller's context) and its result is stored with
+    the record."""
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float = 0.2,
+                 tenant: Optional[Callable[[], Optional[str]]] = None):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.tenant = tenant
+        self._commands = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    # Driver thread side
+
+    def started(self, event):
+        if not self.enabled or self._loop is None:
+            return
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if collection == SLOW_OPS_COLLECTION:
+            return
+        # Kept by reference; only copied in _finish if the command was slow
+        tenant_id = self.tenant() if self.tenant else None
+        self._commands[event.request_id] = (event.database_name, event.command, tenant_id)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        started = self._commands.pop(event.request_id, None)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        database_name, command, tenant_id = started
+        command = {k: v for k, v in command.items() if k not in _SESSION_FIELDS}
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, database_name, command, tenant_id, duration_ms, failed)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def _enqueue(self, database_name: str, command: dict, tenant_id: Optional[str], duration_ms: float,
+                 failed: bool):
+        try:
+            self._queue.put_nowait((database_name, command, tenant_id, duration_ms, failed))
+        except asyncio.QueueFull:
+            logging.warning("Slow op queue full, dropping record")
+
+    # Event loop side
+
+    async def start(self, db):
+        if not self.enabled:
+            return
+        self._db = db
+        try:
+            await db.create_collection(SLOW_OPS_COLLECTION, capped=True, size=SLOW_OPS_CAPPED_BYTES)
+        except (CollectionInvalid, OperationFailure):
+            # Already created, possibly by another worker
+            pass
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=1000)
+        self._task = asyncio.create_task(self._drain())
+
+    def stop(self):
+        self._loop = None
+        if self._task:
+            self._task.cancel()
+
+    async def _drain(self):
+        while True:
+            database_name, command, tenant_id, duration_ms, failed = await self._queue.get()
+            try:
+                await self._record(database_name, command, tenant_id, duration_ms, failed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Failed to record slow op: {str(e)}")
+
+    async def _record(self, database_name: str, command: dict, tenant_id: Optional[str], duration_ms: float,
+                      failed: bool):
+        command_name = next(iter(command))
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "tenant_id": tenant_id,
+            "database": database_name,
+            "collection": command.get(command_name),
+            "command": command_name,
+            "duration_ms": round(duration_ms, 2),
+            "failed": failed,
+            "filter_shape": json.dumps(command_filter(command_name, command), sort_keys=True),
+            "plan": None,
+            "explain": None,
+        }
+
+        if not failed and random.random() < self.explain_sample_rate:
+            try:
+                explain = await self._db.client[database_name].command(
+                    {"explain": command, "verbosity": "executionStats"}
+                )
+                stats = explain.get("executionStats", {})
+                record["plan"] = plan_stages(explain)
+                record["docs_examined"] = stats.get("totalDocsExamined")
+                record["keys_examined"] = stats.get("totalKeysExamined")
+                record["n_returned"] = stats.get("nReturned")
+                record["explain"] = json.dumps(redact_plan(explain), default=str)[:EXPLAIN_MAX_CHARS]
+            except Exception as e:
+                record["explain_error"] = str(e)
+
+        await self._db[SLOW_OPS_COLLECTION].insert_one(record)
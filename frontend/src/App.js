@@ -1,4 +1,5 @@
 import { useState, useEffect } from "react";
+import axios from "axios";
 import "@/App.css";
 import { BrowserRouter, Routes, Route, Navigate } from "react-router-dom";
 import LoginPage from "./pages/LoginPage";
@@ -11,6 +12,19 @@ import ReportsPageEnhanced from "./pages/ReportsPageEnhanced";
 import SettingsPage from "./pages/SettingsPage";
 import Layout from "./components/Layout";
 import { Toaster } from "./components/ui/sonner";
+import { authToken } from "./config";
+
+const setAuthToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common.Authorization = `Bearer ${token}`;
+  } else {
+    delete axios.defaults.headers.common.Authorization;
+  }
+};
+
+// Set before the first render; pages fetch from their own effects, which run
+// before App's
+setAuthToken(authToken());
 
 function App() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -25,9 +39,24 @@ function App() {
     }
   }, []);
 
+  useEffect(() => {
+    // An expired or pre-tenancy token: back to the login page
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && authToken()) {
+          handleLogout();
+        }
+        return Promise.reject(error);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   const handleLogin = (token, userData) => {
     localStorage.setItem('token', token);
     localStorage.setItem('user', JSON.stringify(userData));
+    setAuthToken(token);
     setIsAuthenticated(true);
     setUser(userData);
   };
@@ -35,6 +64,7 @@ function App() {
   const handleLogout = () => {
     localStorage.removeItem('token');
     localStorage.removeItem('user');
+    setAuthToken(null);
     setIsAuthenticated(false);
     setUser(null);
   };
@@ -2,3 +2,10 @@
 // This ensures it works on any domain (preview, custom domain, localhost)
 export const BACKEND_URL = window.location.origin;
 export const API = `${BACKEND_URL}/api`;
+
+// JWT from the last login; the server scopes every API call to its company
+export const authToken = () => localStorage.getItem('token');
+export const authHeaders = () => {
+  const token = authToken();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -97,7 +97,7 @@ const CustomerDetailPage = () => {
       setSelectedPayment(null);
       fetchCustomerData();
     } catch (error) {
-      toast.error('Ödeme kaydedilemedi');
+      toast.error(error.response?.data?.detail || 'Ödeme kaydedilemedi');
     }
   };
 
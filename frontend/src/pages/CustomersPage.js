@@ -40,7 +40,7 @@ const CustomersPage = () => {
       await Promise.all(
         response.data.map(async (customer) => {
           try {
-            const summaryRes = await axios.get(`${API}/customers/${customer.id}/summary`);
+            const summaryRes = await axios.get(`${API}/customers/${customer.id}/summary?fields=id`);
             summaries[customer.id] = summaryRes.data;
           } catch (error) {
             console.error(`Failed to fetch summary for ${customer.id}`);
@@ -65,7 +65,9 @@ const CustomersPage = () => {
 
     try {
       if (editingCustomer) {
-        await axios.put(`${API}/customers/${editingCustomer.id}`, formData);
+        // A new name is copied to the customer's payments too
+        const cascade = formData.name !== editingCustomer.name;
+        await axios.put(`${API}/customers/${editingCustomer.id}`, formData, { params: { cascade } });
         toast.success('Cari güncellendi');
       } else {
         await axios.post(`${API}/customers`, formData);
@@ -80,14 +82,18 @@ const CustomersPage = () => {
   };
 
   const handleDelete = async (id) => {
-    if (!window.confirm('Bu cariyi silmek istediğinizden emin misiniz?')) return;
-
     try {
-      await axios.delete(`${API}/customers/${id}`);
+      const { data: preview } = await axios.delete(`${API}/customers/${id}`, { params: { dry_run: true } });
+      const message = preview.payments
+        ? `Bu cari ve ${preview.payments} ödemesi silinecek. Emin misiniz?`
+        : 'Bu cariyi silmek istediğinizden emin misiniz?';
+      if (!window.confirm(message)) return;
+
+      await axios.delete(`${API}/customers/${id}`, { params: { cascade: true } });
       toast.success('Cari silindi');
       fetchCustomers();
     } catch (error) {
-      toast.error('Silme başarısız');
+      toast.error(error.response?.data?.detail || 'Silme başarısız');
     }
   };
 
@@ -3,7 +3,7 @@ import axios from 'axios';
 import { TrendingUp, TrendingDown, Users, Wallet, Clock, Calendar } from 'lucide-react';
 import { format } from 'date-fns';
 import { tr } from 'date-fns/locale';
-import { API } from '../config';
+import { API, authToken } from '../config';
 
 const Dashboard = () => {
   const [stats, setStats] = useState(null);
@@ -16,6 +16,27 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchDashboardData();
+
+    // Live updates: apply balance deltas pushed by the server instead of polling
+    // EventSource can't send headers; the server accepts the token as a query parameter here
+    const source = new EventSource(`${API}/events?token=${encodeURIComponent(authToken() || '')}`);
+    source.addEventListener('change', (e) => {
+      const event = JSON.parse(e.data);
+      if (!event.delta) {
+        fetchDashboardData();
+        return;
+      }
+      setStats((prev) => {
+        if (!prev) return prev;
+        const next = { ...prev };
+        Object.entries(event.delta).forEach(([key, value]) => {
+          next[key] = (next[key] || 0) + value;
+        });
+        return next;
+      });
+    });
+    source.addEventListener('resync', fetchDashboardData);
+    return () => source.close();
   }, []);
 
   const fetchDashboardData = async () => {
@@ -38,7 +38,8 @@ const PaymentsPage = () => {
     try {
       const [paymentsRes, customersRes] = await Promise.all([
         axios.get(`${API}/payments`),
-        axios.get(`${API}/customers`),
+        // The form only needs the picker fields
+        axios.get(`${API}/customers?fields=name`),
       ]);
       setPayments(paymentsRes.data);
       setCustomers(customersRes.data);
@@ -2,14 +2,14 @@ import { Button } from '../components/ui/button';
 import { toast } from 'sonner';
 import { Download, FileSpreadsheet } from 'lucide-react';
 
-import { API } from '../config';
+import { API, authHeaders } from '../config';
 
 
 const ReportsPage = () => {
   const handleExport = async (reportType, reportName) => {
     try {
       toast.info('Rapor hazırlanıyor...');
-      const response = await fetch(`${API}/reports/export?report_type=${reportType}`);
+      const response = await fetch(`${API}/reports/export?report_type=${reportType}`, { headers: authHeaders() });
       
       if (!response.ok) {
         throw new Error('Rapor oluşturulamadı');
@@ -9,7 +9,7 @@ import { Download, Eye, Calendar, FileSpreadsheet } from 'lucide-react';
 import { format } from 'date-fns';
 import { tr } from 'date-fns/locale';
 
-import { API } from '../config';
+import { API, authHeaders } from '../config';
 
 
 const ReportsPageEnhanced = () => {
@@ -146,7 +146,7 @@ const ReportsPageEnhanced = () => {
         url += `&start_date=${startDate}&end_date=${endDate}`;
       }
 
-      const response = await fetch(url);
+      const response = await fetch(url, { headers: authHeaders() });
       
       if (!response.ok) {
         throw new Error('Rapor oluşturulamadı');
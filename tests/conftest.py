@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend is not an installed package; import it the way server.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    """A FakeDatabase behind `db` and `all_tenants_db` (so tenant scoping
+    still applies), on a server without transactions"""
+    from muhasebe import database
+    from tests.fakedb import FakeCollection, FakeDatabase
+
+    fake = FakeDatabase()
+    monkeypatch.setattr(database, "get_db", lambda: fake)
+    monkeypatch.setattr(database, "AsyncIOMotorCollection", FakeCollection)
+    monkeypatch.setattr(database, "_supports_transactions", False)
+    return fake
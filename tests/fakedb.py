@@ -0,0 +1,315 @@
+"""In-memory stand-in for the Motor collection methods the handlers use.
+
+Filters support equality (including array membership and null matching a
+missing field), $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin/$exists/$regex/$not and
+$and/$or; updates support $set/$unset/$inc/$max/$setOnInsert. Aggregations
+are not implemented. Every write is logged with the session it was given,
+so tests can check what ran inside a transaction, and with_options() calls
+are recorded to show where reads were routed. Handlers reach it through
+the real tenant-scoping wrappers (see the memory_db fixture); add() seeds
+documents for the current tenant.
+"""
+import copy
+import operator
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from pymongo.errors import DuplicateKeyError
+
+from muhasebe.tenancy import TENANT_FIELD, current_tenant
+
+_MISSING = object()
+_COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value, operand):
+    if value is _MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+def _condition(value, condition):
+    if "$regex" in condition:
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        values = value if isinstance(value, list) else [value]
+        if not any(isinstance(v, str) and re.search(condition["$regex"], v, flags) for v in values):
+            return False
+    for op, operand in condition.items():
+        if op in ("$regex", "$options"):
+            continue
+        if op == "$eq":
+            ok = _equals(value, operand)
+        elif op == "$ne":
+            ok = not _equals(value, operand)
+        elif op == "$in":
+            ok = any(_equals(value, o) for o in operand)
+        elif op == "$nin":
+            ok = not any(_equals(value, o) for o in operand)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(operand)
+        elif op == "$not":
+            ok = not _condition(value, operand)
+        elif op in _COMPARISONS:
+            values = value if isinstance(value, list) else [value]
+            ok = False
+            for v in values:
+                try:
+                    ok = ok or (v is not _MISSING and v is not None and _COMPARISONS[op](v, operand))
+                except TypeError:
+                    pass
+        else:
+            raise NotImplementedError(op)
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc, filter) -> bool:
+    for key, condition in (filter or {}).items():
+        if key == "$and":
+            ok = all(matches(doc, f) for f in condition)
+        elif key == "$or":
+            ok = any(matches(doc, f) for f in condition)
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            ok = _condition(_get(doc, key), condition)
+        else:
+            ok = _equals(_get(doc, key), condition)
+        if not ok:
+            return False
+    return True
+
+
+def project(doc, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        return {k: doc[k] for k in included if k in doc}
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        for field, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                doc[field] = copy.deepcopy(value)
+            elif op == "$unset":
+                doc.pop(field, None)
+            elif op == "$inc":
+                doc[field] = doc.get(field, 0) + value
+            elif op == "$max":
+                doc[field] = max(doc.get(field, value), value)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(op)
+
+
+def _sort_key(doc, key):
+    value = doc.get(key)
+    return (value is not None, value)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.sorted_by = None
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        self.sorted_by = keys
+        for field, field_direction in reversed(keys):
+            self.docs.sort(key=lambda d: _sort_key(d, field), reverse=field_direction < 0)
+        return self
+
+    def skip(self, count):
+        self.docs = self.docs[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+        self.unique = []
+        self.cursors = []
+
+    def add(self, *docs):
+        for doc in docs:
+            self.docs.append({TENANT_FIELD: current_tenant.get(), **doc})
+
+    def with_options(self, **options):
+        self.database.read_options.append((self.name, options))
+        return self
+
+    def _log(self, method, session):
+        self.database.writes.append((self.name, method, session))
+
+    def _check_unique(self, doc, ignore=None):
+        for field in self.unique:
+            if any(d is not ignore and d.get(field) == doc.get(field) for d in self.docs):
+                raise DuplicateKeyError(f"duplicate {field}")
+
+    def find(self, filter=None, projection=None, sort=None, session=None):
+        cursor = FakeCursor([project(d, projection) for d in self.docs if matches(d, filter)])
+        if sort:
+            cursor.sort(sort)
+        self.cursors.append((filter, cursor))
+        return cursor
+
+    async def find_one(self, filter=None, projection=None, sort=None, session=None):
+        docs = await self.find(filter, projection, sort=sort).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter, session=None):
+        return sum(1 for d in self.docs if matches(d, filter))
+
+    async def distinct(self, key, filter=None):
+        values = []
+        for d in self.docs:
+            if matches(d, filter) and d.get(key) not in values:
+                values.append(d.get(key))
+        return values
+
+    async def insert_one(self, doc, session=None):
+        self._check_unique(doc)
+        self._log("insert_one", session)
+        self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc.get("id"))
+
+    async def insert_many(self, docs, ordered=True, session=None):
+        for doc in docs:
+            self._check_unique(doc)
+        self._log("insert_many", session)
+        self.docs.extend(copy.deepcopy(d) for d in docs)
+        return SimpleNamespace(inserted_ids=[d.get("id") for d in docs])
+
+    def _upsert(self, filter, update):
+        doc = {k: v for k, v in filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+        apply_update(doc, update, inserting=True)
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc
+
+    async def update_one(self, filter, update, upsert=False, session=None):
+        self._log("update_one", session)
+        for doc in self.docs:
+            if matches(doc, filter):
+                apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            self._upsert(filter, update)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, filter, update, session=None):
+        self._log("update_many", session)
+        matched = [d for d in self.docs if matches(d, filter)]
+        for doc in matched:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched), upserted_id=None)
+
+    async def find_one_and_update(self, filter, update, projection=None, upsert=False, return_document=False,
+                                  sort=None, session=None):
+        self._log("find_one_and_update", session)
+        docs = [d for d in self.docs if matches(d, filter)]
+        if sort:
+            FakeCursor(docs).sort(sort)
+        if not docs:
+            if not upsert:
+                return None
+            doc = self._upsert(filter, update)
+            return project(doc, projection) if return_document else None
+        before = project(docs[0], projection)
+        apply_update(docs[0], update)
+        return project(docs[0], projection) if return_document else before
+
+    async def delete_one(self, filter, session=None):
+        self._log("delete_one", session)
+        for doc in self.docs:
+            if matches(doc, filter):
+                self.docs.remove(doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, filter, session=None):
+        self._log("delete_many", session)
+        kept = [d for d in self.docs if not matches(d, filter)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return SimpleNamespace(deleted_count=deleted)
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        self._log("bulk_write", session)
+        modified = 0
+        for request in requests:
+            for doc in self.docs:
+                if matches(doc, request._filter):
+                    apply_update(doc, request._doc)
+                    modified += 1
+                    break
+        return SimpleNamespace(matched_count=modified, modified_count=modified)
+
+    async def create_index(self, keys, **options):
+        return "index"
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+        self.writes = []
+        self.read_options = []
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self, filter=None):
+        return [name for name, collection in self.collections.items()
+                if collection.docs and matches({"name": name}, filter)]
+
+
+class FakeSession:
+    """Handed out by transaction(); writes logged with it ran in the transaction"""
+
+
+def transaction(session):
+    """A write_transaction replacement that always yields `session`"""
+    @asynccontextmanager
+    async def write_transaction():
+        yield session
+    return write_transaction
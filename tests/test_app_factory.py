@@ -0,0 +1,35 @@
+"""The app factory: cheap imports and every domain router mounted"""
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+
+def test_importing_the_server_loads_no_report_libraries_and_opens_no_connection():
+    # A fresh interpreter, so modules imported by other tests don't count
+    probe = (
+        "import sys, server\n"
+        "from muhasebe import database\n"
+        "print(sorted(m for m in ('pandas', 'openpyxl') if m in sys.modules))\n"
+        "print(database._client is None)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert result.stdout.split("\n")[:2] == ["[]", "True"]
+
+
+def test_each_domain_router_is_mounted_under_api():
+    from muhasebe.app import create_app
+
+    paths = {route.path for route in create_app().routes}
+    for path in ("/api/health", "/api/auth/login", "/api/customers", "/api/payments", "/api/transactions",
+                 "/api/reports/export", "/api/sync", "/api/events", "/metrics"):
+        assert path in paths, path
+
+
+def test_create_app_builds_independent_apps():
+    from muhasebe.app import create_app
+
+    first, second = create_app(), create_app()
+    assert first is not second and first.router is not second.router
+    assert len(first.routes) == len(second.routes)
@@ -0,0 +1,81 @@
+"""Balance checkpoints: same answer as a full scan, dropped by backdated writes"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from muhasebe import balances
+from muhasebe.balances import CHECKPOINTS_COLLECTION, CHECKPOINT_ROWS_COLLECTION, utc_midnight
+
+TODAY = utc_midnight(datetime.now(timezone.utc))
+
+
+def days_ago(days, hours=12):
+    return (TODAY - timedelta(days=days) + timedelta(hours=hours)).isoformat()
+
+
+@pytest.fixture
+def ledger(memory_db):
+    memory_db.transactions.add(
+        {"id": "t1", "type": "gelir", "payment_method": "nakit", "amount": 100000, "transaction_date": days_ago(100)},
+        {"id": "t2", "type": "gelir", "payment_method": "pos", "amount": 50000, "transaction_date": days_ago(10)},
+        {"id": "t3", "type": "gider", "payment_method": "nakit", "amount": 20000, "transaction_date": days_ago(3)},
+    )
+    memory_db.payments.add(
+        {"id": "p1", "customer_id": "c1", "payment_type": "alacak", "amount": 10000, "is_paid": False,
+         "created_at": days_ago(20)},
+        {"id": "p2", "customer_id": "c2", "payment_type": "borc", "amount": 3000, "is_paid": True,
+         "created_at": days_ago(30), "payment_date": days_ago(5)},
+    )
+    return memory_db
+
+
+def snapshot(cutoff):
+    result = asyncio.run(balances.balances_at(cutoff))
+    return result.pop("checkpoint"), result
+
+
+def test_balances_at_a_date_before_any_checkpoint(ledger):
+    checkpoint, result = snapshot(TODAY - timedelta(days=7))
+    assert checkpoint is None
+    assert (result["cash_balance"], result["pos_balance"]) == (100000, 50000)
+    assert result["customers"] == {"c1": {"receivable": 10000, "payable": 0}, "c2": {"receivable": 0, "payable": 3000}}
+
+
+def test_checkpoints_give_the_same_balances_as_a_full_scan(ledger):
+    cutoffs = [TODAY - timedelta(days=d, hours=6) for d in (40, 7, 4, 0)]
+    expected = [snapshot(cutoff)[1] for cutoff in cutoffs]
+
+    asyncio.run(balances.build_checkpoints())
+    as_ofs = sorted(c["as_of"] for c in ledger[CHECKPOINTS_COLLECTION].docs)
+    assert as_ofs[-1] == TODAY.isoformat()
+    # Monthly before the daily window, daily inside it
+    assert all(a.endswith("-01T00:00:00+00:00") for a in as_ofs if a < days_ago(62, hours=0))
+
+    for cutoff, scanned in zip(cutoffs, expected):
+        checkpoint, result = snapshot(cutoff)
+        assert checkpoint == utc_midnight(cutoff).isoformat()
+        assert result == scanned
+
+
+def test_backdated_write_drops_later_checkpoints_and_bumps_the_epoch(ledger):
+    asyncio.run(balances.build_checkpoints())
+    epoch = asyncio.run(balances.checkpoint_epoch())
+
+    asyncio.run(balances.invalidate_checkpoints(days_ago(4)))
+    remaining = ledger[CHECKPOINTS_COLLECTION].docs
+    assert max(c["as_of"] for c in remaining) == (TODAY - timedelta(days=4)).isoformat()
+    ids = {c["id"] for c in remaining}
+    assert {r["checkpoint_id"] for r in ledger[CHECKPOINT_ROWS_COLLECTION].docs} <= ids
+    assert asyncio.run(balances.checkpoint_epoch()) == epoch + 1
+
+    # The next run rebuilds what was dropped
+    asyncio.run(balances.build_checkpoints())
+    assert max(c["as_of"] for c in ledger[CHECKPOINTS_COLLECTION].docs) == TODAY.isoformat()
+
+
+def test_writes_dated_today_leave_checkpoints_alone(ledger):
+    asyncio.run(balances.build_checkpoints())
+    count, writes = len(ledger[CHECKPOINTS_COLLECTION].docs), len(ledger.writes)
+    asyncio.run(balances.invalidate_checkpoints(datetime.now(timezone.utc), None))
+    assert len(ledger[CHECKPOINTS_COLLECTION].docs) == count and len(ledger.writes) == writes
@@ -0,0 +1,77 @@
+"""Accept-Encoding negotiation and which responses get compressed"""
+import asyncio
+import gzip
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+
+
+def respond(body: bytes, content_type: bytes = b"application/json", chunks: int = 1):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+        size = len(body) // chunks
+        for i in range(chunks):
+            last = i == chunks - 1
+            await send({"type": "http.response.body", "body": body[i * size:] if last else body[i * size:(i + 1) * size],
+                        "more_body": not last})
+    return app
+
+
+def call(app, accept_encoding=None):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    asyncio.run(CompressionMiddleware(app, minimum_size=1024)({"type": "http", "headers": headers}, None, send))
+    return dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_choose_encoding_honours_q_values(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def test_prefers_brotli_when_available(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+
+
+def test_large_json_is_gzipped(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    body = b'[' + b','.join(b'{"name": "I\xc5\x9f\xc4\xb1k G\xc4\xb1da"}' for _ in range(200)) + b']'
+    headers, sent = call(respond(body), "gzip")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(sent) < len(body)
+    assert gzip.decompress(sent) == body
+
+
+def test_streamed_body_is_compressed_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    body = b"tarih;tutar\n" * 1000
+    headers, sent = call(respond(body, b"text/csv", chunks=4), "gzip")
+    assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+    assert gzip.decompress(sent) == body
+
+
+def test_small_bodies_and_clients_without_gzip_are_left_alone():
+    body = b'{"status": "healthy"}'
+    headers, sent = call(respond(body), "gzip")
+    assert b"content-encoding" not in headers and sent == body
+
+    big = b"x" * 5000
+    headers, sent = call(respond(big), None)
+    assert b"content-encoding" not in headers and sent == big
+
+
+def test_already_compressed_types_pass_through():
+    xlsx = b"PK\x03\x04" + b"\x00" * 5000
+    headers, sent = call(respond(xlsx, b"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"), "gzip")
+    assert b"content-encoding" not in headers and sent == xlsx
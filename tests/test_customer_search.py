@@ -0,0 +1,35 @@
+"""Typeahead search ranking and the queries it sends"""
+import asyncio
+
+from muhasebe.routers import customers
+from muhasebe.search import build_customer_search_fields
+
+
+def add_customer(memory_db, customer_id, name, phone=None):
+    memory_db.customers.add({
+        "id": customer_id, "name": name, "phone": phone, "created_at": "2026-01-01T00:00:00+00:00",
+        **build_customer_search_fields(name, phone),
+    })
+
+
+def test_name_prefix_matches_rank_before_word_matches(memory_db):
+    add_customer(memory_db, "1", "Ahmet Işıkçı")
+    add_customer(memory_db, "2", "Işık Gıda Ltd. Şti.")
+    add_customer(memory_db, "3", "Zeynep Işıl")
+    add_customer(memory_db, "4", "Can Işık")
+
+    results = asyncio.run(customers.search_customers("ISI"))
+    assert [c["name"] for c in results] == ["Işık Gıda Ltd. Şti.", "Ahmet Işıkçı", "Can Işık", "Zeynep Işıl"]
+    assert all("search_terms" not in c for c in results)
+
+
+def test_word_match_query_is_not_sorted_by_the_server(memory_db):
+    add_customer(memory_db, "1", "Ahmet Kaya", phone="0532 111 22 33")
+    asyncio.run(customers.search_customers("kaya"))
+    fallback = [cursor for query, cursor in memory_db.customers.cursors if "search_terms" in query]
+    assert fallback and fallback[0].sorted_by is None
+
+
+def test_phone_search_ignores_formatting_and_leading_zero(memory_db):
+    add_customer(memory_db, "1", "Ahmet Kaya", phone="0532 111 22 33")
+    assert [c["id"] for c in asyncio.run(customers.search_customers("(532) 111"))] == ["1"]
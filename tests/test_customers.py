@@ -0,0 +1,105 @@
+"""Customer rename cascades, guarded deletes and transaction conflicts"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure
+
+from muhasebe import database
+from muhasebe.models import CustomerCreate
+from muhasebe.routers import customers
+from tests.fakedb import FakeSession, transaction
+
+
+@pytest.fixture
+def customer(memory_db):
+    memory_db.customers.add({"id": "c1", "name": "Işık Gıda", "created_at": "2026-01-05T00:00:00+00:00"})
+    memory_db.payments.add(*[
+        {"id": f"p{i}", "customer_id": "c1", "customer_name": "Işık Gıda", "amount": 10000, "paid_amount": 0,
+         "payment_type": "alacak", "is_paid": False, "created_at": "2026-01-05T00:00:00+00:00",
+         "due_date": "2026-02-05T00:00:00+00:00"}
+        for i in range(2)
+    ])
+    return memory_db
+
+
+def rename(name, **params):
+    return asyncio.run(customers.update_customer("c1", CustomerCreate(name=name), **params))
+
+
+def test_rename_leaves_payments_alone_by_default(customer):
+    assert rename("Işık Gıda Ltd.").name == "Işık Gıda Ltd."
+    assert {p["customer_name"] for p in customer.payments.docs} == {"Işık Gıda"}
+
+
+def test_rename_dry_run_counts_without_writing(customer):
+    response = rename("Işık Gıda Ltd.", cascade=True, dry_run=True)
+    assert response.body == b'{"dry_run":true,"payments":2,"archived_payments":0}'
+    assert customer.customers.docs[0]["name"] == "Işık Gıda"
+
+
+def test_rename_cascade_copies_the_name_with_one_seq(customer):
+    rename("Işık Gıda Ltd.", cascade=True)
+    assert {p["customer_name"] for p in customer.payments.docs} == {"Işık Gıda Ltd."}
+    assert {p["updated_seq"] for p in customer.payments.docs} == {customer.customers.docs[0]["updated_seq"] + 1}
+
+
+def test_delete_with_payments_needs_cascade(customer):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(customers.delete_customer("c1"))
+    assert error.value.status_code == 409
+    assert len(customer.customers.docs) == 1 and len(customer.payments.docs) == 2
+
+
+def test_delete_dry_run_counts_payments(customer):
+    assert asyncio.run(customers.delete_customer("c1", dry_run=True)) == {"dry_run": True, "payments": 2}
+    assert len(customer.customers.docs) == 1 and len(customer.payments.docs) == 2
+
+
+def test_cascade_delete_tombstones_everything_in_one_transaction(customer, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(customers, "write_transaction", transaction(session))
+
+    assert asyncio.run(customers.delete_customer("c1", cascade=True))["deleted_payments"] == 2
+    assert customer.customers.docs == [] and customer.payments.docs == []
+    tombstones = sorted(customer.tombstones.docs, key=lambda t: t["updated_seq"])
+    assert [(t["collection"], t["updated_seq"]) for t in tombstones] == [
+        ("payments", 1), ("payments", 2), ("customers", 3)
+    ]
+    assert ("counters", "find_one_and_update", session) in customer.writes
+    assert ("tombstones", "insert_many", session) in customer.writes
+
+
+def test_cascade_delete_refuses_payments_settled_in_a_closed_period(customer):
+    customer.payments.docs[0].update(is_paid=True, paid_amount=10000, payment_date="2026-01-10T00:00:00+00:00")
+    customer.period_closes.add({"id": "close1", "period_end": "2026-02-01T00:00:00+00:00", "status": "done"})
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(customers.delete_customer("c1", cascade=True))
+    assert error.value.status_code == 400
+    assert len(customer.payments.docs) == 2
+
+
+def test_conflicting_transaction_is_a_retryable_409(monkeypatch):
+    class ConflictingSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def start_transaction(self):
+            return self
+
+    async def start_session():
+        return ConflictingSession()
+
+    monkeypatch.setattr(database, "_supports_transactions", True)
+    monkeypatch.setattr(database, "get_client", lambda: type("Client", (), {"start_session": staticmethod(start_session)}))
+
+    async def scenario():
+        async with database.write_transaction():
+            raise OperationFailure("Write conflict", code=112, details={"errorLabels": ["TransientTransactionError"]})
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 409
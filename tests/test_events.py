@@ -0,0 +1,95 @@
+"""Live change events: per-tenant fan-out, slow subscribers and SSE framing"""
+import asyncio
+import json
+
+from events import EventBus, diff_balances, format_sse, payment_contribution, transaction_contribution
+
+
+def test_subscribers_only_get_their_topic():
+    bus = EventBus()
+    acme = bus.subscribe(topic="acme")
+    globex = bus.subscribe(topic="globex")
+    everything = bus.subscribe()
+
+    bus.publish({"id": "p1"}, topic="acme")
+
+    assert acme.get_nowait() == {"id": "p1"}
+    assert globex.empty()
+    assert everything.get_nowait() == {"id": "p1"}
+
+
+def test_slow_subscriber_is_dropped_with_a_resync_marker():
+    bus = EventBus(queue_size=2)
+    slow = bus.subscribe("acme")
+    for seq in range(3):
+        bus.publish({"seq": seq}, topic="acme")
+
+    assert bus.subscriber_count == 0
+    assert [slow.get_nowait(), slow.get_nowait()] == [{"seq": 1}, None]
+    # Further events no longer reach it
+    bus.publish({"seq": 4}, topic="acme")
+    assert slow.empty()
+
+
+def test_unsubscribe_stops_delivery():
+    bus = EventBus()
+    queue = bus.subscribe("acme")
+    bus.unsubscribe(queue)
+    bus.publish({"seq": 1}, topic="acme")
+    assert queue.empty() and bus.subscriber_count == 0
+
+
+def test_waiting_subscriber_wakes_on_publish():
+    async def scenario():
+        bus = EventBus()
+        queue = bus.subscribe("acme")
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        bus.publish({"seq": 7}, topic="acme")
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == {"seq": 7}
+
+
+def test_format_sse_frames_an_event():
+    frame = format_sse({"collection": "payments", "seq": 12}, event_id=12)
+    lines = frame.split("\n")
+    assert lines[:2] == ["id: 12", "event: change"]
+    assert json.loads(lines[2][len("data: "):]) == {"collection": "payments", "seq": 12}
+    assert frame.endswith("\n\n")
+
+
+def test_balance_delta_of_a_settled_debt():
+    before = payment_contribution({"payment_type": "alacak", "amount": 5000, "is_paid": False})
+    after = payment_contribution({"payment_type": "alacak", "amount": 5000, "is_paid": True})
+    assert diff_balances(before, after) == {"total_receivable": -5000}
+    assert transaction_contribution({"type": "gider", "payment_method": "pos", "amount": 300}) == {
+        "pos_balance": -300, "total_balance": -300
+    }
+
+
+def test_stream_sends_ready_then_the_tenants_changes(memory_db):
+    from muhasebe.changes import event_bus
+    from muhasebe.routers import system
+    from muhasebe.tenancy import tenant_scope
+
+    class Request:
+        async def is_disconnected(self):
+            return False
+
+    async def scenario():
+        with tenant_scope("acme"):
+            response = await system.stream_events(Request())
+            stream = response.body_iterator
+            ready = await stream.__anext__()
+            event_bus.publish({"collection": "payments", "seq": 3}, topic="globex")
+            event_bus.publish({"collection": "payments", "seq": 4}, topic="acme")
+            change = await asyncio.wait_for(stream.__anext__(), 1)
+            await stream.aclose()
+        return response, ready, change
+
+    response, ready, change = asyncio.run(scenario())
+    assert response.media_type == "text/event-stream"
+    assert ready.startswith("event: ready\n")
+    assert change.startswith("id: 4\nevent: change\n")
+    assert event_bus.subscriber_count == 0
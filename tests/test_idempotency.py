@@ -0,0 +1,132 @@
+"""Idempotency-Key replay, index readiness and responses that fail to store"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from pymongo.errors import DuplicateKeyError
+
+from idempotency import IdempotencyMiddleware
+
+
+class FakeKeys:
+    """Records by key; enough of a collection for the middleware"""
+
+    def __init__(self):
+        self.records = {}
+        self.fail_updates = False
+
+    async def insert_one(self, doc):
+        if doc["key"] in self.records:
+            raise DuplicateKeyError("duplicate key")
+        self.records[doc["key"]] = dict(doc)
+
+    def _matching(self, filter):
+        record = self.records.get(filter["key"])
+        if record is None or any(record.get(k) != v for k, v in filter.items() if not isinstance(v, dict)):
+            return None
+        return record
+
+    async def find_one(self, filter, projection=None):
+        return self._matching(filter)
+
+    async def find_one_and_update(self, filter, update):
+        # Only records without a live lock match in the real filter
+        return None
+
+    async def update_one(self, filter, update):
+        if self.fail_updates and update["$set"].get("status") == "completed":
+            raise ConnectionError("primary stepped down")
+        record = self._matching(filter)
+        if record is not None:
+            record.update(update["$set"])
+        return SimpleNamespace(matched_count=int(record is not None))
+
+    async def delete_one(self, filter):
+        if self._matching(filter) is not None:
+            del self.records[filter["key"]]
+
+
+def make_app(keys, prepare=None):
+    calls = []
+
+    async def handler(scope, receive, send):
+        await receive()
+        calls.append(scope["path"])
+        body = json.dumps({"id": len(calls)}).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    app = IdempotencyMiddleware(handler, collection=lambda: keys, identify=lambda authorization: "admin",
+                                paths=["/api/payments"], prepare=prepare)
+    return app, calls
+
+
+def post(app, key="k1", body=b'{"amount": 10}'):
+    sent = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/payments",
+             "headers": [(b"idempotency-key", key.encode())]}
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_retry_replays_the_stored_response():
+    app, calls = make_app(FakeKeys())
+    first = post(app)
+    second = post(app)
+    assert calls == ["/api/payments"]
+    assert second[0] == 200 and second[2] == first[2]
+    assert second[1][b"idempotent-replayed"] == b"true"
+
+
+def test_same_key_with_another_body_is_rejected():
+    app, calls = make_app(FakeKeys())
+    post(app)
+    assert post(app, body=b'{"amount": 20}')[0] == 422
+    assert len(calls) == 1
+
+
+def test_keys_are_refused_until_the_index_exists():
+    attempts = []
+
+    async def prepare():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("not ready")
+
+    app, calls = make_app(FakeKeys(), prepare=prepare)
+    status, headers, _ = post(app)
+    assert status == 503 and headers[b"retry-after"] == b"5" and calls == []
+    assert post(app)[0] == 200
+    post(app, key="k2")
+    assert len(attempts) == 2
+
+
+def test_unstored_response_keeps_the_key_failed():
+    keys = FakeKeys()
+    keys.fail_updates = True
+    app, calls = make_app(keys)
+    assert post(app)[0] == 200
+    assert keys.records["admin:k1"]["status"] == "failed"
+
+    # The write happened; a retry must not run the handler again
+    keys.fail_updates = False
+    assert post(app)[0] == 409
+    assert len(calls) == 1
+
+
+def test_store_reports_a_key_that_was_taken_over():
+    keys = FakeKeys()
+    app, _ = make_app(keys)
+    asyncio.run(keys.insert_one({"key": "admin:k1", "status": "processing", "lock_id": "theirs"}))
+    stored = asyncio.run(app._store(keys, "admin:k1", "ours", 200, None, b"{}"))
+    assert stored is False
+    assert keys.records["admin:k1"]["status"] == "processing"
@@ -0,0 +1,83 @@
+"""Installment plan creation, rescheduling and cancellation"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from muhasebe.models import InstallmentPlanCreate, InstallmentReschedule
+from muhasebe.routers import payments
+from tests.fakedb import FakeSession, transaction
+
+
+def create_plan(total=1000.0, count=3):
+    return asyncio.run(payments.create_installment_plan(InstallmentPlanCreate(
+        customer_id="c1", customer_name="Işık Gıda", total_amount=total, installment_count=count,
+        payment_type="alacak", first_due_date=datetime(2026, 1, 31, tzinfo=timezone.utc),
+    )))
+
+
+def test_plan_splits_the_total_in_kurus(memory_db):
+    plan = create_plan(total=100.0, count=3)
+    stored = sorted(memory_db.payments.docs, key=lambda p: p["installment_no"])
+    assert [p["amount"] for p in stored] == [3333, 3333, 3334]
+    assert [p["due_date"][:10] for p in stored] == ["2026-01-31", "2026-02-28", "2026-03-31"]
+    assert [p["updated_seq"] for p in stored] == [1, 2, 3]
+    assert [p.amount for p in plan["installments"]] == [33.33, 33.33, 33.34]
+    assert {p["plan_id"] for p in stored} == {plan["plan_id"]}
+
+
+def test_plan_rejects_installments_below_one_kurus(memory_db):
+    with pytest.raises(HTTPException) as error:
+        create_plan(total=0.02, count=3)
+    assert error.value.status_code == 400
+    assert memory_db.payments.docs == []
+
+
+def test_reschedule_moves_only_unpaid_installments_in_one_transaction(memory_db, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(payments, "write_transaction", transaction(session))
+    plan_id = create_plan(count=3)["plan_id"]
+    first = next(p for p in memory_db.payments.docs if p["installment_no"] == 1)
+    first.update(is_paid=True, paid_amount=first["amount"])
+
+    result = asyncio.run(payments.reschedule_installment_plan(plan_id, InstallmentReschedule(
+        first_due_date=datetime(2026, 6, 15, tzinfo=timezone.utc), interval="weekly", every=2,
+    )))
+
+    assert result["rescheduled"] == 2
+    by_number = {p["installment_no"]: p for p in memory_db.payments.docs}
+    assert by_number[1]["due_date"][:10] == "2026-01-31"
+    assert by_number[2]["due_date"][:10] == "2026-06-15"
+    assert by_number[3]["due_date"][:10] == "2026-06-29"
+    assert by_number[3]["updated_seq"] > by_number[2]["updated_seq"] > 3
+    writes = memory_db.writes[memory_db.writes.index(("payments", "insert_many", None)) + 1:]
+    assert writes == [("counters", "find_one_and_update", session), ("payments", "bulk_write", session)]
+
+
+def test_cancel_keeps_paid_installments_and_tombstones_the_rest(memory_db, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(payments, "write_transaction", transaction(session))
+    plan_id = create_plan(count=3)["plan_id"]
+    second = next(p for p in memory_db.payments.docs if p["installment_no"] == 2)
+    second["paid_amount"] = 100
+
+    result = asyncio.run(payments.cancel_installment_plan(plan_id))
+
+    assert (result["cancelled"], result["kept"]) == (2, 1)
+    assert [p["installment_no"] for p in memory_db.payments.docs] == [2]
+    tombstones = memory_db.tombstones.docs
+    assert sorted(t["updated_seq"] for t in tombstones) == [4, 5]
+    assert all(t["collection"] == "payments" for t in tombstones)
+    writes = memory_db.writes[memory_db.writes.index(("payments", "insert_many", None)) + 1:]
+    assert writes == [("payments", "delete_many", session), ("counters", "find_one_and_update", session),
+                      ("tombstones", "insert_many", session)]
+
+
+def test_cancel_without_open_installments_is_404(memory_db):
+    plan_id = create_plan(count=1)["plan_id"]
+    memory_db.payments.docs[0]["is_paid"] = True
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(payments.cancel_installment_plan(plan_id))
+    assert error.value.status_code == 404
+    assert memory_db.tombstones.docs == []
@@ -0,0 +1,41 @@
+"""Installment amounts and due dates"""
+from datetime import datetime, timezone
+
+import pytest
+
+from muhasebe.installments import due_dates, split_amount
+
+
+def test_split_amount_puts_the_remainder_on_the_last_installment():
+    assert split_amount(10000, 3) == [3333, 3333, 3334]
+    assert sum(split_amount(10001, 7)) == 10001
+
+
+def test_split_amount_single_installment():
+    assert split_amount(999, 1) == [999]
+
+
+def test_split_amount_allows_one_kurus_each():
+    assert split_amount(3, 3) == [1, 1, 1]
+
+
+def test_split_amount_rejects_zero_installments():
+    with pytest.raises(ValueError):
+        split_amount(2, 3)
+
+
+def test_monthly_due_dates_clamp_without_drifting():
+    first = datetime(2026, 1, 31, tzinfo=timezone.utc)
+    assert [d.date().isoformat() for d in due_dates(first, 4, "monthly")] == [
+        "2026-01-31", "2026-02-28", "2026-03-31", "2026-04-30"
+    ]
+
+
+def test_monthly_due_dates_cross_years():
+    first = datetime(2026, 11, 15, tzinfo=timezone.utc)
+    assert [(d.year, d.month) for d in due_dates(first, 3, "monthly", every=2)] == [(2026, 11), (2027, 1), (2027, 3)]
+
+
+def test_weekly_due_dates():
+    first = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    assert [d.day for d in due_dates(first, 3, "weekly", every=2)] == [2, 16, 30]
@@ -0,0 +1,74 @@
+"""Startup lease: one holder at a time, takeover once it expires"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from muhasebe import bootstrap
+from muhasebe.lease import WORKER_ID, acquire_lease, lease, release_lease
+
+
+@pytest.fixture
+def leases(memory_db):
+    memory_db.leases.unique = ["_id"]
+    return memory_db.leases
+
+
+def held_by(leases, owner, expires_in):
+    now = datetime.now(timezone.utc)
+    leases.docs.append({"_id": "startup-tasks", "owner": owner, "acquired_at": now,
+                        "expires_at": now + timedelta(seconds=expires_in)})
+
+
+def test_free_lease_is_taken(leases):
+    assert asyncio.run(acquire_lease("startup-tasks", 60))
+    assert leases.docs[0]["owner"] == WORKER_ID
+
+
+def test_live_lease_of_another_worker_is_refused(leases):
+    held_by(leases, "other:1", expires_in=30)
+    assert not asyncio.run(acquire_lease("startup-tasks", 60))
+    assert [d["owner"] for d in leases.docs] == ["other:1"]
+
+
+def test_expired_lease_is_taken_over(leases):
+    held_by(leases, "other:1", expires_in=-1)
+    assert asyncio.run(acquire_lease("startup-tasks", 60))
+    assert len(leases.docs) == 1 and leases.docs[0]["owner"] == WORKER_ID
+    assert leases.docs[0]["expires_at"] > datetime.now(timezone.utc) + timedelta(seconds=50)
+
+
+def test_holder_can_renew_and_only_releases_its_own(leases):
+    held_by(leases, WORKER_ID, expires_in=5)
+    assert asyncio.run(acquire_lease("startup-tasks", 60))
+
+    leases.docs[0]["owner"] = "other:1"
+    asyncio.run(release_lease("startup-tasks"))
+    assert len(leases.docs) == 1
+
+
+def test_context_manager_releases_on_exit(leases):
+    async def scenario():
+        async with lease("startup-tasks", 60) as acquired:
+            assert acquired and len(leases.docs) == 1
+
+    asyncio.run(scenario())
+    assert leases.docs == []
+
+
+def test_startup_tasks_wait_for_the_worker_holding_the_lease(leases):
+    ran = []
+
+    async def init_admin():
+        ran.append("init_admin")
+
+    held_by(leases, "other:1", expires_in=30)
+    pending = [init_admin]
+    asyncio.run(bootstrap.run_one_time_tasks(pending))
+    assert ran == [] and pending == [init_admin]
+
+    # The other worker died without releasing it
+    leases.docs[0]["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    asyncio.run(bootstrap.run_one_time_tasks(pending))
+    assert ran == ["init_admin"] and pending == []
+    assert leases.docs == []
@@ -0,0 +1,94 @@
+"""Route-templated request metrics, Mongo command labels and pool gauges"""
+import asyncio
+
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from metrics import MeteredPool, MetricsMiddleware, SingleFlightCollector, command_collection
+from singleflight import SingleFlight
+
+
+async def get_payment(request):
+    status = 404 if request.path_params["payment_id"] == "missing" else 200
+    return JSONResponse({}, status_code=status)
+
+
+app = Starlette(routes=[Route("/api/payments/{payment_id}", get_payment)])
+
+
+def request(path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": [], "app": app}
+    asyncio.run(MetricsMiddleware(app)(scope, receive, send))
+    return sent[0]["status"]
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_labelled_by_route_template():
+    route = {"method": "GET", "route": "/api/payments/{payment_id}"}
+    ok, missing = sample("http_requests_total", status="200", **route), sample("http_requests_total", status="404", **route)
+    observed = sample("http_request_duration_seconds_count", **route)
+
+    assert request("/api/payments/p1") == 200
+    assert request("/api/payments/p2") == 200
+    assert request("/api/payments/missing") == 404
+
+    assert sample("http_requests_total", status="200", **route) == ok + 2
+    assert sample("http_requests_total", status="404", **route) == missing + 1
+    assert sample("http_request_duration_seconds_count", **route) == observed + 3
+    assert sample("http_requests_in_flight", **route) == 0
+    assert sample("http_requests_total", method="GET", route="/api/payments/p1", status="200") == 0
+
+
+def test_unknown_paths_share_one_label():
+    before = sample("http_requests_total", method="GET", route="unmatched", status="404")
+    request("/wp-login.php")
+    request("/.env")
+    assert sample("http_requests_total", method="GET", route="unmatched", status="404") == before + 2
+
+
+def test_command_collection():
+    assert command_collection("find", {"find": "payments", "filter": {}}) == "payments"
+    assert command_collection("aggregate", {"aggregate": 1, "pipeline": []}) == "-"
+    assert command_collection("getMore", {"getMore": 123, "collection": "payments"}) == "-"
+
+
+def test_metered_pool_runs_off_the_loop_and_settles_its_gauges():
+    pool = MeteredPool("test-pool", max_workers=1)
+    try:
+        assert asyncio.run(pool.run(sum, [1, 2, 3])) == 6
+    finally:
+        pool.shutdown()
+    assert sample("worker_pool_wait_seconds_count", pool="test-pool") == 1
+    assert sample("worker_pool_queued_jobs", pool="test-pool") == 0
+    assert sample("worker_pool_active_jobs", pool="test-pool") == 0
+
+
+def test_singleflight_collector_exports_each_group():
+    flight = SingleFlight("dashboard_stats")
+
+    async def compute():
+        return 1
+
+    async def scenario():
+        await asyncio.gather(flight.do("acme", compute), flight.do("acme", compute))
+
+    asyncio.run(scenario())
+    registry = CollectorRegistry()
+    registry.register(SingleFlightCollector([flight]))
+    assert registry.get_sample_value("singleflight_calls_total", {"group": "dashboard_stats"}) == 2
+    assert registry.get_sample_value("singleflight_coalesced_total", {"group": "dashboard_stats"}) == 1
+    assert b"singleflight_in_flight" in generate_latest(registry)
@@ -0,0 +1,56 @@
+"""Lira <-> kuruş conversion of stored amounts"""
+import pytest
+
+from muhasebe.money import as_kurus, delta_to_lira, load_amounts, serve_amounts, store_amounts, to_kurus, to_lira
+
+
+@pytest.mark.parametrize("lira, kurus", [
+    (0.29, 29),
+    (0.1 + 0.2, 30),
+    (1.005, 101),
+    (2.675, 268),
+    (-1.005, -101),
+    (100, 10000),
+    ("12.345", 1235),
+    (0, 0),
+])
+def test_to_kurus_rounds_the_decimal_value_half_up(lira, kurus):
+    assert to_kurus(lira) == kurus
+
+
+def test_to_lira_round_trips():
+    for kurus in (0, 1, 29, 12345, -101):
+        assert to_kurus(to_lira(kurus)) == kurus
+
+
+def test_as_kurus_reads_floats_as_legacy_lira_and_ints_as_kurus():
+    assert as_kurus(12.34) == 1234
+    assert as_kurus(1234) == 1234
+    assert as_kurus(None) == 0
+
+
+def test_store_amounts_converts_only_the_collections_money_fields():
+    doc = {"amount": 10.5, "paid_amount": None, "description": "1.5"}
+    assert store_amounts(doc, "payments") is doc
+    assert doc == {"amount": 1050, "paid_amount": None, "description": "1.5"}
+
+
+def test_serve_amounts_handles_migrated_and_legacy_documents():
+    assert serve_amounts({"amount": 1050, "paid_amount": 0.25}, "payments") == {"amount": 10.5, "paid_amount": 0.25}
+    assert serve_amounts(None, "payments") is None
+
+
+def test_store_then_serve_round_trips():
+    doc = store_amounts({"cash_balance": 0.1 + 0.2, "pos_balance": -7.99}, "period_closes")
+    assert doc == {"cash_balance": 30, "pos_balance": -799}
+    assert serve_amounts(doc, "period_closes") == {"cash_balance": 0.3, "pos_balance": -7.99}
+
+
+def test_load_amounts_normalizes_to_kurus():
+    assert load_amounts({"amount": 1.005}, "transactions") == {"amount": 101}
+
+
+def test_delta_to_lira_leaves_counts_alone():
+    assert delta_to_lira({"total_receivable": 1050, "total_customers": -1}) == {
+        "total_receivable": 10.5, "total_customers": -1
+    }
@@ -0,0 +1,111 @@
+"""Partial payments: guarded increments, no overpaying, concurrent payers"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from muhasebe import changes
+from muhasebe.models import PartialPaymentRequest
+from muhasebe.routers import payments
+
+
+@pytest.fixture
+def debt(memory_db):
+    memory_db.payments.add({"id": "p1", "customer_id": "c1", "customer_name": "Işık Gıda", "amount": 10000,
+                            "paid_amount": 0, "payment_type": "alacak", "is_paid": False,
+                            "created_at": "2026-01-05T00:00:00+00:00", "due_date": "2026-02-05T00:00:00+00:00"})
+    return memory_db
+
+
+def pay(amount):
+    return asyncio.run(payments.make_partial_payment(PartialPaymentRequest(payment_id="p1", amount=amount)))
+
+
+def status_of(amount):
+    try:
+        pay(amount)
+    except HTTPException as error:
+        return error.status_code
+    return 200
+
+
+def meanwhile(monkeypatch, debt, **fields):
+    """Another request changes the payment between this one's read and write"""
+    async def next_seq(count=1, session=None):
+        debt.payments.docs[0].update(fields)
+        fields.clear()
+        return await changes.next_seq(count, session=session)
+    monkeypatch.setattr(payments, "next_seq", next_seq)
+
+
+def test_partial_then_settling_payment(debt):
+    result = pay(30.25)
+    assert (result["paid_amount"], result["remaining"], result["is_fully_paid"]) == (30.25, 69.75, False)
+    assert ("payments", "find_one_and_update", None) in debt.writes
+
+    result = pay(69.75)
+    assert (result["paid_amount"], result["remaining"], result["is_fully_paid"]) == (100.0, 0.0, True)
+    payment = debt.payments.docs[0]
+    assert payment["paid_amount"] == 10000 and payment["is_paid"] and payment["payment_date"]
+    assert [t["amount"] for t in debt.transactions.docs] == [3025, 6975]
+    assert {t["type"] for t in debt.transactions.docs} == {"gelir"}
+
+
+def test_overpaying_and_paying_a_settled_debt_are_rejected(debt):
+    assert status_of(100.01) == 400
+    assert debt.payments.docs[0]["paid_amount"] == 0 and debt.transactions.docs == []
+
+    pay(100)
+    assert status_of(1) == 400
+    assert debt.payments.docs[0]["paid_amount"] == 10000 and len(debt.transactions.docs) == 1
+
+
+def test_amount_must_be_positive():
+    for amount in (0, -5):
+        with pytest.raises(ValidationError):
+            PartialPaymentRequest(payment_id="p1", amount=amount)
+
+
+def test_concurrent_payments_that_fit_both_apply(debt, monkeypatch):
+    meanwhile(monkeypatch, debt, paid_amount=2000)
+    assert pay(30)["paid_amount"] == 50.0
+    assert debt.payments.docs[0]["paid_amount"] == 5000
+
+
+def test_concurrent_payment_that_would_overpay_is_a_409(debt, monkeypatch):
+    meanwhile(monkeypatch, debt, paid_amount=5000)
+    assert status_of(60) == 409
+    assert debt.payments.docs[0]["paid_amount"] == 5000 and debt.transactions.docs == []
+
+
+def test_settling_payment_loses_to_a_concurrent_one(debt, monkeypatch):
+    debt.payments.docs[0]["paid_amount"] = 4000
+    meanwhile(monkeypatch, debt, paid_amount=5000)
+    assert status_of(60) == 409
+    assert debt.payments.docs[0]["is_paid"] is False
+
+
+def test_payment_that_turns_into_the_settling_one_is_a_409(debt, monkeypatch):
+    # Read 0 paid, pays 40; meanwhile 60 lands, so this one would settle
+    meanwhile(monkeypatch, debt, paid_amount=6000)
+    assert status_of(40) == 409
+    assert debt.payments.docs[0]["paid_amount"] == 6000
+
+
+def test_concurrent_settle_of_the_same_debt_is_a_409(debt, monkeypatch):
+    meanwhile(monkeypatch, debt, is_paid=True, paid_amount=10000)
+    assert status_of(10) == 409
+
+
+def test_debt_still_in_float_lira_is_converted_in_the_same_write(debt):
+    debt.payments.docs[0].update(amount=100.0, paid_amount=25.5)
+    assert pay(10)["paid_amount"] == 35.5
+    payment = debt.payments.docs[0]
+    assert (payment["amount"], payment["paid_amount"]) == (10000, 3550)
+
+
+def test_debt_without_paid_amount(debt):
+    del debt.payments.docs[0]["paid_amount"]
+    assert pay(10)["paid_amount"] == 10.0
+    assert debt.payments.docs[0]["paid_amount"] == 1000
@@ -0,0 +1,82 @@
+"""Closed periods: writes dated before the latest close are refused"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from muhasebe.models import PaymentCreate, TransactionCreate
+from muhasebe.periods import ensure_payment_open, ensure_period_open, start_period_close
+from muhasebe.routers import payments, transactions
+
+PERIOD_END = "2026-01-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def closed(memory_db):
+    memory_db.period_closes.add({"id": "close1", "label": "2025", "period_end": PERIOD_END, "status": "done"})
+    return memory_db
+
+
+def status_of(coroutine):
+    try:
+        asyncio.run(coroutine)
+    except HTTPException as error:
+        return error.status_code
+    return 200
+
+
+def test_dates_before_the_close_are_rejected(closed):
+    assert status_of(ensure_period_open("2025-12-31T23:59:59+00:00")) == 400
+    assert status_of(ensure_period_open(datetime(2025, 6, 1))) == 400  # naive dates are UTC
+    assert status_of(ensure_period_open(PERIOD_END)) == 200
+    assert status_of(ensure_period_open(None)) == 200
+
+
+def test_a_close_still_running_already_locks_its_period(closed):
+    closed.period_closes.add({"id": "close2", "label": "2026", "period_end": "2026-07-01T00:00:00+00:00",
+                              "status": "archiving"})
+    assert status_of(ensure_period_open("2026-03-01T00:00:00+00:00")) == 400
+
+
+def test_only_settled_payments_belong_to_their_period(closed):
+    open_debt = {"created_at": "2025-11-01T00:00:00+00:00", "is_paid": False}
+    assert status_of(ensure_payment_open(open_debt)) == 200
+    assert status_of(ensure_payment_open({**open_debt, "is_paid": True})) == 400
+    assert status_of(ensure_payment_open({**open_debt, "is_paid": True, "payment_date": "2026-01-15T00:00:00+00:00"})) == 200
+
+
+def test_backdated_transaction_is_not_written(closed):
+    backdated = TransactionCreate(type="gelir", payment_method="nakit", amount=100, description="Kira",
+                                  transaction_date=datetime(2025, 12, 20, tzinfo=timezone.utc))
+    assert status_of(transactions.create_transaction(backdated)) == 400
+    assert closed.transactions.docs == []
+
+    current = backdated.model_copy(update={"transaction_date": datetime(2026, 1, 2, tzinfo=timezone.utc)})
+    assert status_of(transactions.create_transaction(current)) == 200
+    assert len(closed.transactions.docs) == 1
+
+
+def test_transaction_in_a_closed_period_cannot_be_deleted(closed):
+    closed.transactions.add({"id": "t1", "type": "gelir", "payment_method": "nakit", "amount": 10000,
+                             "transaction_date": "2025-12-20T00:00:00+00:00"})
+    assert status_of(transactions.delete_transaction("t1")) == 400
+    assert len(closed.transactions.docs) == 1
+
+
+def test_settled_payment_cannot_be_moved_into_a_closed_period(closed):
+    closed.payments.add({"id": "p1", "customer_id": "c1", "customer_name": "Işık Gıda", "amount": 10000,
+                         "paid_amount": 0, "payment_type": "alacak", "is_paid": False,
+                         "created_at": "2026-01-05T00:00:00+00:00", "due_date": "2026-02-05T00:00:00+00:00"})
+    backdated = PaymentCreate(customer_id="c1", customer_name="Işık Gıda", amount=100, payment_type="alacak",
+                              due_date=datetime(2026, 2, 5, tzinfo=timezone.utc), is_paid=True,
+                              payment_date=datetime(2025, 12, 30, tzinfo=timezone.utc))
+    assert status_of(payments.update_payment("p1", backdated)) == 400
+    assert closed.payments.docs[0]["is_paid"] is False
+
+
+def test_new_close_must_follow_a_finished_one(closed):
+    assert status_of(start_period_close(datetime(2025, 6, 1, tzinfo=timezone.utc), None, "admin")) == 400
+    assert status_of(start_period_close(datetime.now(timezone.utc) + timedelta(days=1), None, "admin")) == 400
+    closed.period_closes.docs[0]["status"] = "closing"
+    assert status_of(start_period_close(datetime(2026, 6, 1, tzinfo=timezone.utc), None, "admin")) == 409
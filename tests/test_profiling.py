@@ -0,0 +1,76 @@
+"""X-Profile requests: admin-only, stored with their response, header-gated"""
+import asyncio
+
+import jwt
+
+from muhasebe.config import ALGORITHM, SECRET_KEY
+from muhasebe.security import is_admin_authorization
+from muhasebe.tenancy import TENANT_FIELD
+from profiling import ProfilingMiddleware
+
+
+def bearer(role):
+    return "Bearer " + jwt.encode({"username": "ayse", "role": role, TENANT_FIELD: "acme"}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"id": "p1"}', "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def call(path="/api/payments", profile=b"1", authorization=None):
+    stored, sent = [], []
+
+    async def store(profile):
+        stored.append(profile)
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"x-profile", profile)] if profile is not None else []
+    if authorization:
+        headers.append((b"authorization", authorization.encode()))
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"dry_run=true", "headers": headers}
+    middleware = ProfilingMiddleware(endpoint, authorize=is_admin_authorization, store=store)
+    asyncio.run(middleware(scope, None, send))
+    return dict(sent[0]["headers"]), stored
+
+
+def test_admin_request_is_profiled_and_stored():
+    headers, stored = call(authorization=bearer("admin"))
+    assert len(stored) == 1
+    profile = stored[0]
+    assert headers[b"x-profile-id"].decode() == profile["id"]
+    assert (profile["method"], profile["path"], profile["query_string"], profile["status"]) == (
+        "POST", "/api/payments", "dry_run=true", 201
+    )
+    assert profile["engine"] in ("pyinstrument", "cprofile") and profile["duration_ms"] >= 0
+
+
+def test_non_admins_and_bad_tokens_are_not_profiled():
+    for authorization in (bearer("user"), "Bearer not-a-jwt", None):
+        headers, stored = call(authorization=authorization)
+        assert stored == [] and b"x-profile-id" not in headers
+
+
+def test_profiling_needs_the_header_and_an_api_path():
+    admin = bearer("admin")
+    for kwargs in ({"profile": None}, {"profile": b"0"}, {"profile": b"false"}, {"path": "/metrics"}):
+        headers, stored = call(authorization=admin, **kwargs)
+        assert stored == [] and b"x-profile-id" not in headers
+
+
+def test_store_failure_does_not_break_the_response():
+    sent = []
+
+    async def store(profile):
+        raise RuntimeError("mongo down")
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/payments",
+             "headers": [(b"x-profile", b"1"), (b"authorization", bearer("admin").encode())]}
+    asyncio.run(ProfilingMiddleware(endpoint, authorize=is_admin_authorization, store=store)(scope, None, send))
+    assert sent[0]["status"] == 201 and b"".join(m.get("body", b"") for m in sent[1:]) == b'{"id": "p1"}'
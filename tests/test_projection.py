@@ -0,0 +1,50 @@
+"""Sparse fieldsets: whitelisted fields become the projection and the response"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from muhasebe.models import Payment
+from muhasebe.projection import field_projection, parse_fields
+from muhasebe.routers import payments
+
+
+def test_parse_fields_keeps_model_order_and_always_adds_id():
+    assert parse_fields(" is_paid, amount ,,", Payment) == ("id", "amount", "is_paid")
+    assert parse_fields("", Payment) == ("id",)
+    assert parse_fields(None, Payment) is None
+
+
+def test_unknown_fields_are_rejected():
+    for fields in ("amount,password", "_id", "amount.$", "customer_name;drop"):
+        with pytest.raises(HTTPException) as error:
+            parse_fields(fields, Payment)
+        assert error.value.status_code == 400
+
+
+def test_projection_only_names_the_requested_fields():
+    assert field_projection(("id", "amount")) == {"_id": 0, "id": 1, "amount": 1}
+
+
+@pytest.fixture
+def ledger(memory_db):
+    memory_db.payments.add({"id": "p1", "customer_id": "c1", "customer_name": "Işık Gıda", "amount": 123456,
+                            "paid_amount": 0, "payment_type": "alacak", "is_paid": False, "internal_note": "x",
+                            "created_at": "2026-01-05T00:00:00+00:00", "due_date": "2026-02-05T00:00:00+00:00"})
+    return memory_db
+
+
+def test_sparse_list_sends_and_returns_only_those_fields(ledger):
+    response = asyncio.run(payments.get_payments(fields="amount,due_date"))
+    assert json.loads(response.body) == [{"id": "p1", "amount": 1234.56, "due_date": "2026-02-05T00:00:00Z"}]
+    # The projection, not the serializer, dropped the rest of the document
+    _, cursor = ledger.payments.cursors[-1]
+    assert [set(doc) for doc in cursor.docs] == [{"id", "amount", "due_date"}]
+
+
+def test_unknown_field_fails_before_querying(ledger):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(payments.get_payments(fields="amount,internal_note"))
+    assert error.value.status_code == 400 and "internal_note" in error.value.detail
+    assert ledger.payments.cursors == []
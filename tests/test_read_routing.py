@@ -0,0 +1,75 @@
+"""Read routing: report groups go to secondaries, cashier flows stay on the primary"""
+import asyncio
+
+import pytest
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from muhasebe import database
+from muhasebe.database import build_read_options, read_group, read_routing
+from muhasebe.models import PartialPaymentRequest
+from muhasebe.routers import balances, payments
+
+
+def test_build_read_options():
+    options = build_read_options({"read_preference": "secondaryPreferred", "read_concern": "local", "max_staleness": 90})
+    assert options["read_preference"] == SecondaryPreferred(max_staleness=90)
+    assert options["read_concern"].level == "local"
+
+    options = build_read_options({"read_preference": "primary", "read_concern": "majority", "max_staleness": 90})
+    assert options["read_preference"] == Primary() and options["read_concern"].level == "majority"
+
+
+def test_default_groups_read_from_secondaries():
+    routing = read_routing()
+    assert set(routing) == {"reports", "dashboard", "statements"}
+    assert all(group["read_preference"]["mode"] == "secondaryPreferred" for group in routing.values())
+
+
+def test_collections_carry_the_group_options_only_inside_the_group(memory_db):
+    database.db.payments
+    assert memory_db.read_options == []
+
+    with read_group("reports"):
+        database.db.payments
+        with read_group("statements"):
+            database.db.customers
+        database.db.transactions
+    database.db.payments
+
+    assert memory_db.read_options == [
+        ("payments", database.READ_OPTIONS["reports"]),
+        ("customers", database.READ_OPTIONS["statements"]),
+        ("transactions", database.READ_OPTIONS["reports"]),
+    ]
+
+
+def test_group_left_on_the_primary_skips_with_options(memory_db, monkeypatch):
+    monkeypatch.setitem(database.READ_OPTIONS, "reports", build_read_options(
+        {"read_preference": "primary", "read_concern": None, "max_staleness": -1}
+    ))
+    with read_group("reports"):
+        database.db.payments
+    assert memory_db.read_options == []
+
+
+@pytest.fixture
+def ledger(memory_db):
+    memory_db.customers.add({"id": "c1", "name": "Işık Gıda"})
+    memory_db.payments.add({"id": "p1", "customer_id": "c1", "customer_name": "Işık Gıda", "amount": 10000,
+                            "paid_amount": 0, "payment_type": "alacak", "is_paid": False,
+                            "created_at": "2026-01-05T00:00:00+00:00", "due_date": "2026-02-05T00:00:00+00:00"})
+    return memory_db
+
+
+def test_balances_endpoint_reads_through_the_statements_group(ledger):
+    result = asyncio.run(balances.get_balances("2026-01-31"))
+    assert result["customers"][0]["customer_name"] == "Işık Gıda"
+    routed = {name for name, options in ledger.read_options if options == database.READ_OPTIONS["statements"]}
+    assert {"payments", "customers"} <= routed
+    assert all(options == database.READ_OPTIONS["statements"] for _, options in ledger.read_options)
+
+
+def test_partial_payment_stays_on_the_primary(ledger):
+    asyncio.run(payments.make_partial_payment(PartialPaymentRequest(payment_id="p1", amount=25)))
+    assert ledger.read_options == []
+    assert ledger.payments.docs[0]["paid_amount"] == 2500
@@ -0,0 +1,88 @@
+"""Coalescing concurrent reads and dropping results across writes"""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def counting(result="stats"):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return result
+    return compute, calls
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight("dashboard")
+    compute, calls = counting()
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("acme", compute) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == ["stats"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_keys_do_not_share_results():
+    flight = SingleFlight("dashboard")
+
+    async def scenario():
+        return await asyncio.gather(
+            flight.do("acme", counting("acme")[0]),
+            flight.do("globex", counting("globex")[0]),
+        )
+
+    assert asyncio.run(scenario()) == ["acme", "globex"]
+    assert flight.executions == 2
+
+
+def test_ttl_reuses_a_finished_result_until_cleared():
+    flight = SingleFlight("dashboard", ttl=60)
+    compute, calls = counting()
+
+    async def scenario():
+        await flight.do("acme", compute)
+        await flight.do("acme", compute)
+        flight.clear()
+        await flight.do("acme", compute)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2 and flight.cache_hits == 1
+
+
+def test_result_computed_across_a_clear_is_not_cached():
+    flight = SingleFlight("dashboard", ttl=60)
+    compute, calls = counting()
+
+    async def scenario():
+        stale = asyncio.ensure_future(flight.do("acme", compute))
+        await asyncio.sleep(0)
+        flight.clear()
+        fresh = await flight.do("acme", compute)
+        return await stale, fresh
+
+    assert asyncio.run(scenario()) == ("stats", "stats")
+    assert len(calls) == 2
+    assert flight.stats()["cache_hits"] == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight("dashboard", ttl=60)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("mongo down")
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("acme", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("acme", fail)
+
+    asyncio.run(scenario())
+    assert flight.executions == 2
@@ -0,0 +1,99 @@
+"""Slow-op records keep no query values and remember their tenant"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from slowops import SlowOpLogger, redact_plan
+from muhasebe.tenancy import current_tenant, tenant_scope
+
+EXPLAIN = {
+    "queryPlanner": {
+        "namespace": "muhasebe.customers",
+        "parsedQuery": {"tenant_id": {"$eq": "acme"}, "phone": {"$eq": "05321112233"}},
+        "winningPlan": {
+            "stage": "FETCH",
+            "filter": {"phone": {"$eq": "05321112233"}},
+            "inputStage": {
+                "stage": "IXSCAN",
+                "indexName": "tenant_id_1_phone_1",
+                "keyPattern": {"tenant_id": 1, "phone": 1},
+                "indexBounds": {"phone": ['["05321112233", "05321112233"]']},
+            },
+        },
+        "rejectedPlans": [{"stage": "COLLSCAN", "filter": {"phone": {"$eq": "05321112233"}}}],
+    },
+    "executionStats": {"nReturned": 1, "totalDocsExamined": 1, "totalKeysExamined": 1,
+                       "executionStages": {"stage": "FETCH", "nReturned": 1,
+                                           "filter": {"phone": {"$eq": "05321112233"}}}},
+    "command": {"find": "customers", "filter": {"phone": "05321112233"}},
+}
+
+
+def test_redact_plan_keeps_stages_and_stats_only():
+    redacted = redact_plan(EXPLAIN)
+    assert "05321112233" not in json.dumps(redacted)
+    assert "acme" not in json.dumps(redacted)
+    assert redacted["queryPlanner"]["winningPlan"] == {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "tenant_id_1_phone_1"},
+    }
+    assert redacted["executionStats"]["totalDocsExamined"] == 1
+
+
+def test_redact_plan_keeps_only_aggregation_stage_names():
+    redacted = redact_plan({"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}},
+                                       {"$match": {"name": "Işık"}, "nReturned": 3}]})
+    assert redacted["stages"][1] == {"stage": "$match", "nReturned": 3}
+    assert redacted["stages"][0]["$cursor"]["queryPlanner"]["winningPlan"] == {"stage": "COLLSCAN"}
+
+
+def test_slow_command_is_recorded_for_the_tenant_it_ran_for():
+    logger = SlowOpLogger(threshold_ms=10, tenant=current_tenant.get)
+    queued = []
+    logger._loop = SimpleNamespace(call_soon_threadsafe=lambda fn, *args: queued.append(args))
+    command = {"find": "customers", "filter": {"phone": "0532"}, "lsid": {"id": "x"}}
+
+    with tenant_scope("acme"):
+        logger.started(SimpleNamespace(command_name="find", command=command, database_name="muhasebe",
+                                       request_id=1))
+    logger.succeeded(SimpleNamespace(request_id=1, duration_micros=50_000))
+
+    database_name, recorded, tenant_id, duration_ms, failed = queued[0]
+    assert tenant_id == "acme"
+    assert recorded == {"find": "customers", "filter": {"phone": "0532"}}
+    assert duration_ms == 50
+
+
+def test_fast_command_is_not_recorded():
+    logger = SlowOpLogger(threshold_ms=10)
+    queued = []
+    logger._loop = SimpleNamespace(call_soon_threadsafe=lambda fn, *args: queued.append(args))
+    logger.started(SimpleNamespace(command_name="find", command={"find": "customers"}, database_name="muhasebe",
+                                   request_id=1))
+    logger.succeeded(SimpleNamespace(request_id=1, duration_micros=2_000))
+    assert queued == [] and logger._commands == {}
+
+
+def test_record_stores_the_tenant_and_a_redacted_explain():
+    class FakeDatabase:
+        def __init__(self):
+            self.records = []
+            self.client = {"muhasebe": SimpleNamespace(command=self.explain)}
+
+        async def explain(self, command):
+            return EXPLAIN
+
+        def __getitem__(self, name):
+            return SimpleNamespace(insert_one=self.insert_one)
+
+        async def insert_one(self, record):
+            self.records.append(record)
+
+    logger = SlowOpLogger(threshold_ms=10, explain_sample_rate=1.0)
+    logger._db = FakeDatabase()
+    asyncio.run(logger._record("muhasebe", {"find": "customers", "filter": {"phone": "05321112233"}},
+                               "acme", 50, False))
+
+    record = logger._db.records[0]
+    assert record["tenant_id"] == "acme"
+    assert record["plan"] == ["FETCH", "IXSCAN"]
+    assert "05321112233" not in json.dumps(record)
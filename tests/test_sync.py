@@ -0,0 +1,234 @@
+"""Delta sync tokens against writes that land after their seq was reserved,
+paging, and tombstone pruning"""
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from muhasebe import changes
+from muhasebe.changes import next_seq
+from muhasebe.config import SYNC_TOMBSTONE_RETENTION_DAYS, SYNC_WATERMARK_LAG
+from muhasebe.routers import system
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+
+def matches(doc, filter):
+    for field, condition in filter.items():
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if value is None or not {"$eq": value == operand, "$gt": value > operand,
+                                     "$lt": value < operand, "$lte": value <= operand}[op]:
+                return False
+    return True
+
+
+class FakeCollection:
+    """Just enough of a collection for the `updated_seq` queries and pruning"""
+
+    def __init__(self):
+        self.docs = []
+
+    def find(self, filter, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if matches(d, filter)])
+
+    def aggregate(self, pipeline):
+        match, group = pipeline
+        docs = [d for d in self.docs if matches(d, match["$match"])]
+        return FakeCursor([{"_id": None, "seq": max(d["updated_seq"] for d in docs)}] if docs else [])
+
+    async def delete_many(self, filter):
+        kept = [d for d in self.docs if not matches(d, filter)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return SimpleNamespace(deleted_count=deleted)
+
+
+class FakeCounters:
+    def __init__(self):
+        self.values = {}
+
+    @property
+    def value(self):
+        return self.values.get("updated_seq", 0)
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        self.values[filter["_id"]] = self.values.get(filter["_id"], 0) + update["$inc"]["value"]
+        return {"_id": filter["_id"], "value": self.values[filter["_id"]]}
+
+    async def find_one(self, filter):
+        if filter["_id"] not in self.values:
+            return None
+        return {"_id": filter["_id"], "value": self.values[filter["_id"]]}
+
+    async def update_one(self, filter, update, upsert=False):
+        self.values[filter["_id"]] = max(self.values.get(filter["_id"], 0), update["$max"]["value"])
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.counters = FakeCounters()
+        self.collections = {name: FakeCollection() for name in changes.SYNC_COLLECTIONS + ("tombstones",)}
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        return self.collections[name]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = FakeDatabase()
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(changes, "db", database)
+    monkeypatch.setattr(changes, "all_tenants_db", database)
+    monkeypatch.setattr(system, "db", database)
+    monkeypatch.setattr(changes, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(changes, "_seq_samples", deque())
+    database.clock = clock
+    return database
+
+
+def test_write_landing_after_sync_is_not_skipped(fake_db):
+    async def scenario():
+        # The writer reserves its seq, then a sync runs before the insert lands
+        seq = await next_seq()
+        first = await system.sync_changes(since=0)
+        assert first["customers"] == []
+        assert first["token"] < seq
+
+        fake_db.clock.now += 0.5
+        fake_db.customers.docs.append({"id": "c1", "name": "Işık", "updated_seq": seq})
+
+        second = await system.sync_changes(since=first["token"])
+        assert [c["id"] for c in second["customers"]] == ["c1"]
+
+    asyncio.run(scenario())
+
+
+def test_token_advances_once_in_flight_writes_have_landed(fake_db):
+    async def scenario():
+        seq = await next_seq()
+        fake_db.customers.docs.append({"id": "c1", "updated_seq": seq})
+        assert (await system.sync_changes(since=0))["token"] == 0
+
+        fake_db.clock.now += SYNC_WATERMARK_LAG
+        result = await system.sync_changes(since=0)
+        assert result["token"] == seq
+        assert (await system.sync_changes(since=result["token"]))["customers"] == []
+
+    asyncio.run(scenario())
+
+
+def test_token_never_moves_backwards(fake_db):
+    async def scenario():
+        await next_seq()
+        fake_db.clock.now += SYNC_WATERMARK_LAG
+        assert (await system.sync_changes(since=50))["token"] == 50
+
+    asyncio.run(scenario())
+
+
+def add(target, doc_id, seq, **fields):
+    target.docs.append({"id": doc_id, "updated_seq": seq, **fields})
+
+
+def test_pages_stop_at_the_limit_and_chain_by_token(fake_db):
+    async def scenario():
+        await next_seq(5)
+        for i in range(1, 6):
+            add(fake_db.customers if i % 2 else fake_db.transactions, f"d{i}", i, amount=100)
+        fake_db.clock.now += SYNC_WATERMARK_LAG
+        await next_seq(0)
+
+        first = await system.sync_changes(since=0, limit=2)
+        assert [d["id"] for d in first["customers"] + first["transactions"]] == ["d1", "d2"]
+        assert first["token"] == 2 and first["has_more"]
+
+        second = await system.sync_changes(since=first["token"], limit=2)
+        third = await system.sync_changes(since=second["token"], limit=2)
+        assert [d["id"] for d in second["customers"] + second["transactions"]] == ["d3", "d4"]
+        assert [c["id"] for c in third["customers"]] == ["d5"]
+        assert third["token"] == 5 and not third["has_more"]
+
+    asyncio.run(scenario())
+
+
+def test_page_does_not_split_documents_sharing_a_seq(fake_db):
+    async def scenario():
+        # A cascaded rename stamps every payment of the customer with one seq
+        await next_seq(3)
+        add(fake_db.customers, "c1", 1)
+        for i in range(3):
+            add(fake_db.payments, f"p{i}", 2, amount=100, paid_amount=0)
+        add(fake_db.customers, "c2", 3)
+        fake_db.clock.now += SYNC_WATERMARK_LAG
+        await next_seq(0)
+
+        first = await system.sync_changes(since=0, limit=2)
+        assert [c["id"] for c in first["customers"]] == ["c1"] and first["payments"] == []
+        second = await system.sync_changes(since=first["token"], limit=2)
+        assert sorted(p["id"] for p in second["payments"]) == ["p0", "p1", "p2"]
+        assert second["token"] == 2 and second["has_more"]
+        third = await system.sync_changes(since=second["token"], limit=2)
+        assert [c["id"] for c in third["customers"]] == ["c2"] and not third["has_more"]
+
+    asyncio.run(scenario())
+
+
+def test_page_token_stays_below_the_watermark(fake_db):
+    async def scenario():
+        await next_seq(3)
+        for i in range(1, 4):
+            add(fake_db.customers, f"c{i}", i)
+        # The process has not watched the counter long enough: no progress
+        first = await system.sync_changes(since=0, limit=2)
+        assert first["token"] == 0 and not first["has_more"]
+
+    asyncio.run(scenario())
+
+
+def test_expired_tombstones_are_pruned_and_old_tokens_rejected(fake_db):
+    async def scenario():
+        expired = (datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS + 1)).isoformat()
+        await next_seq(3)
+        add(fake_db.tombstones, "c1", 1, collection="customers", deleted_at=expired)
+        add(fake_db.tombstones, "c2", 2, collection="customers", deleted_at=expired)
+        add(fake_db.tombstones, "c3", 3, collection="customers", deleted_at=datetime.now(timezone.utc).isoformat())
+        fake_db.clock.now += SYNC_WATERMARK_LAG
+        await next_seq(0)
+
+        assert await changes.prune_tombstones() == 2
+        assert [t["id"] for t in fake_db.tombstones.docs] == ["c3"]
+        with pytest.raises(HTTPException) as error:
+            await system.sync_changes(since=1)
+        assert error.value.status_code == 410
+        assert (await system.sync_changes(since=2))["deleted"]["customers"] == ["c3"]
+
+    asyncio.run(scenario())
+
+
+def test_tombstones_are_kept_until_the_watermark_passes_them(fake_db):
+    async def scenario():
+        expired = (datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS + 1)).isoformat()
+        await next_seq()
+        add(fake_db.tombstones, "c1", 1, collection="customers", deleted_at=expired)
+        assert await changes.prune_tombstones() == 0
+        assert await changes.tombstones_pruned_seq() == 0
+
+    asyncio.run(scenario())
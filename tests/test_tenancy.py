@@ -0,0 +1,42 @@
+"""Tenant scoping of filters and tokens"""
+import jwt
+
+from muhasebe.config import ALGORITHM, DEFAULT_TENANT_ID, SECRET_KEY
+from muhasebe.tenancy import (
+    TENANT_FIELD, TenantCollection, current_tenant, tenant_filter, tenant_from_authorization, tenant_scope
+)
+
+
+def test_scoped_adds_the_current_tenant():
+    with tenant_scope("acme"):
+        assert TenantCollection._scoped({"id": "1"}) == {"id": "1", TENANT_FIELD: "acme"}
+        assert TenantCollection._scoped(None) == {TENANT_FIELD: "acme"}
+
+
+def test_scoped_overrides_a_tenant_in_the_filter():
+    with tenant_scope("acme"):
+        assert TenantCollection._scoped({TENANT_FIELD: "other"}) == {TENANT_FIELD: "acme"}
+
+
+def test_scoped_does_not_modify_the_callers_filter():
+    query = {"id": "1"}
+    with tenant_scope("acme"):
+        tenant_filter(query)
+    assert query == {"id": "1"}
+
+
+def test_tenant_scope_restores_the_previous_tenant():
+    with tenant_scope("acme"):
+        with tenant_scope("globex"):
+            assert current_tenant.get() == "globex"
+        assert current_tenant.get() == "acme"
+    assert current_tenant.get() == DEFAULT_TENANT_ID
+
+
+def test_tenant_from_authorization():
+    token = jwt.encode({"username": "a", TENANT_FIELD: "acme"}, SECRET_KEY, algorithm=ALGORITHM)
+    untenanted = jwt.encode({"username": "a"}, SECRET_KEY, algorithm=ALGORITHM)
+    assert tenant_from_authorization(f"Bearer {token}") == "acme"
+    assert tenant_from_authorization(f"Bearer {untenanted}") is None
+    assert tenant_from_authorization("Bearer not-a-token") is None
+    assert tenant_from_authorization(None) is None